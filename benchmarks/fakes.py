@@ -0,0 +1,275 @@
+# Local stand-ins for every service the bot talks to: a subgraph per contract
+# that mints synthetic lendings and rentings at a fixed rate, the Alchemy,
+# NFTPort and Castle Crush S3 metadata endpoints, and a Discord webhook.
+
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional, cast
+
+from requests.adapters import HTTPAdapter
+
+Row = dict[str, Any]
+
+ENTITY_PATTERN = re.compile(r"(lendings|rentings)\(orderBy")
+
+
+def random_address(rng: random.Random) -> str:
+    return f"0x{rng.getrandbits(160):040x}"
+
+
+def random_price(rng: random.Random) -> str:
+    # Packed as unpack_price expects: 2 bytes whole, 2 bytes decimal
+    return f"0x{rng.randrange(100):04x}{rng.randrange(10_000):04x}"
+
+
+def azrael_lending(rng: random.Random, nft: tuple[str, str]) -> Row:
+    return {
+        "lenderAddress": random_address(rng),
+        "maxRentDuration": str(rng.randint(1, 100)),
+        "dailyRentPrice": random_price(rng),
+        "lentAmount": "1",
+        "nftPrice": random_price(rng),
+        "paymentToken": str(rng.randint(1, 5)),
+        "nftAddress": nft[0],
+        "tokenId": nft[1],
+    }
+
+
+def sylvester_lending(rng: random.Random, nft: tuple[str, str]) -> Row:
+    return {
+        "lenderAddress": random_address(rng),
+        "maxRentDuration": str(rng.randint(1, 100)),
+        "dailyRentPrice": random_price(rng),
+        "lendAmount": "1",
+        "paymentToken": str(rng.randint(1, 5)),
+        "nftAddress": nft[0],
+        "tokenID": nft[1],
+    }
+
+
+def whoopi_lending(rng: random.Random, nft: tuple[str, str]) -> Row:
+    lender = random_address(rng)
+    return {
+        "lenderAddress": lender,
+        "maxRentDuration": str(rng.randint(1, 100)),
+        "paymentToken": str(rng.randint(1, 5)),
+        "nftAddress": nft[0],
+        "tokenId": nft[1],
+        "upfrontRentFee": str(rng.randrange(10**18)),
+        "revShareBeneficiaries": [lender, random_address(rng)],
+        "revSharePortions": [rng.randint(0, 50), rng.randint(0, 50)],
+    }
+
+
+LENDING_BUILDERS: dict[str, Callable[[random.Random, tuple[str, str]], Row]] = {
+    "azrael": azrael_lending,
+    "sylvester": sylvester_lending,
+    "whoopi": whoopi_lending,
+}
+
+
+class FakeSubgraph:
+    def __init__(  # pylint: disable=too-many-arguments
+        self, family: str, rate: float, nfts: int, history: int, seed: int
+    ):
+        self.family = family
+        self.rate = rate
+        self.rng = random.Random(seed)
+        # Ten tokens per collection, so the metadata cache sees repeat NFTs
+        collections = [random_address(self.rng) for _ in range(max(nfts // 10, 1))]
+        self.nfts = [
+            (self.rng.choice(collections), str(token_id)) for token_id in range(nfts)
+        ]
+        self.rows: dict[str, list[Row]] = {"lendings": [], "rentings": []}
+        self.lock = threading.Lock()
+        self.cursor = 0
+        self.generated = 0
+        for _ in range(history):
+            self.mint()
+        self.history = history
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+
+    def mint(self):
+        # Lendings and rentings alternate, so both entities grow at half the rate
+        self.cursor += 1
+        lending = LENDING_BUILDERS[self.family](self.rng, self.rng.choice(self.nfts))
+        now = str(int(time.time()))
+        if self.cursor % 2:
+            row = {"id": str(self.cursor), "cursor": self.cursor, **lending}
+            self.rows["lendings"].append({**row, "lentAt": now})
+        else:
+            self.rows["rentings"].append(
+                {
+                    "id": str(self.cursor),
+                    "cursor": self.cursor,
+                    "renterAddress": random_address(self.rng),
+                    "rentDuration": str(self.rng.randint(1, 100)),
+                    "rentedAt": now,
+                    "lending": {"id": str(self.cursor - 1), **lending},
+                }
+            )
+        self.generated += 1
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def catch_up(self):
+        if self.started_at is None:
+            return
+        now = self.stopped_at or time.monotonic()
+        due = int((now - self.started_at) * self.rate)
+        while self.generated - self.history < due:
+            self.mint()
+
+    def stop(self):
+        self.stopped_at = time.monotonic()
+
+    @property
+    def minted(self) -> int:
+        return self.generated - self.history
+
+    def query(self, query: str, variables: dict[str, Any]) -> dict[str, Any]:
+        operation = query.split("query ", 1)[1].split("(", 1)[0]
+        with self.lock:
+            self.catch_up()
+            data: dict[str, Any] = {}
+            for entity in ENTITY_PATTERN.findall(query):
+                rows = self.rows[entity]
+                if operation == "Get":
+                    skip, first = variables["skip"], variables["first"]
+                    data[entity] = rows[::-1][skip : skip + first]
+                elif operation == "Cursor":
+                    field = "lentAt" if entity == "lendings" else "rentedAt"
+                    timestamp = int(variables["timestamp"])
+                    matches = [r for r in rows if int(r[field]) <= timestamp]
+                    data[entity] = (
+                        [{"cursor": matches[-1]["cursor"]}] if matches else []
+                    )
+                else:
+                    cursor = int(
+                        variables.get("cursor", variables.get(f"{entity}Cursor"))
+                    )
+                    newer = [r for r in rows if r["cursor"] > cursor]
+                    data[entity] = newer[: variables["first"]]
+        return {"data": data}
+
+
+def alchemy_nft(address: str, token_id: str) -> dict[str, Any]:
+    return {
+        "contract": {"address": address},
+        "id": {"tokenId": token_id},
+        "metadata": {
+            "name": f"NFT #{token_id}",
+            "description": "Synthetic",
+            "image": f"https://example.com/{address}/{token_id}.png",
+        },
+        "media": [{"gateway": f"https://example.com/{address}/{token_id}.png"}],
+    }
+
+
+class FakeWorld:
+    def __init__(self, subgraphs: dict[str, FakeSubgraph], latency_s: float):
+        self.subgraphs = subgraphs
+        self.latency_s = latency_s
+        self.lock = threading.Lock()
+        self.requests: dict[str, int] = {}
+        self.delivered = 0
+
+    def count(self, service: str):
+        with self.lock:
+            self.requests[service] = self.requests.get(service, 0) + 1
+
+    def handle(self, method: str, path: str, body: Any) -> Any:
+        time.sleep(self.latency_s)
+        service, _, rest = path.lstrip("/").partition("/")
+        self.count(service)
+        if service == "subgraph":
+            return self.subgraphs[rest].query(body["query"], body.get("variables", {}))
+        if service == "alchemy" and rest.endswith("getNFTMetadataBatch"):
+            return [
+                alchemy_nft(t["contractAddress"], t["tokenId"]) for t in body["tokens"]
+            ]
+        if service == "alchemy":
+            params = dict(p.split("=", 1) for p in rest.split("?", 1)[1].split("&"))
+            return alchemy_nft(params["contractAddress"], params["tokenId"])
+        if service == "nftport":
+            address, token_id = rest.split("?", 1)[0].split("/")[-2:]
+            return {
+                "contract_address": address,
+                "token_id": token_id,
+                "metadata": {"name": f"NFT #{token_id}", "description": "Synthetic"},
+                "cached_file_url": f"https://example.com/{address}/{token_id}.png",
+            }
+        if service == "s3":
+            token_id = str(int(rest.rsplit("/", 1)[-1].split(".")[0], 16))
+            return {
+                "name": f"Castle Crush #{token_id}",
+                "description": "Synthetic",
+                "image": f"https://example.com/castle-crush/{token_id}.png",
+            }
+        if service == "discord" and method == "POST":
+            with self.lock:
+                self.delivered += len(body["embeds"])
+            return {}
+        raise KeyError(path)
+
+
+class FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, world: FakeWorld, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), FakeHandler)
+        self.world = world
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def respond(self, method: str):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length)) if length else None
+        try:
+            data = cast(FakeServer, self.server).world.handle(method, self.path, body)
+        except KeyError:
+            self.send_error(404)
+            return
+        payload = json.dumps(data).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.respond("GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.respond("POST")
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class RedirectAdapter(HTTPAdapter):
+    # Sends requests for a real host to the fake server instead
+    def __init__(self, prefix: str, target: str, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+        self.target = target
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        request.url = self.target + request.url[len(self.prefix) :]
+        return super().send(request, *args, **kwargs)
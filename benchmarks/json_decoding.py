@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# Compares the JSON backends on subgraph responses. Pass recorded responses
+# (the raw body of a subgraph POST) as arguments, otherwise a synthetic page
+# shaped like the Azrael sync query is used.
+#
+#   poetry run python -m benchmarks.json_decoding [response.json ...]
+
+import argparse
+import json
+import random
+import timeit
+from functools import partial
+
+from notification_discord_bot import json_codec
+from notification_discord_bot.contracts import EthereumAzraelContract
+
+BACKENDS = ("json", "orjson", "msgspec")
+
+
+def synthetic_lending(cursor: int) -> dict:
+    return {
+        "id": str(cursor),
+        "cursor": cursor,
+        "lenderAddress": f"0x{random.getrandbits(160):040x}",
+        "maxRentDuration": str(random.randint(1, 100)),
+        "dailyRentPrice": f"0x{random.getrandbits(32):08x}",
+        "lentAmount": "1",
+        "nftPrice": f"0x{random.getrandbits(32):08x}",
+        "paymentToken": str(random.randint(1, 5)),
+        "nftAddress": f"0x{random.getrandbits(160):040x}",
+        "tokenId": str(random.getrandbits(64)),
+        "lentAt": str(1_660_000_000 + cursor),
+    }
+
+
+def synthetic_renting(cursor: int) -> dict:
+    lending = synthetic_lending(cursor)
+    return {
+        "id": str(cursor),
+        "cursor": cursor,
+        "renterAddress": f"0x{random.getrandbits(160):040x}",
+        "rentDuration": str(random.randint(1, 100)),
+        "rentedAt": str(1_660_000_000 + cursor),
+        "lending": {
+            k: lending[k]
+            for k in (
+                "id",
+                "lenderAddress",
+                "paymentToken",
+                "nftPrice",
+                "dailyRentPrice",
+                "nftAddress",
+                "tokenId",
+            )
+        },
+    }
+
+
+def synthetic_payload(rows: int) -> bytes:
+    random.seed(0)
+    data = {
+        "lendings": [synthetic_lending(c) for c in range(rows)],
+        "rentings": [synthetic_renting(c) for c in range(rows)],
+    }
+    return json.dumps({"data": data}).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("payloads", nargs="*", help="recorded subgraph responses")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    payloads = {}
+    for path in args.payloads:
+        with open(path, "rb") as f:
+            payloads[path] = f.read()
+    if not payloads:
+        payloads[f"synthetic ({args.rows} rows)"] = synthetic_payload(args.rows)
+
+    contract = EthereumAzraelContract()
+    for name, payload in payloads.items():
+        print(f"{name}: {len(payload) / 1024:.0f} KiB")
+        for backend in BACKENDS:
+            try:
+                loads = json_codec.import_backend(backend)
+            except ImportError:
+                print(f"  {backend:8} not installed")
+                continue
+
+            def decode_and_transform(loads=loads, payload=payload):
+                data = loads(payload)["data"]
+                for lending in data.get("lendings", []):
+                    contract.transform_lending(lending)
+                for renting in data.get("rentings", []):
+                    contract.transform_renting(renting)
+
+            decode_s = timeit.timeit(partial(loads, payload), number=args.number)
+            total_s = timeit.timeit(decode_and_transform, number=args.number)
+            print(
+                f"  {backend:8} decode {decode_s / args.number * 1e3:7.2f} ms"
+                f"  decode+transform {total_s / args.number * 1e3:7.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
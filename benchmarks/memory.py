@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# Measures the memory held per transformed lending and renting, as during a
+# backfill of historical events.
+#
+#   poetry run python -m benchmarks.memory [--events 10000]
+
+import argparse
+import gc
+import tracemalloc
+
+from benchmarks.json_decoding import synthetic_lending, synthetic_renting
+from notification_discord_bot.contracts import EthereumAzraelContract
+
+
+def bytes_per_event(transform, rows: list[dict]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = [transform(row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del data
+    return (after - before) / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=10_000)
+    args = parser.parse_args()
+
+    contract = EthereumAzraelContract()
+    lendings = [synthetic_lending(c) for c in range(args.events)]
+    rentings = [synthetic_renting(c) for c in range(args.events)]
+    print(
+        f"lending {bytes_per_event(contract.transform_lending, lendings):7.0f} "
+        "bytes/event"
+    )
+    print(
+        f"renting {bytes_per_event(contract.transform_renting, rentings):7.0f} "
+        "bytes/event"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# Runs the polling, building and delivery pipeline offline against the fakes in
+# benchmarks.fakes and reports throughput, poll cycle latency, memory and the
+# per-stage timing from the event traces. Results are written as JSON so runs
+# can be compared for regressions.
+#
+#   poetry run python -m benchmarks.pipeline [--rate 5] [--duration 30] \
+#       [--output pipeline.json]
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, cast
+
+from requests.adapters import HTTPAdapter
+
+from benchmarks.fakes import FakeServer, FakeSubgraph, FakeWorld, RedirectAdapter
+from notification_discord_bot import constants, db, tracing
+from notification_discord_bot.contracts import (
+    AzraelContract,
+    SylvesterContract,
+    all_contracts,
+)
+from notification_discord_bot.http_client import session
+from notification_discord_bot.logger import logger
+from notification_discord_bot.main import (
+    MessageSender,
+    check_for_updates,
+    create_dispatcher,
+)
+from notification_discord_bot.nft import nft_cache
+from notification_discord_bot.renft import ReNFTContract
+from notification_discord_bot.seed import seed_contract
+from notification_discord_bot.watermarks import watermarks
+
+REDIRECTS = {
+    constants.ETHEREUM_ALCHEMY_BASE_URL: "alchemy/eth",
+    constants.POLYGON_ALCHEMY_BASE_URL: "alchemy/polygon",
+    "https://api.nftport.xyz": "nftport",
+    "https://castle-crush-crypto-bucket.s3.amazonaws.com": "s3",
+}
+
+
+def family(contract: ReNFTContract) -> str:
+    if isinstance(contract, AzraelContract):
+        return "azrael"
+    if isinstance(contract, SylvesterContract):
+        return "sylvester"
+    return "whoopi"
+
+
+def slug(contract: ReNFTContract) -> str:
+    return contract.name.lower().replace(" ", "-")
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "count": len(values),
+        "p50": tracing.percentile(values, 0.5),
+        "p95": tracing.percentile(values, 0.95),
+        "p99": tracing.percentile(values, 0.99),
+        "max": values[-1],
+    }
+
+
+def traces_path(workdir: str) -> str:
+    return os.path.join(workdir, "traces.jsonl")
+
+
+def point_at(server: FakeServer, workdir: str):
+    # Storage, caches and traces go to a scratch directory and every outbound
+    # request to the fake server, so a run never touches real services or data.
+    db.backend = db.SQLiteBackend(os.path.join(workdir, "db.sqlite3"))
+    db.initialize()
+    watermarks.load()
+    nft_cache.path = None
+    constants.IMAGE_CACHE_PATH = os.path.join(workdir, "image_cache")
+    constants.DISCORD_WEBHOOK = f"{server.url}/discord/webhook"
+    constants.TWEEPY_API_KEY = None
+    tracing.tracer.exporter = tracing.FileExporter(traces_path(workdir))
+    for prefix, target in REDIRECTS.items():
+        session.mount(
+            prefix,
+            RedirectAdapter(
+                prefix,
+                f"{server.url}/{target}",
+                max_retries=cast(HTTPAdapter, session.get_adapter(prefix)).max_retries,
+            ),
+        )
+    for contract in all_contracts:
+        setattr(type(contract), "query_url", f"{server.url}/subgraph/{slug(contract)}")
+
+
+async def drive(
+    contracts: list[ReNFTContract],
+    world: FakeWorld,
+    duration_s: float,
+    poll_interval_s: float,
+    drain_timeout_s: float,
+) -> dict[str, list[float]]:
+    dispatcher = create_dispatcher(MessageSender())
+    dispatcher.start()
+    cycles: dict[str, list[float]] = {c.name: [] for c in contracts}
+    for subgraph in world.subgraphs.values():
+        subgraph.start()
+    stop_at = time.monotonic() + duration_s
+
+    async def poll(contract: ReNFTContract):
+        while (started_at := time.monotonic()) < stop_at:
+            await check_for_updates(dispatcher, contract)
+            cycles[contract.name].append(time.monotonic() - started_at)
+            await asyncio.sleep(max(started_at + poll_interval_s - time.monotonic(), 0))
+
+    await asyncio.gather(*(poll(c) for c in contracts))
+    # Pick up whatever was minted during the last interval, then let the
+    # dispatcher deliver it.
+    for subgraph in world.subgraphs.values():
+        subgraph.stop()
+    for contract in contracts:
+        await check_for_updates(dispatcher, contract)
+    await dispatcher.stop(drain_timeout_s)
+    return cycles
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    contracts = [
+        c for c in all_contracts if not args.contracts or slug(c) in args.contracts
+    ]
+    subgraphs = {
+        slug(c): FakeSubgraph(family(c), args.rate, args.nfts, args.history, seed=i)
+        for i, c in enumerate(contracts)
+    }
+    world = FakeWorld(subgraphs, args.latency_ms / 1000)
+    server = FakeServer(world)
+    server.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        point_at(server, workdir)
+        for contract in contracts:
+            seed_contract(contract)
+        watermarks.flush()
+
+        started_at = time.monotonic()
+        cpu_started_at = time.process_time()
+        cycles = asyncio.run(
+            drive(
+                contracts,
+                world,
+                args.duration,
+                args.poll_interval,
+                args.drain_timeout,
+            )
+        )
+        elapsed_s = time.monotonic() - started_at
+        stages = tracing.summarize(tracing.read_spans(traces_path(workdir)), since_ns=0)
+    server.shutdown()
+
+    minted = sum(s.minted for s in subgraphs.values())
+    return {
+        "config": vars(args),
+        "events": {"minted": minted, "delivered": world.delivered},
+        "elapsed_s": elapsed_s,
+        "cpu_s": time.process_time() - cpu_started_at,
+        "throughput_events_per_s": world.delivered / elapsed_s,
+        "poll_cycle_s": {
+            "all": percentiles([c for cs in cycles.values() for c in cs]),
+            **{name: percentiles(cs) for name, cs in cycles.items()},
+        },
+        # ru_maxrss is in KiB on Linux
+        "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages_s": {name: percentiles(values) for name, values in stages.items()},
+        "requests": world.requests,
+        "nft_cache_hit_ratio": nft_cache.stats.hit_ratio,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rate", type=float, default=5, help="events per second per contract"
+    )
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--poll-interval", type=float, default=1)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--nfts", type=int, default=200, help="distinct NFTs")
+    parser.add_argument("--history", type=int, default=100)
+    parser.add_argument("--drain-timeout", type=float, default=30)
+    parser.add_argument(
+        "--contracts",
+        nargs="*",
+        help="e.g. ethereum-azrael avalanche-whoopi, all by default",
+    )
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    results = run(args)
+    json.dump(results, sys.stdout, indent=2)
+    print()
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+import argparse
+import itertools
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from typing import IO, Any, Iterable, Iterator, Optional
+
+from notification_discord_bot import constants, db, outbox
+from notification_discord_bot.contracts import (
+    all_contracts,
+    contract_is_enabled,
+    get_cursor_at,
+)
+from notification_discord_bot.logger import logger
+from notification_discord_bot.main import MessageSender
+from notification_discord_bot.nft import prefetch_nfts
+from notification_discord_bot.renft import ReNFTContract, ReNFTDatum, TransactionType
+from notification_discord_bot.seed import FIRST_CURSOR, parse_cursor
+from notification_discord_bot.watermarks import watermarks
+
+
+@dataclass
+class Throughput:
+    events: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def events_per_s(self) -> float:
+        return self.events / self.elapsed_s if self.elapsed_s else 0.0
+
+
+def resolve_cursor(
+    contract: ReNFTContract,
+    transaction_type: TransactionType,
+    cursor: Optional[Any],
+    timestamp: Optional[int],
+) -> Optional[Any]:
+    if cursor is not None or timestamp is None:
+        return cursor
+    # Nothing happened at or before the timestamp, so the range starts (or
+    # ends) before the first event.
+    at = get_cursor_at(contract, transaction_type, timestamp)
+    return at if at is not None else FIRST_CURSOR
+
+
+def iter_events(
+    contract: ReNFTContract,
+    transaction_type: TransactionType,
+    from_cursor: Optional[Any],
+    to_cursor: Optional[Any],
+    include_expired: bool = True,
+) -> Iterator[ReNFTDatum]:
+    # Pages are only requested as the events are consumed, and stop being
+    # requested once the range end is passed.
+    start = from_cursor if from_cursor is not None else FIRST_CURSOR
+    if transaction_type == TransactionType.LEND:
+        events = contract.iter_lendings_since(start)
+    else:
+        events = contract.iter_rentings_since(start, include_expired=include_expired)
+    if to_cursor is None:
+        return events
+    return itertools.takewhile(lambda d: d.cursor <= to_cursor, events)
+
+
+def chunked(events: Iterable[ReNFTDatum], size: int) -> Iterator[list[ReNFTDatum]]:
+    it = iter(events)
+    while chunk := list(itertools.islice(it, size)):
+        yield chunk
+
+
+def notify(msg_sender: MessageSender, renft_datum: ReNFTDatum):
+    # Events at or below the live bot's watermarks were announced by it, even
+    # if their outbox rows were pruned or predate the outbox, or deliberately
+    # skipped when it was seeded. Together with the outbox check, a replay
+    # never posts the same event twice.
+    if renft_datum.has_been_observed():
+        return
+    for destination, payload, send in (
+        (
+            "discord",
+            renft_datum.build_discord_message().to_dict(),
+            lambda payload: msg_sender.send_discord_payloads([payload]),
+        ),
+        (
+            "twitter",
+            asdict(renft_datum.build_twitter_message()),
+            msg_sender.send_twitter_payload,
+        ),
+    ):
+        key = outbox.get_idempotency_key(renft_datum)
+        if outbox.is_sent(outbox.OutboxMessage(key, destination, payload)):
+            continue
+        msg = outbox.record(renft_datum, destination, payload)
+        outbox.deliverer(send)(msg)
+
+
+def backfill(  # pylint: disable=too-many-arguments
+    contract: ReNFTContract,
+    transaction_type: TransactionType,
+    from_cursor: Optional[Any],
+    to_cursor: Optional[Any],
+    export: Optional[IO[str]] = None,
+    msg_sender: Optional[MessageSender] = None,
+    include_expired: bool = True,
+    throughput: Optional[Throughput] = None,
+):
+    if throughput is None:
+        throughput = Throughput()
+    logger.info(
+        f"Backfilling {contract.name} {transaction_type.value} "
+        f"from {from_cursor} to {to_cursor}"
+    )
+    events = iter_events(
+        contract, transaction_type, from_cursor, to_cursor, include_expired
+    )
+    for chunk in chunked(events, constants.ALCHEMY_BATCH_SIZE):
+        if msg_sender is not None:
+            prefetch_nfts([d.nft_key for d in chunk])
+        for renft_datum in chunk:
+            if export is not None:
+                export.write(json.dumps(renft_datum.to_dict()) + "\n")
+            if msg_sender is not None:
+                notify(msg_sender, renft_datum)
+        throughput.events += len(chunk)
+        logger.info(
+            f"Backfilled {throughput.events} events "
+            f"({throughput.events_per_s:.1f} events/s)"
+        )
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay historical lendings and rentings."
+    )
+    parser.add_argument(
+        "--contract",
+        action="append",
+        choices=[c.name for c in all_contracts],
+        help="defaults to every enabled contract",
+    )
+    parser.add_argument(
+        "--type",
+        action="append",
+        choices=[t.value for t in TransactionType],
+        help="defaults to both",
+    )
+    parser.add_argument("--from-cursor", type=parse_cursor)
+    parser.add_argument("--to-cursor", type=parse_cursor)
+    parser.add_argument("--from-timestamp", type=int, help="unix seconds, exclusive")
+    parser.add_argument("--to-timestamp", type=int, help="unix seconds, inclusive")
+    parser.add_argument("--export", metavar="PATH", help="write events as JSON lines")
+    parser.add_argument(
+        "--notify", action="store_true", help="send notifications for the events"
+    )
+    parser.add_argument(
+        "--active-only", action="store_true", help="skip expired rentings"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None):
+    args = parse_args(argv)
+    contracts = [
+        c
+        for c in all_contracts
+        if contract_is_enabled(c) and (args.contract is None or c.name in args.contract)
+    ]
+    transaction_types = [TransactionType(t) for t in args.type or ["LEND", "RENT"]]
+    msg_sender = None
+    if args.notify:
+        if not db.is_initialized():
+            db.initialize()
+        watermarks.load()
+        msg_sender = MessageSender()
+
+    throughput = Throughput()
+    export = open(args.export, "w", encoding="utf-8") if args.export else None
+    try:
+        for contract in contracts:
+            for transaction_type in transaction_types:
+                backfill(
+                    contract,
+                    transaction_type,
+                    resolve_cursor(
+                        contract,
+                        transaction_type,
+                        args.from_cursor,
+                        args.from_timestamp,
+                    ),
+                    resolve_cursor(
+                        contract, transaction_type, args.to_cursor, args.to_timestamp
+                    ),
+                    export=export,
+                    msg_sender=msg_sender,
+                    include_expired=not args.active_only,
+                    throughput=throughput,
+                )
+    finally:
+        if export is not None:
+            export.close()
+    logger.info(
+        f"Backfilled {throughput.events} events in {throughput.elapsed_s:.1f}s "
+        f"({throughput.events_per_s:.1f} events/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
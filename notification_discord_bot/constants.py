@@ -25,6 +25,79 @@ NFT_PORT_API_KEY = os.getenv("NFT_PORT_API_KEY")
 
 # Optional env variables with defaults
 DB_PATH = os.getenv("DB_PATH", "db.json")
+DB_BACKEND = os.getenv("DB_BACKEND", "sqlite").lower()
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", f"{os.path.splitext(DB_PATH)[0]}.sqlite3")
+_SUBGRAPH_TIMEOUT_S = os.getenv("SUBGRAPH_TIMEOUT_S", "20")
+SUBGRAPH_TIMEOUT_S = float(_SUBGRAPH_TIMEOUT_S)
+ETHEREUM_AZRAEL_SUBGRAPH_TIMEOUT_S = float(
+    os.getenv("ETHEREUM_AZRAEL_SUBGRAPH_TIMEOUT_S", _SUBGRAPH_TIMEOUT_S)
+)
+ETHEREUM_SYLVESTER_SUBGRAPH_TIMEOUT_S = float(
+    os.getenv("ETHEREUM_SYLVESTER_SUBGRAPH_TIMEOUT_S", _SUBGRAPH_TIMEOUT_S)
+)
+MATIC_SYLVESTER_SUBGRAPH_TIMEOUT_S = float(
+    os.getenv("MATIC_SYLVESTER_SUBGRAPH_TIMEOUT_S", _SUBGRAPH_TIMEOUT_S)
+)
+AVALANCHE_WHOOPI_SUBGRAPH_TIMEOUT_S = float(
+    os.getenv("AVALANCHE_WHOOPI_SUBGRAPH_TIMEOUT_S", _SUBGRAPH_TIMEOUT_S)
+)
+HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "20"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR_S = float(os.getenv("HTTP_BACKOFF_FACTOR_S", "0.5"))
+# Number of hosts to keep pools for, and connections kept alive per host
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+# Set METRICS_PORT to an empty string to disable the metrics endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.getenv("METRICS_PORT", "8000")
+# Per-event spans are appended here as OTLP/JSON lines when set
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+# One of auto, orjson, msgspec or json
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto").lower()
+# Fetch lendings and rentings in one request per poll instead of two
+SUBGRAPH_COMBINED_QUERY = os.getenv("SUBGRAPH_COMBINED_QUERY", "true").lower() == "true"
+# Each contract's poll interval adapts between these bounds to its activity
+POLL_INTERVAL_S = float(os.getenv("POLL_INTERVAL_S", "20"))
+POLL_MIN_INTERVAL_S = float(os.getenv("POLL_MIN_INTERVAL_S", "5"))
+POLL_MAX_INTERVAL_S = float(os.getenv("POLL_MAX_INTERVAL_S", "120"))
+POLL_MAX_ERROR_INTERVAL_S = float(os.getenv("POLL_MAX_ERROR_INTERVAL_S", "600"))
+# Consecutive failed polls before a contract's circuit opens, and how long it
+# stays open before a probe
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT_S = float(os.getenv("CIRCUIT_RESET_TIMEOUT_S", "300"))
+NFT_CACHE_MAX_SIZE = int(os.getenv("NFT_CACHE_MAX_SIZE", "4096"))
+NFT_CACHE_TTL_S = float(os.getenv("NFT_CACHE_TTL_S", "86400"))
+NFT_CACHE_NEGATIVE_TTL_S = float(os.getenv("NFT_CACHE_NEGATIVE_TTL_S", "300"))
+# Set to an empty string to keep the NFT metadata cache in memory only
+NFT_CACHE_PATH = os.getenv(
+    "NFT_CACHE_PATH", os.path.join(os.path.dirname(DB_PATH), "nft_cache.sqlite3")
+)
+# Delay before racing the next NFT metadata provider; empty disables hedging
+_NFT_HEDGE_DELAY_S = os.getenv("NFT_HEDGE_DELAY_S", "2")
+NFT_HEDGE_DELAY_S = float(_NFT_HEDGE_DELAY_S) if _NFT_HEDGE_DELAY_S else None
+NFT_LATENCY_BUDGET_S = float(os.getenv("NFT_LATENCY_BUDGET_S", "10"))
+DISCORD_QUEUE_SIZE = int(os.getenv("DISCORD_QUEUE_SIZE", "1000"))
+DISCORD_QUEUE_POLICY = os.getenv("DISCORD_QUEUE_POLICY", "block").lower()
+# Discord accepts up to 10 embeds per webhook message
+DISCORD_BATCH_SIZE = min(int(os.getenv("DISCORD_BATCH_SIZE", "10")), 10)
+DISCORD_BATCH_WINDOW_S = float(os.getenv("DISCORD_BATCH_WINDOW_S", "1"))
+DISCORD_RATE_LIMIT_RETRIES = int(os.getenv("DISCORD_RATE_LIMIT_RETRIES", "3"))
+TWITTER_QUEUE_SIZE = int(os.getenv("TWITTER_QUEUE_SIZE", "100"))
+TWITTER_QUEUE_POLICY = os.getenv("TWITTER_QUEUE_POLICY", "drop_oldest").lower()
+# With the defaults a message is retried for a bit over an hour
+DELIVERY_MAX_ATTEMPTS = int(os.getenv("DELIVERY_MAX_ATTEMPTS", "20"))
+DELIVERY_RETRY_DELAY_S = float(os.getenv("DELIVERY_RETRY_DELAY_S", "2"))
+DELIVERY_MAX_RETRY_DELAY_S = float(os.getenv("DELIVERY_MAX_RETRY_DELAY_S", "300"))
+OUTBOX_RETENTION_S = float(os.getenv("OUTBOX_RETENTION_S", str(7 * 24 * 60 * 60)))
+OUTBOX_PRUNE_INTERVAL_S = float(os.getenv("OUTBOX_PRUNE_INTERVAL_S", "3600"))
+DISPATCH_DRAIN_TIMEOUT_S = float(os.getenv("DISPATCH_DRAIN_TIMEOUT_S", "3"))
+IMAGE_CACHE_PATH = os.getenv(
+    "IMAGE_CACHE_PATH", os.path.join(os.path.dirname(DB_PATH), "image_cache")
+)
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(200 * 1024**2)))
+SEED_LENDING_CURSOR = os.getenv("SEED_LENDING_CURSOR")
+SEED_RENTING_CURSOR = os.getenv("SEED_RENTING_CURSOR")
+SEED_TIMESTAMP = os.getenv("SEED_TIMESTAMP")
 LOGLEVEL = os.getenv("LOGLEVEL", "INFO").upper()
 F_LOGLEVEL = os.getenv("F_LOGLEVEL", "INFO").upper()
 S_LOGLEVEL = os.getenv("S_LOGLEVEL", "INFO").upper()
@@ -35,13 +108,18 @@ RENFT_BASE_URL = "https://v2.renft.io"
 IPFS_GATEWAY_URL = "https://ipfs.io/ipfs"
 ETHEREUM_ALCHEMY_BASE_URL = f"https://eth-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}"
 POLYGON_ALCHEMY_BASE_URL = f"https://polygon-mainnet.g.alchemy.com/v2/{ALCHEMY_API_KEY}"
-SLEEP_TIME_S = 20
 DEFAULT_PAGE_SIZE = 100
+ALCHEMY_BATCH_SIZE = 100
+NFT_PREFETCH_CONCURRENCY = 8
+NFT_PROVIDER_WORKERS = 16
 
 PRICE_BITSIZE = 32
 HALF_BITSIZE = 16
 BITSIZE_MAX_VALUE = 32
 MAX_PRICE = 9999.9999
+DISCORD_MAX_EMBEDS_LENGTH = 6000
+DISCORD_MAX_RETRY_AFTER_S = 60
+TWITTER_MAX_IMAGE_BYTES = 5 * 1024**2
 NUM_BITS_IN_BYTE = 8
 ZEROS = "0" * 256
 
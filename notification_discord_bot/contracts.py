@@ -1,31 +1,50 @@
-from functools import partial
-from typing import Any, ClassVar
+import time
+from abc import abstractmethod
+from typing import Any, Callable, ClassVar, Iterable, Iterator, Optional
 
 from notification_discord_bot.constants import (
     AVALANCHE_WHOOPI_CONTRACT_NAME,
+    AVALANCHE_WHOOPI_SUBGRAPH_TIMEOUT_S,
     AVALANCHE_WHOOPI_SUBGRAPH_URL,
     DEFAULT_PAGE_SIZE,
     ETHEREUM_AZRAEL_CONTRACT_NAME,
+    ETHEREUM_AZRAEL_SUBGRAPH_TIMEOUT_S,
     ETHEREUM_AZRAEL_SUBGRAPH_URL,
     ETHEREUM_SYLVESTER_CONTRACT_NAME,
+    ETHEREUM_SYLVESTER_SUBGRAPH_TIMEOUT_S,
     ETHEREUM_SYLVESTER_SUBGRAPH_URL,
     MATIC_SYLVESTER_CONTRACT_NAME,
+    MATIC_SYLVESTER_SUBGRAPH_TIMEOUT_S,
     MATIC_SYLVESTER_SUBGRAPH_URL,
 )
-from notification_discord_bot.currency import format_fixed, unpack_price
+from notification_discord_bot.currency import Amount, unpack_price_amount
 from notification_discord_bot.data import ReNFTLendingDatum, ReNFTRentingDatum
-from notification_discord_bot.nft import get_nft
 from notification_discord_bot.queries import (
     AZRAEL_GET_LENDINGS_QUERY,
     AZRAEL_GET_RENTINGS_QUERY,
+    AZRAEL_HISTORY_RENTINGS_QUERY,
+    AZRAEL_SYNC_LENDINGS_QUERY,
+    AZRAEL_SYNC_QUERY,
+    AZRAEL_SYNC_RENTINGS_QUERY,
+    LENDING_CURSOR_AT_QUERY,
+    RENTING_CURSOR_AT_QUERY,
     SYLVESTER_GET_LENDINGS_QUERY,
     SYLVESTER_GET_RENTINGS_QUERY,
+    SYLVESTER_HISTORY_RENTINGS_QUERY,
+    SYLVESTER_SYNC_LENDINGS_QUERY,
+    SYLVESTER_SYNC_QUERY,
+    SYLVESTER_SYNC_RENTINGS_QUERY,
     WHOOPI_GET_LENDINGS_QUERY,
     WHOOPI_GET_RENTINGS_QUERY,
+    WHOOPI_HISTORY_RENTINGS_QUERY,
+    WHOOPI_SYNC_LENDINGS_QUERY,
+    WHOOPI_SYNC_QUERY,
+    WHOOPI_SYNC_RENTINGS_QUERY,
 )
 from notification_discord_bot.renft import (
     Chain,
     Lending,
+    NFTKey,
     PaymentToken,
     ReNFTContract,
     ReNFTDatum,
@@ -33,7 +52,12 @@ from notification_discord_bot.renft import (
     TransactionType,
 )
 from notification_discord_bot.resolvers import RESOLVERS, PaymentTokenDetails
-from notification_discord_bot.utils import query_the_graph
+from notification_discord_bot.tracing import tracer
+from notification_discord_bot.utils import (
+    paginate_the_graph,
+    paginate_the_graph_entities,
+    query_the_graph,
+)
 
 
 def resolve_payment_token_details(
@@ -42,24 +66,149 @@ def resolve_payment_token_details(
     return RESOLVERS[contract.name][token]
 
 
+def traced(
+    transform: Callable[[dict[str, Any]], ReNFTDatum], rows: Iterable[dict[str, Any]]
+) -> Iterator[ReNFTDatum]:
+    for row in rows:
+        start_ns = time.time_ns()
+        renft_datum = transform(row)
+        tracer.record([renft_datum.trace_id], "transform", start_ns, time.time_ns())
+        yield renft_datum
+
+
 def contract_is_enabled(contract: ReNFTContract) -> bool:
     return contract.query_url is not None and contract.query_url != ""
 
 
-class AzraelContract(ReNFTContract):
+def get_cursor_at(
+    contract: ReNFTContract, transaction_type: TransactionType, timestamp: int
+) -> Optional[Any]:
+    if transaction_type == TransactionType.LEND:
+        query, entity = LENDING_CURSOR_AT_QUERY, "lendings"
+    else:
+        query, entity = RENTING_CURSOR_AT_QUERY, "rentings"
+    data = query_the_graph(
+        contract.query_url,
+        query,
+        timeout=contract.query_timeout,
+        contract_name=contract.name,
+        timestamp=str(timestamp),
+    )
+    rows = data.get("data", {}).get(entity, [])
+    return rows[0]["cursor"] if rows else None
+
+
+class SubgraphContract(ReNFTContract):
+    # The contract families only differ in their queries and in how rows are
+    # transformed, so each sets the queries and the paging is shared here.
+    get_lendings_query: ClassVar[str]
+    get_rentings_query: ClassVar[str]
+    sync_lendings_query: ClassVar[str]
+    sync_rentings_query: ClassVar[str]
+    history_rentings_query: ClassVar[str]
+    sync_query: ClassVar[str]
+
+    @abstractmethod
+    def transform_lending(self, lending: dict[str, Any]) -> ReNFTLendingDatum:
+        pass
+
+    @abstractmethod
+    def transform_renting(self, renting: dict[str, Any]) -> ReNFTRentingDatum:
+        pass
+
+    def get_lendings(self, page=0) -> list[ReNFTDatum]:
+        data = query_the_graph(
+            self.query_url,
+            self.get_lendings_query,
+            timeout=self.query_timeout,
+            contract_name=self.name,
+            first=DEFAULT_PAGE_SIZE,
+            skip=page * DEFAULT_PAGE_SIZE,
+        )
+        lendings = data.get("data", {}).get("lendings", [])
+        return list(traced(self.transform_lending, lendings))
+
+    def get_rentings(self, page=0) -> list[ReNFTDatum]:
+        data = query_the_graph(
+            self.query_url,
+            self.get_rentings_query,
+            timeout=self.query_timeout,
+            contract_name=self.name,
+            first=DEFAULT_PAGE_SIZE,
+            skip=page * DEFAULT_PAGE_SIZE,
+        )
+        rentings = data.get("data", {}).get("rentings", [])
+        return list(traced(self.transform_renting, rentings))
+
+    def iter_lendings_since(self, cursor) -> Iterator[ReNFTDatum]:
+        lendings = paginate_the_graph(
+            self.query_url,
+            self.sync_lendings_query,
+            "lendings",
+            cursor,
+            timeout=self.query_timeout,
+            contract_name=self.name,
+        )
+        return traced(self.transform_lending, lendings)
+
+    def get_lendings_since(self, cursor) -> list[ReNFTDatum]:
+        return list(self.iter_lendings_since(cursor))
+
+    def iter_rentings_since(
+        self, cursor, include_expired=False
+    ) -> Iterator[ReNFTDatum]:
+        rentings = paginate_the_graph(
+            self.query_url,
+            self.history_rentings_query
+            if include_expired
+            else self.sync_rentings_query,
+            "rentings",
+            cursor,
+            timeout=self.query_timeout,
+            contract_name=self.name,
+        )
+        return traced(self.transform_renting, rentings)
+
+    def get_rentings_since(self, cursor) -> list[ReNFTDatum]:
+        return list(self.iter_rentings_since(cursor))
+
+    def get_updates_since(
+        self, lending_cursor, renting_cursor
+    ) -> tuple[list[ReNFTDatum], list[ReNFTDatum]]:
+        data = paginate_the_graph_entities(
+            self.query_url,
+            self.sync_query,
+            {"lendings": lending_cursor, "rentings": renting_cursor},
+            timeout=self.query_timeout,
+            contract_name=self.name,
+        )
+        return (
+            list(traced(self.transform_lending, data["lendings"])),
+            list(traced(self.transform_renting, data["rentings"])),
+        )
+
+
+class AzraelContract(SubgraphContract):
+    get_lendings_query = AZRAEL_GET_LENDINGS_QUERY
+    get_rentings_query = AZRAEL_GET_RENTINGS_QUERY
+    sync_lendings_query = AZRAEL_SYNC_LENDINGS_QUERY
+    sync_rentings_query = AZRAEL_SYNC_RENTINGS_QUERY
+    history_rentings_query = AZRAEL_HISTORY_RENTINGS_QUERY
+    sync_query = AZRAEL_SYNC_QUERY
+
     def transform_lending(self, lending: dict[str, Any]) -> ReNFTLendingDatum:
         transaction_type = TransactionType.LEND
-        nft = partial(get_nft, lending["nftAddress"], lending["tokenId"], self.chain())
+        nft_key = NFTKey(lending["nftAddress"], lending["tokenId"], self.chain())
         _lending = Lending(
             cursor=lending["cursor"],
-            nft=nft,
+            nft_key=nft_key,
             lending_id=int(lending["id"]),
             lender_address=lending["lenderAddress"],
             max_rent_duration=lending["maxRentDuration"],
-            daily_rent_price=unpack_price(lending["dailyRentPrice"]),
+            daily_rent_price=unpack_price_amount(lending["dailyRentPrice"]),
             lent_amount=lending["lentAmount"],
             payment_token=PaymentToken(int(lending["paymentToken"])),
-            collateral=unpack_price(lending["nftPrice"]),
+            collateral=unpack_price_amount(lending["nftPrice"]),
             lent_at=lending["lentAt"],
             upfront_rent_fee=None,
             revshare_beneficiaries=None,
@@ -69,23 +218,22 @@ class AzraelContract(ReNFTContract):
 
     def transform_renting(self, renting: dict[str, Any]) -> ReNFTRentingDatum:
         transaction_type = TransactionType.RENT
-        nft = partial(
-            get_nft,
+        nft_key = NFTKey(
             renting["lending"]["nftAddress"],
             renting["lending"]["tokenId"],
             self.chain(),
         )
         _renting = Renting(
             cursor=renting["cursor"],
-            nft=nft,
+            nft_key=nft_key,
             lending_id=renting["lending"]["id"],
             renting_id=renting["id"],
             renter_address=renting["renterAddress"],
             rent_duration=renting["rentDuration"],
             rented_at=renting["rentedAt"],
             payment_token=PaymentToken(int(renting["lending"]["paymentToken"])),
-            collateral=unpack_price(renting["lending"]["nftPrice"]),
-            daily_rent_price=unpack_price(renting["lending"]["dailyRentPrice"]),
+            collateral=unpack_price_amount(renting["lending"]["nftPrice"]),
+            daily_rent_price=unpack_price_amount(renting["lending"]["dailyRentPrice"]),
             lender_address=renting["lending"]["lenderAddress"],
             upfront_rent_fee=None,
             revshare_beneficiaries=None,
@@ -93,35 +241,28 @@ class AzraelContract(ReNFTContract):
         )
         return ReNFTRentingDatum(self, transaction_type, _renting)
 
-    def get_lendings(self, page=0) -> list[ReNFTDatum]:
-        data = query_the_graph(
-            self.query_url, AZRAEL_GET_LENDINGS_QUERY, skip=page * DEFAULT_PAGE_SIZE
-        )
-        lendings = data.get("data", {}).get("lendings", [])
-        return [self.transform_lending(l) for l in lendings]
-
-    def get_rentings(self, page=0) -> list[ReNFTDatum]:
-        data = query_the_graph(
-            self.query_url, AZRAEL_GET_RENTINGS_QUERY, skip=page * DEFAULT_PAGE_SIZE
-        )
-        rentings = data.get("data", {}).get("rentings", [])
-        return [self.transform_renting(r) for r in rentings]
-
     def is_collateral_free(self) -> bool:
         return False
 
 
-class SylvesterContract(ReNFTContract):
+class SylvesterContract(SubgraphContract):
+    get_lendings_query = SYLVESTER_GET_LENDINGS_QUERY
+    get_rentings_query = SYLVESTER_GET_RENTINGS_QUERY
+    sync_lendings_query = SYLVESTER_SYNC_LENDINGS_QUERY
+    sync_rentings_query = SYLVESTER_SYNC_RENTINGS_QUERY
+    history_rentings_query = SYLVESTER_HISTORY_RENTINGS_QUERY
+    sync_query = SYLVESTER_SYNC_QUERY
+
     def transform_lending(self, lending: dict[str, Any]) -> ReNFTLendingDatum:
         transaction_type = TransactionType.LEND
-        nft = partial(get_nft, lending["nftAddress"], lending["tokenID"], self.chain())
+        nft_key = NFTKey(lending["nftAddress"], lending["tokenID"], self.chain())
         _lending = Lending(
             cursor=lending["cursor"],
-            nft=nft,
+            nft_key=nft_key,
             lending_id=int(lending["id"]),
             lender_address=lending["lenderAddress"],
             max_rent_duration=lending["maxRentDuration"],
-            daily_rent_price=unpack_price(lending["dailyRentPrice"]),
+            daily_rent_price=unpack_price_amount(lending["dailyRentPrice"]),
             lent_amount=lending["lendAmount"],
             payment_token=PaymentToken(int(lending["paymentToken"])),
             collateral=None,
@@ -134,15 +275,14 @@ class SylvesterContract(ReNFTContract):
 
     def transform_renting(self, renting: dict[str, Any]) -> ReNFTRentingDatum:
         transaction_type = TransactionType.RENT
-        nft = partial(
-            get_nft,
+        nft_key = NFTKey(
             renting["lending"]["nftAddress"],
             renting["lending"]["tokenID"],
             self.chain(),
         )
         _renting = Renting(
             cursor=renting["cursor"],
-            nft=nft,
+            nft_key=nft_key,
             lending_id=renting["lending"]["id"],
             renting_id=renting["id"],
             renter_address=renting["renterAddress"],
@@ -150,7 +290,7 @@ class SylvesterContract(ReNFTContract):
             rented_at=renting["rentedAt"],
             payment_token=PaymentToken(int(renting["lending"]["paymentToken"])),
             collateral=None,
-            daily_rent_price=unpack_price(renting["lending"]["dailyRentPrice"]),
+            daily_rent_price=unpack_price_amount(renting["lending"]["dailyRentPrice"]),
             lender_address=renting["lending"]["lenderAddress"],
             upfront_rent_fee=None,
             revshare_beneficiaries=None,
@@ -158,33 +298,26 @@ class SylvesterContract(ReNFTContract):
         )
         return ReNFTRentingDatum(self, transaction_type, _renting)
 
-    def get_lendings(self, page=0) -> list[ReNFTDatum]:
-        data = query_the_graph(
-            self.query_url, SYLVESTER_GET_LENDINGS_QUERY, skip=page * DEFAULT_PAGE_SIZE
-        )
-        lendings = data.get("data", {}).get("lendings", [])
-        return [self.transform_lending(l) for l in lendings]
-
-    def get_rentings(self, page=0) -> list[ReNFTDatum]:
-        data = query_the_graph(
-            self.query_url, SYLVESTER_GET_RENTINGS_QUERY, skip=page * DEFAULT_PAGE_SIZE
-        )
-        rentings = data.get("data", {}).get("rentings", [])
-        return [self.transform_renting(r) for r in rentings]
-
     def is_collateral_free(self) -> bool:
         return True
 
 
-class WhoopiContract(ReNFTContract):
+class WhoopiContract(SubgraphContract):
+    get_lendings_query = WHOOPI_GET_LENDINGS_QUERY
+    get_rentings_query = WHOOPI_GET_RENTINGS_QUERY
+    sync_lendings_query = WHOOPI_SYNC_LENDINGS_QUERY
+    sync_rentings_query = WHOOPI_SYNC_RENTINGS_QUERY
+    history_rentings_query = WHOOPI_HISTORY_RENTINGS_QUERY
+    sync_query = WHOOPI_SYNC_QUERY
+
     def transform_lending(self, lending: dict[str, Any]) -> ReNFTLendingDatum:
         transaction_type = TransactionType.LEND
-        nft = partial(get_nft, lending["nftAddress"], lending["tokenId"], self.chain())
+        nft_key = NFTKey(lending["nftAddress"], lending["tokenId"], self.chain())
         payment_token = PaymentToken(int(lending["paymentToken"]))
         payment_token_details = resolve_payment_token_details(self, payment_token)
         _lending = Lending(
             cursor=lending["cursor"],
-            nft=nft,
+            nft_key=nft_key,
             lending_id=int(lending["id"]),
             lender_address=lending["lenderAddress"],
             max_rent_duration=lending["maxRentDuration"],
@@ -193,10 +326,8 @@ class WhoopiContract(ReNFTContract):
             payment_token=payment_token,
             collateral=None,
             lent_at=lending["lentAt"],
-            upfront_rent_fee=float(
-                format_fixed(
-                    int(lending["upfrontRentFee"]), payment_token_details.scale
-                )
+            upfront_rent_fee=Amount(
+                int(lending["upfrontRentFee"]), payment_token_details.scale
             ),
             revshare_beneficiaries=lending["revShareBeneficiaries"],
             revshare_portions=lending["revSharePortions"],
@@ -205,8 +336,7 @@ class WhoopiContract(ReNFTContract):
 
     def transform_renting(self, renting: dict[str, Any]) -> ReNFTRentingDatum:
         transaction_type = TransactionType.RENT
-        nft = partial(
-            get_nft,
+        nft_key = NFTKey(
             renting["lending"]["nftAddress"],
             renting["lending"]["tokenId"],
             self.chain(),
@@ -215,7 +345,7 @@ class WhoopiContract(ReNFTContract):
         payment_token_details = resolve_payment_token_details(self, payment_token)
         _renting = Renting(
             cursor=renting["cursor"],
-            nft=nft,
+            nft_key=nft_key,
             lending_id=renting["lending"]["id"],
             renting_id=renting["id"],
             renter_address=renting["renterAddress"],
@@ -225,31 +355,14 @@ class WhoopiContract(ReNFTContract):
             collateral=None,
             daily_rent_price=None,
             lender_address=renting["lending"]["lenderAddress"],
-            upfront_rent_fee=float(
-                format_fixed(
-                    int(renting["lending"]["upfrontRentFee"]),
-                    payment_token_details.scale,
-                )
+            upfront_rent_fee=Amount(
+                int(renting["lending"]["upfrontRentFee"]), payment_token_details.scale
             ),
             revshare_beneficiaries=renting["lending"]["revShareBeneficiaries"],
             revshare_portions=renting["lending"]["revSharePortions"],
         )
         return ReNFTRentingDatum(self, transaction_type, _renting)
 
-    def get_lendings(self, page=0) -> list[ReNFTDatum]:
-        data = query_the_graph(
-            self.query_url, WHOOPI_GET_LENDINGS_QUERY, skip=page * DEFAULT_PAGE_SIZE
-        )
-        lendings = data.get("data", {}).get("lendings", [])
-        return [self.transform_lending(l) for l in lendings]
-
-    def get_rentings(self, page=0) -> list[ReNFTDatum]:
-        data = query_the_graph(
-            self.query_url, WHOOPI_GET_RENTINGS_QUERY, skip=page * DEFAULT_PAGE_SIZE
-        )
-        rentings = data.get("data", {}).get("rentings", [])
-        return [self.transform_renting(r) for r in rentings]
-
     def is_collateral_free(self) -> bool:
         return True
 
@@ -257,6 +370,7 @@ class WhoopiContract(ReNFTContract):
 class EthereumAzraelContract(AzraelContract):
     name = ETHEREUM_AZRAEL_CONTRACT_NAME
     query_url: ClassVar[str] = ETHEREUM_AZRAEL_SUBGRAPH_URL
+    query_timeout: ClassVar[float] = ETHEREUM_AZRAEL_SUBGRAPH_TIMEOUT_S
 
     def chain(self) -> Chain:
         return Chain.ETH
@@ -265,6 +379,7 @@ class EthereumAzraelContract(AzraelContract):
 class EthereumSylvesterContract(SylvesterContract):
     name = ETHEREUM_SYLVESTER_CONTRACT_NAME
     query_url: ClassVar[str] = ETHEREUM_SYLVESTER_SUBGRAPH_URL
+    query_timeout: ClassVar[float] = ETHEREUM_SYLVESTER_SUBGRAPH_TIMEOUT_S
 
     def chain(self) -> Chain:
         return Chain.ETH
@@ -273,6 +388,7 @@ class EthereumSylvesterContract(SylvesterContract):
 class MaticSylvesterContract(SylvesterContract):
     name = MATIC_SYLVESTER_CONTRACT_NAME
     query_url: ClassVar[str] = MATIC_SYLVESTER_SUBGRAPH_URL
+    query_timeout: ClassVar[float] = MATIC_SYLVESTER_SUBGRAPH_TIMEOUT_S
 
     def chain(self) -> Chain:
         return Chain.MATIC
@@ -281,12 +397,13 @@ class MaticSylvesterContract(SylvesterContract):
 class AvalancheWhoopiContract(WhoopiContract):
     name = AVALANCHE_WHOOPI_CONTRACT_NAME
     query_url: ClassVar[str] = AVALANCHE_WHOOPI_SUBGRAPH_URL
+    query_timeout: ClassVar[float] = AVALANCHE_WHOOPI_SUBGRAPH_TIMEOUT_S
 
     def chain(self) -> Chain:
         return Chain.AVAX
 
 
-all_contracts = [
+all_contracts: list[ReNFTContract] = [
     EthereumAzraelContract(),
     EthereumSylvesterContract(),
     MaticSylvesterContract(),
@@ -1,5 +1,6 @@
 import math
-import re
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
 
 from notification_discord_bot.constants import (
     BITSIZE_MAX_VALUE,
@@ -7,9 +8,13 @@ from notification_discord_bot.constants import (
     MAX_PRICE,
     NUM_BITS_IN_BYTE,
     PRICE_BITSIZE,
-    ZEROS,
 )
 
+PRICE_HEX_DIGITS = PRICE_BITSIZE // 4
+# Packed prices have 4 decimal digits
+PRICE_SCALE = 4
+POWERS_OF_TEN = tuple(10**i for i in range(257))
+
 
 def decimal_to_padded_hex_string(number: int, bitsize: int) -> str:
     byte_count = math.ceil(bitsize / 8)
@@ -73,60 +78,58 @@ def pack_price(price: str | float) -> str:
     return whole_hex + to_padded_hex(int(decimal), HALF_BITSIZE)[2:]
 
 
-def unpack_price(price: str) -> float:
-    num_hex = decimal_to_padded_hex_string(int(price, 16), PRICE_BITSIZE)[2:]
-    whole = min(int(num_hex[0:4], 16), 9999)
-    decimal = min(int(num_hex[4:], 16), 9999)
+def unpack_price_raw(number: int) -> int:
+    if number < 0:
+        number += 1 << PRICE_BITSIZE
+        if number < 0:
+            raise ValueError("Number below minimum value")
+    # The whole part is the top 16 bits and the decimal part, in ten
+    # thousandths, the rest. Wider values keep their leading 4 hex digits whole.
+    shift = max((number.bit_length() + 3) // 4, PRICE_HEX_DIGITS) * 4 - HALF_BITSIZE
+    whole = min(number >> shift, 9999)
+    decimal = min(number & ((1 << shift) - 1), 9999)
+    return whole * POWERS_OF_TEN[PRICE_SCALE] + decimal
 
-    decimal_str = str(decimal)
-    MAX_LEN = 4
-    for _ in range(0, MAX_LEN - len(decimal_str)):
-        decimal_str = "0" + decimal_str
 
-    return float(f"{whole}.{decimal_str}")
+def unpack_price_int(number: int) -> float:
+    # Both ints are exact, so the division rounds the same as parsing the
+    # "whole.decimal" string would.
+    return unpack_price_raw(number) / POWERS_OF_TEN[PRICE_SCALE]
 
 
-def get_multiplier(decimals: int) -> str:
-    if 0 <= decimals <= 256 and not decimals % 1:
-        return "1" + ZEROS[0:decimals]
-    raise ValueError(f"Invalid decimal size: {decimals}")
+def unpack_price(price: str) -> float:
+    return unpack_price_int(int(price, 16))
 
 
-def format_fixed(value: int, decimals: int = 0) -> str:
-    multiplier = get_multiplier(decimals)
+def unpack_price_amount(price: str) -> "Amount":
+    return Amount(unpack_price_raw(int(price, 16)), PRICE_SCALE)
 
-    negative = value < 0
-    if negative:
-        value = value * -1
 
-    fraction = str(value % int(multiplier))
-    while len(fraction) < len(multiplier) - 1:
-        fraction = "0" + fraction
+def unpack_prices(prices: Iterable[str]) -> list[float]:
+    return [unpack_price_int(int(price, 16)) for price in prices]
 
-    # Strip trailing 0
-    pattern = re.compile(r"^([0-9]*[1-9]|0)(0*)")
-    m = pattern.match(fraction)
-    if not m:
-        raise ValueError("Cannot strip trailing zeros: {fraction}")
-    fraction = m.groups()[0]
 
-    whole = str(value // int(multiplier))
+def check_decimals(decimals: int):
+    if not (0 <= decimals <= 256 and not decimals % 1):
+        raise ValueError(f"Invalid decimal size: {decimals}")
 
-    if len(multiplier) == 1:
-        new_value = whole
-    else:
-        new_value = whole + "." + fraction
 
-    if negative:
-        new_value = "-" + new_value
+def format_fixed(value: int, decimals: int = 0) -> str:
+    check_decimals(decimals)
+    whole, fraction = divmod(-value if value < 0 else value, POWERS_OF_TEN[decimals])
+    sign = "-" if value < 0 else ""
+    if decimals == 0:
+        return f"{sign}{whole}"
+    return f"{sign}{whole}.{str(fraction).rjust(decimals, '0').rstrip('0') or '0'}"
+
 
-    return new_value
+def format_fixeds(values: Iterable[int], decimals: int = 0) -> list[str]:
+    return [format_fixed(value, decimals) for value in values]
 
 
 def parse_fixed(value: str, decimals: int = 0) -> int:
-    multiplier = get_multiplier(decimals)
+    check_decimals(decimals)
 
-    # Is it negative?
     negative = value[0] == "-"
     if negative:
         value = value[1:]
@@ -134,36 +137,34 @@ def parse_fixed(value: str, decimals: int = 0) -> int:
     if value == ".":
         raise ValueError(f"Missing value: {value}")
 
-    # Split it into a whole and fractional part
-    comps = value.split(".")
-    if len(comps) > 2:
+    whole, _, fraction = value.partition(".")
+    if "." in fraction:
         raise ValueError(f"Too many decimal points: {value}")
 
-    whole = comps[0] if len(comps) >= 1 else "0"
-    fraction = comps[1] if len(comps) == 2 else "0"
-
-    # Trim trailing zeros
-    while len(fraction) > 0 and fraction[-1] == "0":
-        fraction = fraction[0 : len(fraction) - 1]
-
-    # Check the fraction doesn't exceed our decimals size
-    if len(fraction) > len(multiplier) - 1:
+    fraction = fraction.rstrip("0")
+    if len(fraction) > decimals:
         raise ValueError("Fractional component exceeds decimals: underflow")
 
-    # If decimals is 0, we have an empty string for fraction
-    if fraction == "":
-        fraction = "0"
+    wei = int(whole) * POWERS_OF_TEN[decimals] + int(
+        fraction.ljust(decimals, "0") or "0"
+    )
+    return -wei if negative else wei
 
-    # Fully pad the string with zeros to get to wei
-    while len(fraction) < len(multiplier) - 1:
-        fraction += "0"
 
-    whole_value = int(whole)
-    fraction_value = int(fraction)
+def parse_fixeds(values: Iterable[str], decimals: int = 0) -> list[int]:
+    return [parse_fixed(value, decimals) for value in values]
 
-    wei = (whole_value * int(multiplier)) + fraction_value
 
-    if negative:
-        wei = wei * -1
+@dataclass(frozen=True, slots=True)
+class Amount:
+    # Exactly raw / 10**scale, where scale is the payment token's decimals
+    raw: int
+    scale: int
+    # Formatted on first use and reused by every message built from it
+    text: Optional[str] = field(default=None, init=False, repr=False, compare=False)
 
-    return wei
+    def __str__(self) -> str:
+        if (text := self.text) is None:
+            text = format_fixed(self.raw, self.scale)
+            object.__setattr__(self, "text", text)
+        return text
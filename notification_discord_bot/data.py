@@ -1,11 +1,14 @@
-from operator import attrgetter
+from dataclasses import fields
+from typing import Any
 
 import discord
 
 from notification_discord_bot.constants import TwitterMessage
-from notification_discord_bot.models import ReNFTModel
+from notification_discord_bot.currency import Amount
+from notification_discord_bot.nft import get_nft
 from notification_discord_bot.renft import (
     Lending,
+    NFTKey,
     ReNFTContract,
     ReNFTDatum,
     Renting,
@@ -15,9 +18,20 @@ from notification_discord_bot.renft import (
     get_profile_url,
     get_rent_duration_unit,
 )
+from notification_discord_bot.watermarks import watermarks
+
+
+def record_to_dict(record: Lending | Renting) -> dict[str, Any]:
+    # Amounts are exported as their exact decimal string
+    return {
+        f.name: str(v) if isinstance(v := getattr(record, f.name), Amount) else v
+        for f in fields(record)
+    }
 
 
 class ReNFTLendingDatum(ReNFTDatum):
+    __slots__ = ("lending",)
+
     def __init__(
         self,
         contract: ReNFTContract,
@@ -27,8 +41,20 @@ class ReNFTLendingDatum(ReNFTDatum):
         super().__init__(contract, transaction_type)
         self.lending = lending
 
+    @property
+    def cursor(self):
+        return self.lending.cursor
+
+    @property
+    def nft_key(self) -> NFTKey:
+        return self.lending.nft_key
+
+    @property
+    def timestamp(self) -> int:
+        return int(self.lending.lent_at)
+
     def build_discord_message(self):
-        nft = self.lending.nft()
+        nft = get_nft(*self.lending.nft_key)
         rent_duration_unit = get_rent_duration_unit(self.contract)
         profile_url = get_profile_url(self.contract, self.lending.lender_address)
 
@@ -83,7 +109,7 @@ class ReNFTLendingDatum(ReNFTDatum):
         return msg
 
     def build_twitter_message(self):
-        nft = self.lending.nft()
+        nft = get_nft(*self.lending.nft_key)
         rent_duration_unit = get_rent_duration_unit(self.contract)
 
         if self.lending.daily_rent_price is not None:
@@ -114,23 +140,25 @@ class ReNFTLendingDatum(ReNFTDatum):
         return TwitterMessage(msg, nft.image_url)
 
     def has_been_observed(self) -> bool:
-        m = ReNFTModel.get_or_none(
-            contract_name=self.contract.name,
-            transaction_type=TransactionType.LEND,
-        )
-
-        return m is not None and self.lending.cursor <= attrgetter("renft_id")(m)
+        cursor = watermarks.get(self.contract.name, TransactionType.LEND)
+        return cursor is not None and self.lending.cursor <= cursor
 
     def observe(self):
-        if not self.has_been_observed():
-            ReNFTModel.update_or_create(
-                contract_name=self.contract.name,
-                transaction_type=TransactionType.LEND,
-                defaults={"renft_id": self.lending.cursor},
-            )
+        watermarks.advance(
+            self.contract.name, TransactionType.LEND, self.lending.cursor
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "contract": self.contract.name,
+            "transaction_type": self.transaction_type.value,
+            **record_to_dict(self.lending),
+        }
 
 
 class ReNFTRentingDatum(ReNFTDatum):
+    __slots__ = ("renting",)
+
     def __init__(
         self,
         contract: ReNFTContract,
@@ -140,8 +168,20 @@ class ReNFTRentingDatum(ReNFTDatum):
         super().__init__(contract, transaction_type)
         self.renting = renting
 
+    @property
+    def cursor(self):
+        return self.renting.cursor
+
+    @property
+    def nft_key(self) -> NFTKey:
+        return self.renting.nft_key
+
+    @property
+    def timestamp(self) -> int:
+        return int(self.renting.rented_at)
+
     def build_discord_message(self):
-        nft = self.renting.nft()
+        nft = get_nft(*self.renting.nft_key)
         rent_duration_unit = get_rent_duration_unit(self.contract)
         profile_url = get_profile_url(self.contract, self.renting.renter_address)
 
@@ -198,7 +238,7 @@ class ReNFTRentingDatum(ReNFTDatum):
         return msg
 
     def build_twitter_message(self):
-        nft = self.renting.nft()
+        nft = get_nft(*self.renting.nft_key)
         rent_duration_unit = get_rent_duration_unit(self.contract)
         if self.renting.daily_rent_price is not None:
             rent_price = self.renting.daily_rent_price
@@ -227,16 +267,17 @@ class ReNFTRentingDatum(ReNFTDatum):
         return TwitterMessage(msg, nft.image_url)
 
     def has_been_observed(self) -> bool:
-        m = ReNFTModel.get_or_none(
-            contract_name=self.contract.name,
-            transaction_type=TransactionType.RENT,
-        )
-        return m is not None and self.renting.cursor <= attrgetter("renft_id")(m)
+        cursor = watermarks.get(self.contract.name, TransactionType.RENT)
+        return cursor is not None and self.renting.cursor <= cursor
 
     def observe(self):
-        if not self.has_been_observed():
-            ReNFTModel.update_or_create(
-                contract_name=self.contract.name,
-                transaction_type=TransactionType.RENT,
-                defaults={"renft_id": self.renting.cursor},
-            )
+        watermarks.advance(
+            self.contract.name, TransactionType.RENT, self.renting.cursor
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "contract": self.contract.name,
+            "transaction_type": self.transaction_type.value,
+            **record_to_dict(self.renting),
+        }
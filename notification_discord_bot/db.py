@@ -1,16 +1,18 @@
 import json
-from abc import ABC
-from dataclasses import asdict, dataclass
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, fields
 from os.path import exists
+from typing import Any, Iterator, Optional
 
-from notification_discord_bot.constants import DB_PATH
+from notification_discord_bot.constants import DB_BACKEND, DB_PATH, SQLITE_DB_PATH
+from notification_discord_bot.logger import logger
+from notification_discord_bot.metrics import DB_READS, DB_WRITES
 
-
-def get_collection(coll_name: str):
-    with open(DB_PATH, "r") as f:
-        d = json.load(f)
-        coll = d.get(coll_name)
-    return coll
+SCHEMA_VERSION = 1
 
 
 def document_matches_builder(**kwargs):
@@ -20,6 +22,252 @@ def document_matches_builder(**kwargs):
     return document_matches
 
 
+def all_models() -> list[type["Model"]]:
+    # pylint: disable=unused-import,import-outside-toplevel,cyclic-import
+    from notification_discord_bot import models
+
+    return Model.__subclasses__()
+
+
+class StorageBackend(ABC):
+    @abstractmethod
+    def is_initialized(self) -> bool:
+        pass
+
+    @abstractmethod
+    def initialize(self):
+        pass
+
+    @abstractmethod
+    def find(self, model: type["Model"], **kwargs) -> list[dict[str, Any]]:
+        pass
+
+    @abstractmethod
+    def upsert(self, model: type["Model"], doc: dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def delete(self, model: type["Model"], **kwargs):
+        pass
+
+    @abstractmethod
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        yield
+
+
+class JSONBackend(StorageBackend):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._pending: Optional[dict[str, list[dict[str, Any]]]] = None
+
+    def _read(self) -> dict[str, list[dict[str, Any]]]:
+        if self._pending is not None:
+            return self._pending
+        with open(self.path, "r") as f:
+            return json.load(f)
+
+    def _write(self, d: dict[str, list[dict[str, Any]]]):
+        if self._pending is not None:
+            return
+        # Write to a sibling file and rename it over the original so a crash
+        # mid-write never leaves a truncated document behind.
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(d, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.path)
+
+    def is_initialized(self) -> bool:
+        return exists(self.path)
+
+    def initialize(self):
+        self._write({model.collection_name(): [] for model in all_models()})
+
+    def find(self, model: type["Model"], **kwargs) -> list[dict[str, Any]]:
+        with self._lock:
+            coll = self._read().get(model.collection_name(), [])
+        return [doc for doc in coll if document_matches_builder(**kwargs)(doc)]
+
+    def upsert(self, model: type["Model"], doc: dict[str, Any]):
+        key = {k: doc[k] for k in model.unique_index()}
+        with self._lock:
+            d = self._read()
+            coll = d.get(model.collection_name(), [])
+            coll = [c for c in coll if not document_matches_builder(**key)(c)]
+            coll.append(doc)
+            d[model.collection_name()] = coll
+            self._write(d)
+
+    def delete(self, model: type["Model"], **kwargs):
+        with self._lock:
+            d = self._read()
+            coll = d.get(model.collection_name(), [])
+            d[model.collection_name()] = [
+                c for c in coll if not document_matches_builder(**kwargs)(c)
+            ]
+            self._write(d)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            if self._pending is not None:
+                yield
+                return
+            self._pending = self._read()
+            try:
+                yield
+                d = self._pending
+                self._pending = None
+                self._write(d)
+            finally:
+                self._pending = None
+
+
+class SQLiteBackend(StorageBackend):
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._tables: set[str] = set()
+        self._depth = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        return self._conn
+
+    def _ensure_table(self, model: type["Model"]):
+        table = model.collection_name()
+        if table in self._tables:
+            return
+        columns = ", ".join(f'"{f.name}"' for f in fields(model))
+        index = ", ".join(f'"{name}"' for name in sorted(model.unique_index()))
+        self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{table}" ({columns})')
+        self.conn.execute(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS "{table}_unique" '
+            f'ON "{table}" ({index})'
+        )
+        self._tables.add(table)
+
+    def is_initialized(self) -> bool:
+        # The file alone isn't enough: connecting creates it before the
+        # tables and the JSON migration are committed.
+        if not exists(self.path):
+            return False
+        with self._lock:
+            (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        return version >= SCHEMA_VERSION
+
+    def initialize(self):
+        # Tables, migrated documents and the version marker commit together,
+        # so an interrupted migration is simply run again on the next start.
+        try:
+            with self.transaction():
+                for model in all_models():
+                    self._ensure_table(model)
+                if exists(DB_PATH):
+                    migrate_from_json(DB_PATH, self)
+                self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        except BaseException:
+            self._tables.clear()
+            raise
+
+    def find(self, model: type["Model"], **kwargs) -> list[dict[str, Any]]:
+        names = [f.name for f in fields(model)]
+        if unknown := set(kwargs) - set(names):
+            raise AssertionError(f"Unknown fields {unknown} for {model.__name__}.")
+        columns = ", ".join(f'"{name}"' for name in names)
+        where = " AND ".join(f'"{k}" = ?' for k in kwargs) or "1"
+        with self._lock:
+            self._ensure_table(model)
+            rows = self.conn.execute(
+                f'SELECT {columns} FROM "{model.collection_name()}" '
+                f"WHERE {where} ORDER BY rowid",
+                tuple(kwargs.values()),
+            ).fetchall()
+        return [dict(zip(names, row)) for row in rows]
+
+    def upsert(self, model: type["Model"], doc: dict[str, Any]):
+        names = list(doc)
+        columns = ", ".join(f'"{name}"' for name in names)
+        placeholders = ", ".join("?" for _ in names)
+        conflict = ", ".join(f'"{name}"' for name in sorted(model.unique_index()))
+        updates = ", ".join(
+            f'"{name}" = excluded."{name}"'
+            for name in names
+            if name not in model.unique_index()
+        )
+        on_conflict = f"DO UPDATE SET {updates}" if updates else "DO NOTHING"
+        with self._lock:
+            self._ensure_table(model)
+            self.conn.execute(
+                f'INSERT INTO "{model.collection_name()}" ({columns}) '
+                f"VALUES ({placeholders}) ON CONFLICT ({conflict}) {on_conflict}",
+                tuple(doc.values()),
+            )
+
+    def delete(self, model: type["Model"], **kwargs):
+        where = " AND ".join(f'"{k}" = ?' for k in kwargs)
+        with self._lock:
+            self._ensure_table(model)
+            self.conn.execute(
+                f'DELETE FROM "{model.collection_name()}" WHERE {where}',
+                tuple(kwargs.values()),
+            )
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("COMMIT")
+
+
+def create_backend(name: str) -> StorageBackend:
+    if name == "json":
+        return JSONBackend(DB_PATH)
+    if name == "sqlite":
+        return SQLiteBackend(SQLITE_DB_PATH)
+    raise ValueError(f"Unknown DB_BACKEND: {name}")
+
+
+backend = create_backend(DB_BACKEND)
+
+
+def get_backend() -> StorageBackend:
+    return backend
+
+
+def migrate_from_json(json_path: str, target: StorageBackend):
+    with open(json_path, "r") as f:
+        d = json.load(f)
+    with target.transaction():
+        for model in all_models():
+            docs = d.get(model.collection_name(), [])
+            for doc in docs:
+                target.upsert(model, doc)
+            logger.info(
+                f"Migrated {len(docs)} {model.collection_name()} documents "
+                f"from {json_path}"
+            )
+
+
 @dataclass
 class Model(ABC):
     @classmethod
@@ -39,8 +287,8 @@ class Model(ABC):
 
     @classmethod
     def filter(cls, **kwargs):  # -> list[Self] awaiting 3.11 for typing
-        coll = get_collection(cls.collection_name())
-        return [cls(**doc) for doc in coll if document_matches_builder(**kwargs)(doc)]
+        DB_READS.inc(collection=cls.collection_name())
+        return [cls(**doc) for doc in get_backend().find(cls, **kwargs)]
 
     @classmethod
     def get_or_none(cls, **kwargs):  # -> Optional[Self] awaiting 3.11 for typing
@@ -55,35 +303,29 @@ class Model(ABC):
     @classmethod
     def update_or_create(cls, defaults=None, **kwargs):
         cls.assert_kwargs_are_unique(**kwargs)
-        coll = get_collection(cls.collection_name())
-        existing_doc = cls.get_or_none(**kwargs)
         if defaults is None:
             defaults = {}
-        if existing_doc is not None:
-            new_doc = asdict(existing_doc)
-            for (key, value) in defaults.items():
-                new_doc[key] = value
-            coll = [doc for doc in coll if not document_matches_builder(**kwargs)(doc)]
-        else:
-            new_doc = asdict(cls(**kwargs, **defaults))
-        coll.append(new_doc)
-        with open(DB_PATH, "r") as f:
-            d = json.load(f)
-            d[cls.collection_name()] = coll
-
-        with open(DB_PATH, "w") as f:
-            json.dump(d, f, ensure_ascii=False, indent=4)
+        with get_backend().transaction():
+            existing_doc = cls.get_or_none(**kwargs)
+            if existing_doc is not None:
+                new_doc = asdict(existing_doc)
+                for (key, value) in defaults.items():
+                    new_doc[key] = value
+            else:
+                new_doc = asdict(cls(**kwargs, **defaults))
+            get_backend().upsert(cls, new_doc)
+            DB_WRITES.inc(collection=cls.collection_name())
+
+    @classmethod
+    def delete(cls, **kwargs):
+        cls.assert_kwargs_are_unique(**kwargs)
+        get_backend().delete(cls, **kwargs)
+        DB_WRITES.inc(collection=cls.collection_name())
 
 
 def is_initialized() -> bool:
-    return exists(DB_PATH)
+    return get_backend().is_initialized()
 
 
 def initialize():
-    with open(DB_PATH, "w") as f:
-        # pylint: disable=unused-import,import-outside-toplevel,cyclic-import
-        from notification_discord_bot import models
-
-        all_models = Model.__subclasses__()
-        d = {model.collection_name(): [] for model in all_models}
-        json.dump(d, f, ensure_ascii=False, indent=4)
+    get_backend().initialize()
@@ -0,0 +1,199 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from enum import Enum, unique
+from typing import Any, Callable, Optional
+
+from notification_discord_bot.logger import logger
+from notification_discord_bot.metrics import DELIVERY_SECONDS
+
+MAX_BACKOFF_EXPONENT = 16
+
+
+@unique
+class DropPolicy(str, Enum):
+    BLOCK = "block"
+    DROP_NEWEST = "drop_newest"
+    DROP_OLDEST = "drop_oldest"
+
+
+@dataclass
+class Batching:
+    max_size: int
+    window_s: float
+    weight: Callable[[Any], int] = lambda _: 0
+    # 0 means the batch weight is unbounded
+    max_weight: int = 0
+
+
+class DaemonThreadExecutor(Executor):
+    # Runs each call in its own daemon thread. asyncio.to_thread's default
+    # executor and ThreadPoolExecutor are both joined when the process exits,
+    # so a send stuck waiting, like tweepy sleeping through a rate limit,
+    # would hang shutdown; an abandoned daemon thread doesn't.
+    def __init__(self, name: str):
+        self.name = name
+
+    def submit(self, fn, /, *args, **kwargs):
+        future: Future = Future()
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=self.name, daemon=True).start()
+        return future
+
+
+class Destination:
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        name: str,
+        send: Callable[[Any], None],
+        maxsize: int,
+        policy: DropPolicy,
+        max_attempts: int = 1,
+        retry_delay_s: float = 0,
+        on_give_up: Optional[Callable[[Any], None]] = None,
+        batching: Optional[Batching] = None,
+        on_drop: Optional[Callable[[Any], None]] = None,
+        max_retry_delay_s: float = float("inf"),
+    ):
+        self.name = name
+        self.send = send
+        self.policy = policy
+        self.max_attempts = max_attempts
+        self.retry_delay_s = retry_delay_s
+        self.max_retry_delay_s = max_retry_delay_s
+        self.on_give_up = on_give_up
+        self.on_drop = on_drop
+        self.batching = batching
+        self._carry: Optional[Any] = None
+        self.queue: asyncio.Queue[Any] = asyncio.Queue(maxsize)
+        self.dropped = 0
+        self.task: Optional[asyncio.Task[None]] = None
+        self.executor = DaemonThreadExecutor(f"send-{name}")
+
+    async def put(self, msg: Any):
+        if self.policy == DropPolicy.BLOCK or not self.queue.full():
+            await self.queue.put(msg)
+            return
+        self.dropped += 1
+        if self.policy == DropPolicy.DROP_NEWEST:
+            logger.warning(f"{self.name} queue is full, dropping newest message.")
+            dropped = msg
+        else:
+            logger.warning(f"{self.name} queue is full, dropping oldest message.")
+            dropped = self.queue.get_nowait()
+            self.queue.task_done()
+            self.queue.put_nowait(msg)
+        if self.on_drop is not None:
+            await asyncio.to_thread(self.on_drop, dropped)
+
+    async def work(self):
+        # A single worker per destination keeps messages in the order they
+        # were enqueued. Sends are blocking, so they run in a daemon thread.
+        while True:
+            if self.batching is None:
+                msgs = [await self.queue.get()]
+            else:
+                msgs = await self.collect_batch(self.batching)
+            try:
+                await self.deliver(msgs if self.batching is not None else msgs[0])
+            finally:
+                for _ in msgs:
+                    self.queue.task_done()
+
+    async def collect_batch(self, batching: Batching) -> list[Any]:
+        # Whatever becomes ready within the window after the first message is
+        # sent together. A message that would overflow the batch weight is
+        # carried over to start the next batch.
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self.queue.get()
+        batch = [first]
+        weight = batching.weight(first)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + batching.window_s
+        while len(batch) < batching.max_size:
+            remaining = deadline - loop.time()
+            try:
+                if remaining <= 0:
+                    msg = self.queue.get_nowait()
+                else:
+                    msg = await asyncio.wait_for(self.queue.get(), remaining)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            msg_weight = batching.weight(msg)
+            if batching.max_weight and weight + msg_weight > batching.max_weight:
+                self._carry = msg
+                break
+            batch.append(msg)
+            weight += msg_weight
+        return batch
+
+    def retry_delay(self, attempt: int) -> float:
+        return min(
+            self.retry_delay_s * 2 ** min(attempt, MAX_BACKOFF_EXPONENT),
+            self.max_retry_delay_s,
+        )
+
+    async def deliver(self, msg: Any):
+        for attempt in range(self.max_attempts):
+            try:
+                with DELIVERY_SECONDS.time(destination=self.name):
+                    await asyncio.get_running_loop().run_in_executor(
+                        self.executor, self.send, msg
+                    )
+                return
+            except Exception:
+                logger.exception(
+                    f"Cannot send {self.name} message "
+                    f"(attempt {attempt + 1}/{self.max_attempts})"
+                )
+            if attempt + 1 < self.max_attempts:
+                await asyncio.sleep(self.retry_delay(attempt))
+        if self.on_give_up is not None:
+            for m in msg if self.batching is not None else [msg]:
+                await asyncio.to_thread(self.on_give_up, m)
+
+
+class Dispatcher:
+    def __init__(self):
+        self.destinations: dict[str, Destination] = {}
+
+    def add_destination(self, name: str, *args, **kwargs):
+        self.destinations[name] = Destination(name, *args, **kwargs)
+
+    def start(self):
+        for destination in self.destinations.values():
+            destination.task = asyncio.create_task(destination.work())
+
+    async def enqueue(self, name: str, msg: Any):
+        await self.destinations[name].put(msg)
+
+    async def stop(self, timeout: float):
+        # Sends still running after the timeout are abandoned rather than
+        # awaited. Their outbox rows stay pending, so they are resent after
+        # a restart unless they finish before the process exits.
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(d.queue.join() for d in self.destinations.values())),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            for destination in self.destinations.values():
+                if pending := destination.queue.qsize():
+                    logger.warning(
+                        f"Dropping {pending} unsent {destination.name} messages."
+                    )
+        tasks = [d.task for d in self.destinations.values() if d.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
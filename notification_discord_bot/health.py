@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from enum import Enum, unique
+from typing import Optional
+
+from notification_discord_bot.logger import logger
+
+
+@unique
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+@dataclass
+class CircuitBreaker:
+    name: str
+    failure_threshold: int
+    reset_timeout_s: float
+    state: CircuitState = CircuitState.CLOSED
+    consecutive_failures: int = 0
+    opened_at: float = 0.0
+    last_success_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+    def delay(self, now: float) -> float:
+        if self.state != CircuitState.OPEN:
+            return 0
+        return max(self.opened_at + self.reset_timeout_s - now, 0)
+
+    def allow(self, now: float) -> bool:
+        # Once the reset timeout has passed a single probe is let through;
+        # its outcome decides whether the circuit closes or opens again.
+        if self.state == CircuitState.OPEN and self.delay(now) == 0:
+            self.state = CircuitState.HALF_OPEN
+            logger.info(f"{self.name} circuit half open, probing.")
+        return self.state != CircuitState.OPEN
+
+    def record_success(self, now: float):
+        if self.state != CircuitState.CLOSED:
+            logger.info(f"{self.name} circuit closed.")
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.last_success_at = now
+        self.last_error = None
+
+    def record_failure(self, now: float, error: str):
+        self.consecutive_failures += 1
+        self.last_error = error
+        if (
+            self.state == CircuitState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            if self.state != CircuitState.OPEN:
+                logger.error(
+                    f"{self.name} circuit opened after {self.consecutive_failures} "
+                    f"consecutive failures, probing again in {self.reset_timeout_s}s."
+                )
+            self.state = CircuitState.OPEN
+            self.opened_at = now
+
+
+# Keyed by contract name, so one broken subgraph only degrades its own chain
+contract_health: dict[str, CircuitBreaker] = {}
+
+
+def log_health():
+    health = {
+        name: (b.state.value, b.consecutive_failures, b.last_error)
+        for name, b in contract_health.items()
+    }
+    logger.debug(f"Contract health: {health}")
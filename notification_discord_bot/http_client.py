@@ -0,0 +1,55 @@
+import random
+from typing import Collection
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from notification_discord_bot.constants import (
+    HTTP_BACKOFF_FACTOR_S,
+    HTTP_POOL_CONNECTIONS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class JitteredRetry(Retry):
+    # urllib3 1.26 has no backoff_jitter, so apply full jitter here to keep
+    # the poller threads from retrying a struggling host in lockstep.
+    def get_backoff_time(self) -> float:
+        return random.uniform(0, super().get_backoff_time())
+
+
+def create_session(
+    retries: int = HTTP_RETRIES,
+    allowed_methods: Collection[str] = ("GET", "HEAD", "POST"),
+    pool_connections: int = HTTP_POOL_CONNECTIONS,
+    pool_maxsize: int = HTTP_POOL_MAXSIZE,
+) -> requests.Session:
+    # requests keeps one keep-alive pool per host inside the adapter, so a
+    # long lived session only pays for the TCP and TLS handshake once per
+    # connection instead of once per request.
+    retry = JitteredRetry(
+        total=retries,
+        backoff_factor=HTTP_BACKOFF_FACTOR_S,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(allowed_methods),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry
+    )
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+# Subgraph queries and Alchemy's batch endpoint are read-only POSTs, so they
+# are safe to retry along with the GETs.
+session = create_session()
+# Webhook posts aren't idempotent and Discord's 429s are paced by the sender,
+# so POSTs are only retried when the connection itself failed.
+discord_session = create_session(allowed_methods=("GET", "HEAD"))
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+
+from notification_discord_bot.constants import HTTP_TIMEOUT_S
+from notification_discord_bot.logger import logger
+
+
+class ImageTooLargeError(ValueError):
+    pass
+
+
+def download_image(session: requests.Session, url: str, max_bytes: int) -> bytes:
+    # Streamed so an oversized image is abandoned after max_bytes instead of
+    # being read into memory whole.
+    with session.get(url, stream=True, timeout=HTTP_TIMEOUT_S) as res:
+        res.raise_for_status()
+        if int(res.headers.get("Content-Length") or 0) > max_bytes:
+            raise ImageTooLargeError(f"{url} is larger than {max_bytes} bytes.")
+        chunks = []
+        size = 0
+        for chunk in res.iter_content(chunk_size=64 * 1024):
+            size += len(chunk)
+            if size > max_bytes:
+                raise ImageTooLargeError(f"{url} is larger than {max_bytes} bytes.")
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+@dataclass
+class CachedImage:
+    digest: str
+    content: bytes
+
+
+class ImageCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index_path = os.path.join(directory, "index.json")
+        self._urls: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self._index_path):
+            with open(self._index_path, "r") as f:
+                self._urls = json.load(f)
+        self._loaded = True
+
+    def _save_index(self):
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._urls, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest)
+
+    def get(self, url: str) -> Optional[CachedImage]:
+        with self._lock:
+            self._load()
+            if (digest := self._urls.get(url)) is None:
+                return None
+            try:
+                with open(self._path(digest), "rb") as f:
+                    content = f.read()
+            except FileNotFoundError:
+                del self._urls[url]
+                return None
+            # mtime doubles as the last access time for LRU eviction
+            os.utime(self._path(digest))
+            return CachedImage(digest, content)
+
+    def put(self, url: str, content: bytes) -> CachedImage:
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self._load()
+            if not os.path.exists(self._path(digest)):
+                tmp_path = f"{self._path(digest)}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(content)
+                os.replace(tmp_path, self._path(digest))
+            self._urls[url] = digest
+            self._evict()
+            self._save_index()
+        return CachedImage(digest, content)
+
+    def _evict(self):
+        files = []
+        for digest in set(self._urls.values()):
+            try:
+                st = os.stat(self._path(digest))
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, st.st_size, digest))
+        total = sum(size for _, size, _ in files)
+        for _, size, digest in sorted(files):
+            if total <= self.max_bytes:
+                break
+            os.remove(self._path(digest))
+            total -= size
+            self._urls = {u: d for u, d in self._urls.items() if d != digest}
+            logger.debug(f"Evicted cached image {digest}")
+
+    def fetch(
+        self, session: requests.Session, url: str, max_image_bytes: int
+    ) -> CachedImage:
+        if (image := self.get(url)) is not None:
+            return image
+        return self.put(url, download_image(session, url, max_image_bytes))
+
+
+class MediaIdCache:
+    def __init__(self, safety_margin_s: float = 60 * 60):
+        self.safety_margin_s = safety_margin_s
+        self._media_ids: dict[str, tuple[int, float]] = {}
+
+    def get(self, digest: str) -> Optional[int]:
+        if (entry := self._media_ids.get(digest)) is None:
+            return None
+        media_id, expires_at = entry
+        if expires_at < time.time():
+            del self._media_ids[digest]
+            return None
+        return media_id
+
+    def set(self, digest: str, media_id: int, expires_after_s: float):
+        expires_at = time.time() + expires_after_s - self.safety_margin_s
+        self._media_ids[digest] = (media_id, expires_at)
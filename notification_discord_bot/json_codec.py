@@ -0,0 +1,37 @@
+import json
+from typing import Any, Callable, Union
+
+from notification_discord_bot.constants import JSON_BACKEND
+
+JSONLoads = Callable[[Union[bytes, str]], Any]
+
+
+def import_backend(name: str) -> JSONLoads:
+    # pylint: disable=import-outside-toplevel
+    if name == "orjson":
+        import orjson
+
+        return orjson.loads
+    if name == "msgspec":
+        import msgspec
+
+        return msgspec.json.decode
+    if name == "json":
+        return json.loads
+    raise ValueError(f"Unknown JSON_BACKEND: {name}")
+
+
+def load_backend(name: str) -> tuple[str, JSONLoads]:
+    # "auto" takes the fastest decoder that is installed. Naming a backend
+    # explicitly fails loudly when it is missing.
+    if name != "auto":
+        return name, import_backend(name)
+    for candidate in ("orjson", "msgspec"):
+        try:
+            return candidate, import_backend(candidate)
+        except ImportError:
+            continue
+    return "json", json.loads
+
+
+backend, loads = load_backend(JSON_BACKEND)
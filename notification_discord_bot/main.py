@@ -1,27 +1,65 @@
 #!/usr/bin/env python
 
+import asyncio
+import io
+import math
 import os
+import signal
 import time
 from dataclasses import asdict
-from tempfile import NamedTemporaryFile
+from typing import Any
 from urllib.parse import urlparse
 
 import discord
 import requests
 import tweepy
 
-from notification_discord_bot import constants, utils
+from notification_discord_bot import constants, db, metrics, outbox, utils
 from notification_discord_bot.contracts import all_contracts, contract_is_enabled
+from notification_discord_bot.dispatcher import Batching, Dispatcher, DropPolicy
+from notification_discord_bot.health import CircuitBreaker, contract_health, log_health
+from notification_discord_bot.http_client import discord_session, session
+from notification_discord_bot.image_cache import ImageCache, MediaIdCache
 from notification_discord_bot.logger import logger
-from notification_discord_bot.seed import seed
+from notification_discord_bot.metrics import (
+    MESSAGE_BUILD_SECONDS,
+    NFT_CACHE_HIT_RATIO,
+    POLL_EVENTS,
+)
+from notification_discord_bot.nft import nft_cache, prefetch_nfts, providers
+from notification_discord_bot.poller import fetch_updates
+from notification_discord_bot.renft import ReNFTContract, ReNFTDatum
+from notification_discord_bot.scheduler import PollSchedule
+from notification_discord_bot.seed import seed, seed_contract, seed_options
+from notification_discord_bot.tracing import tracer
+from notification_discord_bot.watermarks import watermarks
+
+
+def get_retry_after(res: requests.Response) -> float:
+    # The headers are always in seconds, while the body's retry_after is in
+    # milliseconds on the API versions older webhook URLs default to, so it
+    # is only a fallback and always clamped.
+    retry_after = res.headers.get("Retry-After") or res.headers.get(
+        "X-RateLimit-Reset-After"
+    )
+    try:
+        if retry_after is None:
+            retry_after = res.json().get("retry_after", 1)
+        seconds = float(retry_after)
+    except (AttributeError, TypeError, ValueError):
+        seconds = 1
+    if not math.isfinite(seconds):
+        seconds = 1
+    return min(max(seconds, 0), constants.DISCORD_MAX_RETRY_AFTER_S)
 
 
 class MessageSender:
     def __init__(self):
-        if utils.discord_enabled():
-            self.discord_webhook = discord.Webhook.from_url(
-                constants.DISCORD_WEBHOOK, adapter=discord.RequestsWebhookAdapter()
-            )
+        self.discord_next_allowed_at = 0.0
+        self.image_cache = ImageCache(
+            constants.IMAGE_CACHE_PATH, constants.IMAGE_CACHE_MAX_BYTES
+        )
+        self.media_ids = MediaIdCache()
         if utils.twitter_enabled():
             self.authenticate_twitter()
 
@@ -35,23 +73,56 @@ class MessageSender:
         self.twitter_api = tweepy.API(auth, wait_on_rate_limit=True)
         self.twitter_api.verify_credentials()
 
-    def send_discord_message(self, msg):
-        logger.debug(msg.to_dict())
-        if utils.discord_enabled():
-            self.discord_webhook.send(embed=msg)
+    def send_discord_messages(self, msgs: list[discord.Embed]):
+        for msg in msgs:
+            logger.debug(msg.to_dict())
+        if (webhook := constants.DISCORD_WEBHOOK) is None:
+            return
+        embeds = [msg.to_dict() for msg in msgs]
+        for attempt in range(constants.DISCORD_RATE_LIMIT_RETRIES + 1):
+            # Pace requests with the webhook's rate limit headers instead of
+            # running into 429s during bursts.
+            if (delay := self.discord_next_allowed_at - time.monotonic()) > 0:
+                time.sleep(delay)
+            res = discord_session.post(
+                webhook,
+                params={"wait": "true"},
+                json={"embeds": embeds},
+                timeout=constants.HTTP_TIMEOUT_S,
+            )
+            if (
+                res.status_code == 429
+                and attempt < constants.DISCORD_RATE_LIMIT_RETRIES
+            ):
+                retry_after = get_retry_after(res)
+                logger.warning(f"Discord rate limited, retrying in {retry_after}s")
+                self.discord_next_allowed_at = time.monotonic() + retry_after
+                continue
+            res.raise_for_status()
+            if res.headers.get("X-RateLimit-Remaining") == "0":
+                reset_after = float(res.headers.get("X-RateLimit-Reset-After", 0))
+                self.discord_next_allowed_at = time.monotonic() + reset_after
+            return
+
+    def upload_twitter_media(self, image_url: str) -> int:
+        image = self.image_cache.fetch(
+            session, image_url, constants.TWITTER_MAX_IMAGE_BYTES
+        )
+        # The same collection image is often tweeted repeatedly, and Twitter
+        # media ids stay usable for a while after upload.
+        if (media_id := self.media_ids.get(image.digest)) is not None:
+            return media_id
+        filename = os.path.basename(urlparse(image_url).path) or image.digest
+        media = self.twitter_api.media_upload(filename, file=io.BytesIO(image.content))
+        expires_after_s = getattr(media, "expires_after_secs", 24 * 60 * 60)
+        self.media_ids.set(image.digest, media.media_id, expires_after_s)
+        return media.media_id
 
     def send_twitter_message(self, msg: constants.TwitterMessage):
         logger.debug(asdict(msg))
         if utils.twitter_enabled():
             try:
-                res = requests.get(msg.image_url, timeout=20)
-                res.raise_for_status()
-                a = urlparse(msg.image_url)
-                filename = os.path.basename(a.path)
-                with NamedTemporaryFile(suffix=filename) as t:
-                    t.write(res.content)
-                    media = self.twitter_api.media_upload(t.name)
-                    media_ids = [media.media_ids]
+                media_ids = [self.upload_twitter_media(msg.image_url)]
             except:
                 logger.exception(f"Cannot get image {msg.image_url}")
                 media_ids = []
@@ -60,36 +131,216 @@ class MessageSender:
             except tweepy.errors.Forbidden:
                 logger.exception("Tweepy 403")
 
+    def send_discord_payloads(self, payloads: list[dict[str, Any]]):
+        self.send_discord_messages([discord.Embed.from_dict(p) for p in payloads])
 
-def check_for_updates(msg_sender: MessageSender):
-    for contract in all_contracts:
-        if contract_is_enabled(contract):
-            # Reversed because the order is originally descending,
-            # but we want observe in ascending order
-            for renft_datum in [
-                *reversed(contract.get_lendings()),
-                *reversed(contract.get_rentings()),
-            ]:
-                if renft_datum.has_been_observed():
-                    continue
+    def send_twitter_payload(self, payload: dict[str, Any]):
+        self.send_twitter_message(constants.TwitterMessage(**payload))
+
+
+def create_dispatcher(msg_sender: MessageSender) -> Dispatcher:
+    dispatcher = Dispatcher()
+    dispatcher.add_destination(
+        "discord",
+        outbox.batch_deliverer(msg_sender.send_discord_payloads),
+        constants.DISCORD_QUEUE_SIZE,
+        DropPolicy(constants.DISCORD_QUEUE_POLICY),
+        max_attempts=constants.DELIVERY_MAX_ATTEMPTS,
+        retry_delay_s=constants.DELIVERY_RETRY_DELAY_S,
+        max_retry_delay_s=constants.DELIVERY_MAX_RETRY_DELAY_S,
+        on_give_up=outbox.give_up,
+        on_drop=outbox.drop,
+        batching=Batching(
+            max_size=constants.DISCORD_BATCH_SIZE,
+            window_s=constants.DISCORD_BATCH_WINDOW_S,
+            weight=lambda msg: len(discord.Embed.from_dict(msg.payload)),
+            max_weight=constants.DISCORD_MAX_EMBEDS_LENGTH,
+        ),
+    )
+    dispatcher.add_destination(
+        "twitter",
+        outbox.deliverer(msg_sender.send_twitter_payload),
+        constants.TWITTER_QUEUE_SIZE,
+        DropPolicy(constants.TWITTER_QUEUE_POLICY),
+        max_attempts=constants.DELIVERY_MAX_ATTEMPTS,
+        retry_delay_s=constants.DELIVERY_RETRY_DELAY_S,
+        max_retry_delay_s=constants.DELIVERY_MAX_RETRY_DELAY_S,
+        on_give_up=outbox.give_up,
+        on_drop=outbox.drop,
+    )
+    return dispatcher
+
+
+def commit_messages(
+    messages: list[tuple[ReNFTDatum, discord.Embed, constants.TwitterMessage]]
+) -> list[outbox.OutboxMessage]:
+    # The outbox rows and the watermark advance are written in one transaction,
+    # so a crash either loses neither or keeps both: nothing is skipped and
+    # nothing is built twice.
+    try:
+        with db.get_backend().transaction():
+            outbox_messages = []
+            for renft_datum, discord_message, twitter_message in messages:
+                outbox_messages.append(
+                    outbox.record(renft_datum, "discord", discord_message.to_dict())
+                )
+                outbox_messages.append(
+                    outbox.record(renft_datum, "twitter", asdict(twitter_message))
+                )
                 renft_datum.observe()
+            watermarks.flush()
+    except BaseException:
+        # The in-memory watermarks were advanced too. Reload the committed
+        # ones, or the next poll would start after events that were never
+        # recorded.
+        with db.get_backend().transaction():
+            watermarks.load()
+        raise
+    return outbox_messages
 
-                discord_message = renft_datum.build_discord_message()
-                msg_sender.send_discord_message(discord_message)
 
-                twitter_message = renft_datum.build_twitter_message()
-                msg_sender.send_twitter_message(twitter_message)
+async def check_for_updates(dispatcher: Dispatcher, contract: ReNFTContract) -> int:
+    if not watermarks.has_contract(contract.name):
+        # Seeding failed at startup, so nothing has been announced yet
+        await asyncio.to_thread(seed_contract, contract, **seed_options())
+        await asyncio.to_thread(watermarks.flush)
+        return 0
+    fetch_started_ns = time.time_ns()
+    updates = await fetch_updates(contract)
+    fetch_ended_ns = time.time_ns()
+    new_data = []
+    for renft_datum in [*updates.lendings, *updates.rentings]:
+        with tracer.span([renft_datum.trace_id], "has_been_observed"):
+            observed = renft_datum.has_been_observed()
+        if not observed:
+            new_data.append(renft_datum)
+    for renft_datum in new_data:
+        logger.info(
+            f"New {contract.name} {renft_datum.transaction_type.value} "
+            f"{renft_datum.cursor}, trace {renft_datum.trace_id}"
+        )
+        # The event's age when it was fetched is the subgraph's indexing lag
+        # plus however long it waited for this poll.
+        tracer.record(
+            [renft_datum.trace_id],
+            "poll.fetch",
+            fetch_started_ns,
+            fetch_ended_ns,
+            contract=contract.name,
+            event_at=renft_datum.timestamp,
+        )
+    with tracer.span([d.trace_id for d in new_data], "nft.resolve"):
+        await asyncio.to_thread(prefetch_nfts, [d.nft_key for d in new_data])
+    messages = []
+    for renft_datum in new_data:
+        trace_ids = [renft_datum.trace_id]
+        with MESSAGE_BUILD_SECONDS.time(destination="discord"), tracer.span(
+            trace_ids, "build_discord_message"
+        ):
+            discord_message = await asyncio.to_thread(renft_datum.build_discord_message)
+        with MESSAGE_BUILD_SECONDS.time(destination="twitter"), tracer.span(
+            trace_ids, "build_twitter_message"
+        ):
+            twitter_message = await asyncio.to_thread(renft_datum.build_twitter_message)
+        messages.append((renft_datum, discord_message, twitter_message))
+
+    for msg in await asyncio.to_thread(commit_messages, messages):
+        await dispatcher.enqueue(msg.destination, msg)
+    return len(new_data)
+
+
+async def poll_contract(dispatcher: Dispatcher, contract: ReNFTContract):
+    # Every contract runs on its own schedule and circuit, so a quiet chain
+    # backs off without slowing down a busy one and a broken endpoint only
+    # takes down its own chain.
+    schedule = PollSchedule(
+        min_interval_s=constants.POLL_MIN_INTERVAL_S,
+        max_interval_s=constants.POLL_MAX_INTERVAL_S,
+        interval_s=constants.POLL_INTERVAL_S,
+        max_error_interval_s=constants.POLL_MAX_ERROR_INTERVAL_S,
+    )
+    breaker = contract_health[contract.name] = CircuitBreaker(
+        contract.name,
+        failure_threshold=constants.CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout_s=constants.CIRCUIT_RESET_TIMEOUT_S,
+    )
+    while True:
+        now = time.monotonic()
+        await asyncio.sleep(max(schedule.delay(now), breaker.delay(now)))
+        started_at = time.monotonic()
+        if not breaker.allow(started_at):
+            continue
+        try:
+            events = await check_for_updates(dispatcher, contract)
+        except Exception as e:
+            logger.exception(f"Cannot check {contract.name} for updates")
+            schedule.record_error(started_at)
+            breaker.record_failure(time.monotonic(), repr(e))
+        else:
+            schedule.record_success(started_at, events)
+            POLL_EVENTS.observe(events, contract=contract.name)
+            breaker.record_success(time.monotonic())
+            nft_cache.log_stats()
+            providers.log_stats()
+        log_health()
+        now = time.monotonic()
+        logger.info(
+            f"Checking {contract.name} again in "
+            f"{max(schedule.delay(now), breaker.delay(now)):.1f} seconds."
+        )
+
+
+async def prune_outbox():
+    # Sent, failed and dropped messages keep accumulating while the bot runs
+    while True:
+        await asyncio.sleep(constants.OUTBOX_PRUNE_INTERVAL_S)
+        try:
+            await asyncio.to_thread(outbox.prune, constants.OUTBOX_RETENTION_S)
+        except Exception:
+            logger.exception("Cannot prune the outbox")
+
+
+async def run(msg_sender: MessageSender):
+    # fly.io stops the machine with SIGINT, docker with SIGTERM. Cancelling the
+    # task lets the finally block persist watermarks observed since the last flush.
+    task = asyncio.current_task()
+    assert task is not None
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    # Sending happens in the dispatcher's workers, so a slow or rate limited
+    # destination never delays polling.
+    dispatcher = create_dispatcher(msg_sender)
+    dispatcher.start()
+    NFT_CACHE_HIT_RATIO.set_function(lambda: nft_cache.stats.hit_ratio)
+    if constants.METRICS_PORT:
+        metrics.start_server(constants.METRICS_HOST, int(constants.METRICS_PORT))
+    # Deliveries left pending by the previous process are resumed first
+    for msg in await asyncio.to_thread(outbox.pending_messages):
+        await dispatcher.enqueue(msg.destination, msg)
+    try:
+        await asyncio.gather(
+            prune_outbox(),
+            *(
+                poll_contract(dispatcher, contract)
+                for contract in all_contracts
+                if contract_is_enabled(contract)
+            ),
+        )
+    except asyncio.CancelledError:
+        logger.info("Shutting down.")
+    finally:
+        watermarks.flush()
+        await dispatcher.stop(constants.DISPATCH_DRAIN_TIMEOUT_S)
 
 
 def main():
     logger.info(f"Discord is enabled: {utils.discord_enabled()}")
     logger.info(f"Twitter is enabled: {utils.twitter_enabled()}")
     seed()
+    outbox.prune(constants.OUTBOX_RETENTION_S)
     msg_sender = MessageSender()
-    while True:
-        check_for_updates(msg_sender)
-        logger.info(f"Sleeping for {str(constants.SLEEP_TIME_S)} seconds.")
-        time.sleep(constants.SLEEP_TIME_S)
+    asyncio.run(run(msg_sender))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,198 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from functools import wraps
+from typing import Callable, Optional
+
+from notification_discord_bot import json_codec
+from notification_discord_bot.logger import logger
+from notification_discord_bot.renft import Chain, NonFungibleToken
+
+CacheKey = tuple[str, str, str, Chain]
+
+# Rows written between two trims of the disk layer, which otherwise only
+# shrinks when it is opened.
+DISK_TRIM_INTERVAL = 100
+
+
+class CachedLookupError(LookupError):
+    pass
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    negative_hits: int = 0
+    disk_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        hits = self.hits + self.negative_hits
+        return hits / (hits + self.misses) if hits + self.misses else 0.0
+
+
+@dataclass
+class CacheEntry:
+    expires_at: float
+    nft: Optional[NonFungibleToken]
+
+
+class MetadataCache:
+    def __init__(
+        self,
+        max_size: int,
+        ttl_s: float,
+        negative_ttl_s: float,
+        path: Optional[str] = None,
+    ):
+        self.max_size = max_size
+        self.ttl_s = ttl_s
+        self.negative_ttl_s = negative_ttl_s
+        self.path = path
+        self.stats = CacheStats()
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+
+    @property
+    def conn(self) -> Optional[sqlite3.Connection]:
+        if self.path and self._conn is None:
+            self._conn = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS nft_metadata "
+                "(key TEXT PRIMARY KEY, nft TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._trim_disk(self._conn)
+        return self._conn
+
+    def _trim_disk(self, conn: sqlite3.Connection):
+        conn.execute("DELETE FROM nft_metadata WHERE expires_at < ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM nft_metadata WHERE key NOT IN "
+            "(SELECT key FROM nft_metadata ORDER BY expires_at DESC LIMIT ?)",
+            (self.max_size,),
+        )
+
+    @staticmethod
+    def _normalize(key: CacheKey) -> CacheKey:
+        # Addresses are checksummed by some sources and not by others
+        provider, address, token_id, chain = key
+        return provider, address.lower(), token_id, chain
+
+    @staticmethod
+    def _disk_key(key: CacheKey) -> str:
+        provider, address, token_id, chain = key
+        return f"{provider}:{chain.value}:{address}:{token_id}"
+
+    def _load_from_disk(self, key: CacheKey) -> Optional[CacheEntry]:
+        if self.conn is None:
+            return None
+        row = self.conn.execute(
+            "SELECT nft, expires_at FROM nft_metadata "
+            "WHERE key = ? AND expires_at >= ?",
+            (self._disk_key(key), time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(row[1], NonFungibleToken(**json_codec.loads(row[0])))
+
+    def _store(self, key: CacheKey, entry: CacheEntry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        key = self._normalize(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at < time.time():
+                del self._entries[key]
+                self.stats.expirations += 1
+                entry = None
+            if entry is None:
+                entry = self._load_from_disk(key)
+                if entry is None:
+                    self.stats.misses += 1
+                    return None
+                self.stats.disk_hits += 1
+                self._store(key, entry)
+            else:
+                self._entries.move_to_end(key)
+            if entry.nft is None:
+                self.stats.negative_hits += 1
+            else:
+                self.stats.hits += 1
+            return entry
+
+    def contains(self, key: CacheKey) -> bool:
+        # For probing ahead of a lookup: neither counted in the stats nor
+        # refreshing the entry's recency, so only the lookup itself is.
+        key = self._normalize(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at >= time.time():
+                return True
+            return self._load_from_disk(key) is not None
+
+    def set(self, key: CacheKey, nft: NonFungibleToken):
+        key = self._normalize(key)
+        entry = CacheEntry(time.time() + self.ttl_s, nft)
+        with self._lock:
+            self._store(key, entry)
+            if self.conn is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO nft_metadata VALUES (?, ?, ?)",
+                    (self._disk_key(key), json.dumps(asdict(nft)), entry.expires_at),
+                )
+                self._disk_writes += 1
+                if self._disk_writes % DISK_TRIM_INTERVAL == 0:
+                    self._trim_disk(self.conn)
+
+    def set_failure(self, key: CacheKey):
+        key = self._normalize(key)
+        with self._lock:
+            self._store(key, CacheEntry(time.time() + self.negative_ttl_s, None))
+
+    def cached(
+        self, provider: str
+    ) -> Callable[
+        [Callable[[str, str, Chain], NonFungibleToken]],
+        Callable[[str, str, Chain], NonFungibleToken],
+    ]:
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(address: str, token_id: str, chain: Chain):
+                key = (provider, address, token_id, chain)
+                if (entry := self.get(key)) is not None:
+                    if entry.nft is None:
+                        raise CachedLookupError(
+                            f"{provider} lookup for {address}#{token_id} "
+                            "failed recently."
+                        )
+                    return entry.nft
+                try:
+                    nft = fn(address, token_id, chain)
+                except Exception:
+                    self.set_failure(key)
+                    raise
+                self.set(key, nft)
+                return nft
+
+            return wrapper
+
+        return decorator
+
+    def log_stats(self):
+        logger.debug(f"NFT metadata cache: {asdict(self.stats)}")
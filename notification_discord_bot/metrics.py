@@ -0,0 +1,246 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator, Optional
+
+from notification_discord_bot.logger import logger
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def format_labels(names: tuple[str, ...], values: LabelValues, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    escaped = (
+        (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in pairs
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def label_values(self, labels: dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+            *self.samples(),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...]):
+        super().__init__(name, description, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self.label_values(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+        for key, value in values.items():
+            yield f"{self.name}{format_labels(self.labelnames, key)} {value}"
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: tuple[str, ...]):
+        super().__init__(name, description, labelnames)
+        self._values: dict[LabelValues, float] = {}
+        self._functions: dict[LabelValues, Callable[[], float]] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, fn: Callable[[], float], **labels: str):
+        # Evaluated at scrape time, for values another component already tracks
+        key = self.label_values(labels)
+        with self._lock:
+            self._functions[key] = fn
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, fn in functions.items():
+            values[key] = fn()
+        for key, value in values.items():
+            yield f"{self.name}{format_labels(self.labelnames, key)} {value}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labelnames)
+        self.buckets = buckets
+        # Per label set: a count per bucket plus one for +Inf, and the sum
+        self._counts: dict[LabelValues, list[int]] = {}
+        self._sums: dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self.label_values(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self.label_values(labels), []))
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            counts = {k: list(v) for k, v in self._counts.items()}
+            sums = dict(self._sums)
+        for key, bucket_counts in counts.items():
+            cumulative = 0
+            for le, bucket_count in zip(
+                [*map(str, self.buckets), "+Inf"], bucket_counts
+            ):
+                cumulative += bucket_count
+                labels = format_labels(self.labelnames, key, le=le)
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {sums[key]}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def counter(
+        self, name: str, description: str, labelnames: tuple[str, ...] = ()
+    ) -> Counter:
+        metric = Counter(name, description, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(
+        self, name: str, description: str, labelnames: tuple[str, ...] = ()
+    ) -> Gauge:
+        metric = Gauge(name, description, labelnames)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        metric = Histogram(name, description, labelnames, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+
+registry = Registry()
+
+SUBGRAPH_QUERY_SECONDS = registry.histogram(
+    "subgraph_query_seconds", "Latency of subgraph queries.", ("contract",)
+)
+NFT_LOOKUP_SECONDS = registry.histogram(
+    "nft_lookup_seconds", "Latency of NFT metadata lookups.", ("provider",)
+)
+MESSAGE_BUILD_SECONDS = registry.histogram(
+    "message_build_seconds", "Time to build a notification.", ("destination",)
+)
+DELIVERY_SECONDS = registry.histogram(
+    "delivery_seconds", "Latency of sending notifications.", ("destination",)
+)
+DELIVERY_LAG_SECONDS = registry.histogram(
+    "delivery_lag_seconds",
+    "Time from the lending or renting on chain to its notification being sent.",
+    ("destination",),
+    buckets=(5, 10, 30, 60, 120, 300, 600, 1800, 3600),
+)
+POLL_EVENTS = registry.histogram(
+    "poll_events",
+    "New events found per poll.",
+    ("contract",),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250),
+)
+NFT_CACHE_HIT_RATIO = registry.gauge(
+    "nft_cache_hit_ratio", "Share of NFT metadata lookups served from the cache."
+)
+DB_READS = registry.counter("db_reads_total", "Storage reads.", ("collection",))
+DB_WRITES = registry.counter("db_writes_total", "Storage writes.", ("collection",))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):  # pylint: disable=invalid-name
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def start_server(host: str, port: int) -> Optional[ThreadingHTTPServer]:
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError:
+        logger.exception(f"Cannot serve metrics on {host}:{port}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
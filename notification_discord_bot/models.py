@@ -17,3 +17,21 @@ class ReNFTModel(Model):
     @classmethod
     def unique_index(cls):
         return {"contract_name", "transaction_type"}
+
+
+@dataclass
+class OutboxModel(Model):
+    idempotency_key: str
+    destination: str
+    payload: str
+    status: str
+    attempts: int
+    created_at: float
+
+    @classmethod
+    def collection_name(cls):
+        return "outbox"
+
+    @classmethod
+    def unique_index(cls):
+        return {"idempotency_key", "destination"}
@@ -1,19 +1,61 @@
-import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from functools import cache
-from typing import Any
-
-import requests
+from functools import wraps
+from typing import Any, Callable, Iterable, Optional
 
+from notification_discord_bot import json_codec
 from notification_discord_bot.constants import (
+    ALCHEMY_BATCH_SIZE,
     ETHEREUM_ALCHEMY_BASE_URL,
+    HTTP_TIMEOUT_S,
+    NFT_CACHE_MAX_SIZE,
+    NFT_CACHE_NEGATIVE_TTL_S,
+    NFT_CACHE_PATH,
+    NFT_CACHE_TTL_S,
+    NFT_HEDGE_DELAY_S,
+    NFT_LATENCY_BUDGET_S,
     NFT_PORT_API_KEY,
+    NFT_PREFETCH_CONCURRENCY,
+    NFT_PROVIDER_WORKERS,
     POLYGON_ALCHEMY_BASE_URL,
 )
+from notification_discord_bot.http_client import session
 from notification_discord_bot.logger import logger
-from notification_discord_bot.renft import Chain, NonFungibleToken
+from notification_discord_bot.metadata_cache import MetadataCache
+from notification_discord_bot.metrics import NFT_LOOKUP_SECONDS
+from notification_discord_bot.nft_providers import NFTLookup, ProviderRegistry
+from notification_discord_bot.renft import Chain, NFTKey, NonFungibleToken
 from notification_discord_bot.utils import normalize_ipfs_url
 
+nft_cache = MetadataCache(
+    max_size=NFT_CACHE_MAX_SIZE,
+    ttl_s=NFT_CACHE_TTL_S,
+    negative_ttl_s=NFT_CACHE_NEGATIVE_TTL_S,
+    path=NFT_CACHE_PATH,
+)
+providers = ProviderRegistry(
+    hedge_delay_s=NFT_HEDGE_DELAY_S,
+    latency_budget_s=NFT_LATENCY_BUDGET_S,
+    max_workers=NFT_PROVIDER_WORKERS,
+    cache=nft_cache,
+)
+
+
+def timed(provider: str) -> Callable[[NFTLookup], NFTLookup]:
+    # Applied under the cache, so only requests that reach the provider are
+    # observed and cache hits don't drag its latency down. The registry holds
+    # the uncached lookup and consults the cache itself.
+    def decorator(fn: NFTLookup) -> NFTLookup:
+        @wraps(fn)
+        def wrapper(address: str, token_id: str, chain: Chain) -> NonFungibleToken:
+            with NFT_LOOKUP_SECONDS.time(provider=provider):
+                return fn(address, token_id, chain)
+
+        return wrapper
+
+    return decorator
+
 
 @dataclass
 class RankedUrl:
@@ -56,7 +98,9 @@ def get_image_url_from_alchemy_nft(nft: dict[str, Any]):
     return media_urls[0].url
 
 
-@cache
+@nft_cache.cached("alchemy")
+@providers.register("alchemy", {Chain.ETH, Chain.MATIC}, priority=0)
+@timed("alchemy")
 def get_nft_with_alchemy(address: str, token_id: str, chain: Chain) -> NonFungibleToken:
     base_url_mapping = {
         chain.ETH: f"{ETHEREUM_ALCHEMY_BASE_URL}/getNFTMetadata",
@@ -67,9 +111,44 @@ def get_nft_with_alchemy(address: str, token_id: str, chain: Chain) -> NonFungib
     query_url = base_url + query_params
     headers = {"accept": "application/json"}
 
-    res = requests.get(query_url, headers=headers, timeout=20)
+    res = session.get(query_url, headers=headers, timeout=HTTP_TIMEOUT_S)
+    res.raise_for_status()
+    data = json_codec.loads(res.content)
+    return alchemy_nft_to_non_fungible_token(data)
+
+
+def get_nfts_with_alchemy_batch(
+    tokens: list[tuple[str, str]], chain: Chain
+) -> list[Optional[NonFungibleToken]]:
+    base_url_mapping = {
+        chain.ETH: f"{ETHEREUM_ALCHEMY_BASE_URL}/getNFTMetadataBatch",
+        chain.MATIC: f"{POLYGON_ALCHEMY_BASE_URL}/getNFTMetadataBatch",
+    }
+    query_url = base_url_mapping[chain]
+    headers = {"accept": "application/json", "content-type": "application/json"}
+    body = {
+        "tokens": [
+            {"contractAddress": address, "tokenId": token_id}
+            for address, token_id in tokens
+        ],
+        "refreshCache": False,
+    }
+
+    with NFT_LOOKUP_SECONDS.time(provider="alchemy_batch"):
+        res = session.post(
+            query_url, headers=headers, json=body, timeout=HTTP_TIMEOUT_S
+        )
     res.raise_for_status()
-    data = json.loads(res.content)
+    nfts: list[Optional[NonFungibleToken]] = []
+    for data in json_codec.loads(res.content):
+        try:
+            nfts.append(alchemy_nft_to_non_fungible_token(data))
+        except (KeyError, TypeError, ValueError):
+            nfts.append(None)
+    return nfts
+
+
+def alchemy_nft_to_non_fungible_token(data: dict[str, Any]) -> NonFungibleToken:
     return NonFungibleToken(
         name=data["metadata"]["name"],
         nft_address=data["contract"]["address"],
@@ -79,7 +158,9 @@ def get_nft_with_alchemy(address: str, token_id: str, chain: Chain) -> NonFungib
     )
 
 
-@cache
+@nft_cache.cached("nft_port")
+@providers.register("nft_port", {Chain.ETH, Chain.MATIC}, priority=1)
+@timed("nft_port")
 def get_nft_with_nft_port(
     address: str, token_id: str, chain: Chain
 ) -> NonFungibleToken:
@@ -90,9 +171,9 @@ def get_nft_with_nft_port(
     query_url = f"https://api.nftport.xyz/v0/nfts/{address}/{token_id}?chain=${_chain}"
     headers = {"content-type": "application/json", "Authorization": NFT_PORT_API_KEY}
 
-    res = requests.get(query_url, headers=headers, timeout=20)
+    res = session.get(query_url, headers=headers, timeout=HTTP_TIMEOUT_S)
     res.raise_for_status()
-    data = json.loads(res.content)
+    data = json_codec.loads(res.content)
     return NonFungibleToken(
         name=data["metadata"]["name"],
         nft_address=data["contract_address"],
@@ -102,15 +183,17 @@ def get_nft_with_nft_port(
     )
 
 
-@cache
+@nft_cache.cached("castle_crush")
+@providers.register("castle_crush", {Chain.AVAX}, priority=0)
+@timed("castle_crush")
 def get_castle_crush_nft(address: str, token_id: str, chain: Chain) -> NonFungibleToken:
     if Chain.AVAX != chain:
         raise AssertionError("Invalid chain for Castle Crush.")
     hex_token_id = hex(int(token_id))[2:].rjust(64, "0")
     query_url = f"https://castle-crush-crypto-bucket.s3.amazonaws.com/metadata/{hex_token_id}.json"
-    res = requests.get(query_url, timeout=20)
+    res = session.get(query_url, timeout=HTTP_TIMEOUT_S)
     res.raise_for_status()
-    data = json.loads(res.content)
+    data = json_codec.loads(res.content)
     return NonFungibleToken(
         name=data["name"],
         nft_address=address,
@@ -132,14 +215,46 @@ def get_placeholder_nft(address: str, token_id: str, chain: Chain):
 
 
 def get_nft(address: str, token_id: str, chain: Chain) -> NonFungibleToken:
-    try:
-        if chain in {Chain.ETH, Chain.MATIC}:
+    if (nft := providers.resolve(address, token_id, chain)) is not None:
+        return nft
+    return get_placeholder_nft(address, token_id, chain)
+
+
+def provider_for(chain: Chain) -> str:
+    return "castle_crush" if chain == Chain.AVAX else "alchemy"
+
+
+def prefetch_nfts(keys: Iterable[NFTKey]):
+    # Resolve every NFT of a poll up front so message building only hits the
+    # cache: Alchemy chains in batches, Castle Crush metadata concurrently.
+    pending = {k for k in keys if not nft_cache.contains((provider_for(k[2]), *k))}
+    by_chain: dict[Chain, list[tuple[str, str]]] = defaultdict(list)
+    for address, token_id, chain in pending:
+        by_chain[chain].append((address, token_id))
+
+    for chain in (Chain.ETH, Chain.MATIC):
+        tokens = by_chain.pop(chain, [])
+        for i in range(0, len(tokens), ALCHEMY_BATCH_SIZE):
+            batch = tokens[i : i + ALCHEMY_BATCH_SIZE]
             try:
-                return get_nft_with_alchemy(address, token_id, chain)
+                nfts = get_nfts_with_alchemy_batch(batch, chain)
             except:
-                return get_nft_with_nft_port(address, token_id, chain)
-        if chain in {Chain.AVAX}:
-            return get_castle_crush_nft(address, token_id, chain)
-    except:
-        pass
-    return get_placeholder_nft(address, token_id, chain)
+                logger.exception(f"Cannot prefetch {len(batch)} NFTs on {chain}")
+                continue
+            for (address, token_id), nft in zip(batch, nfts):
+                if nft is not None:
+                    nft_cache.set(("alchemy", address, token_id, chain), nft)
+
+    if not (tokens := by_chain.pop(Chain.AVAX, [])):
+        return
+    with ThreadPoolExecutor(NFT_PREFETCH_CONCURRENCY) as executor:
+        futures = {
+            executor.submit(get_castle_crush_nft, address, token_id, Chain.AVAX): (
+                address,
+                token_id,
+            )
+            for address, token_id in tokens
+        }
+    for future, (address, token_id) in futures.items():
+        if future.exception() is not None:
+            logger.warning(f"Cannot prefetch Castle Crush NFT {address}#{token_id}")
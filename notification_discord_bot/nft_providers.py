@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+from notification_discord_bot.logger import logger
+from notification_discord_bot.metadata_cache import MetadataCache
+from notification_discord_bot.renft import Chain, NonFungibleToken
+
+NFTLookup = Callable[[str, str, Chain], NonFungibleToken]
+
+
+@dataclass
+class NFTProvider:
+    name: str
+    chains: set[Chain]
+    priority: int
+    lookup: NFTLookup
+
+
+@dataclass
+class ProviderStats:
+    requests: int = 0
+    failures: int = 0
+    wins: int = 0
+    total_latency_s: float = 0.0
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.requests if self.requests else 0.0
+
+    @property
+    def mean_latency_s(self) -> float:
+        return self.total_latency_s / self.requests if self.requests else 0.0
+
+
+class ProviderRegistry:
+    def __init__(
+        self,
+        hedge_delay_s: Optional[float],
+        latency_budget_s: float,
+        max_workers: int,
+        cache: Optional[MetadataCache] = None,
+    ):
+        # hedge_delay_s=None disables hedging: the next provider only starts
+        # once the previous one has failed.
+        self.hedge_delay_s = hedge_delay_s
+        self.cache = cache
+        self.latency_budget_s = latency_budget_s
+        self.stats: dict[str, ProviderStats] = {}
+        self._providers: list[NFTProvider] = []
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._lock = threading.Lock()
+
+    def register(
+        self, name: str, chains: set[Chain], priority: int
+    ) -> Callable[[NFTLookup], NFTLookup]:
+        def decorator(fn: NFTLookup) -> NFTLookup:
+            self._providers.append(NFTProvider(name, chains, priority, fn))
+            self._providers.sort(key=lambda p: p.priority)
+            self.stats[name] = ProviderStats()
+            return fn
+
+        return decorator
+
+    def for_chain(self, chain: Chain) -> list[NFTProvider]:
+        return [p for p in self._providers if chain in p.chains]
+
+    def _timed_lookup(
+        self, provider: NFTProvider, address: str, token_id: str, chain: Chain
+    ) -> NonFungibleToken:
+        key = (provider.name, address, token_id, chain)
+        start = time.monotonic()
+        try:
+            nft = provider.lookup(address, token_id, chain)
+        except Exception:
+            with self._lock:
+                self.stats[provider.name].failures += 1
+            if self.cache is not None:
+                self.cache.set_failure(key)
+            raise
+        else:
+            if self.cache is not None:
+                self.cache.set(key, nft)
+            return nft
+        finally:
+            latency = time.monotonic() - start
+            with self._lock:
+                stats = self.stats[provider.name]
+                stats.requests += 1
+                stats.total_latency_s += latency
+
+    def resolve(
+        self, address: str, token_id: str, chain: Chain
+    ) -> Optional[NonFungibleToken]:
+        # Cached lookups are answered here, so the providers' stats and the
+        # hedging they drive only reflect requests that reached a provider.
+        pending = []
+        for provider in self.for_chain(chain):
+            entry = (
+                self.cache.get((provider.name, address, token_id, chain))
+                if self.cache is not None
+                else None
+            )
+            if entry is None:
+                pending.append(provider)
+            elif entry.nft is not None:
+                return entry.nft
+            # A provider that failed recently is skipped until that expires
+        in_flight: dict[Future[NonFungibleToken], NFTProvider] = {}
+        deadline = time.monotonic() + self.latency_budget_s
+        next_launch = time.monotonic()
+
+        while pending or in_flight:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            if pending and now >= next_launch:
+                provider = pending.pop(0)
+                future = self._executor.submit(
+                    self._timed_lookup, provider, address, token_id, chain
+                )
+                in_flight[future] = provider
+                next_launch = (
+                    now + self.hedge_delay_s
+                    if self.hedge_delay_s is not None
+                    else float("inf")
+                )
+
+            timeout = deadline - now
+            if pending:
+                timeout = min(timeout, max(next_launch - now, 0))
+            done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                provider = in_flight.pop(future)
+                if future.exception() is None:
+                    with self._lock:
+                        self.stats[provider.name].wins += 1
+                    return future.result()
+                # Don't wait out the hedge delay once the current one has failed
+                next_launch = time.monotonic()
+
+        logger.warning(
+            f"No provider resolved {address}#{token_id} on {str(chain)} "
+            f"within {self.latency_budget_s}s."
+        )
+        return None
+
+    def log_stats(self):
+        with self._lock:
+            stats = {
+                name: {
+                    **asdict(s),
+                    "win_rate": s.win_rate,
+                    "mean_latency_s": s.mean_latency_s,
+                }
+                for name, s in self.stats.items()
+            }
+        logger.debug(f"NFT providers: {stats}")
@@ -0,0 +1,207 @@
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+import requests
+
+from notification_discord_bot import db, json_codec
+from notification_discord_bot.logger import logger
+from notification_discord_bot.metrics import DELIVERY_LAG_SECONDS
+from notification_discord_bot.models import OutboxModel
+from notification_discord_bot.renft import ReNFTDatum
+from notification_discord_bot.tracing import tracer
+
+PENDING = "pending"
+SENT = "sent"
+FAILED = "failed"
+DROPPED = "dropped"
+
+
+@dataclass
+class OutboxMessage:
+    idempotency_key: str
+    destination: str
+    payload: dict[str, Any]
+    attempts: int = 0
+    # When the event happened on chain. Not persisted, so messages resumed
+    # after a restart don't report a delivery lag.
+    event_at: Optional[float] = None
+    trace_id: Optional[str] = None
+
+
+def get_idempotency_key(renft_datum: ReNFTDatum) -> str:
+    return (
+        f"{renft_datum.contract.name}:"
+        f"{renft_datum.transaction_type.value}:"
+        f"{renft_datum.cursor}"
+    )
+
+
+def record(
+    renft_datum: ReNFTDatum, destination: str, payload: dict[str, Any]
+) -> OutboxMessage:
+    msg = OutboxMessage(
+        get_idempotency_key(renft_datum),
+        destination,
+        payload,
+        event_at=renft_datum.timestamp,
+        trace_id=renft_datum.trace_id,
+    )
+    # A message a backfill already sent for an event the live bot has yet to
+    # observe must stay sent, or the bot would post it again.
+    if is_sent(msg):
+        return msg
+    OutboxModel.update_or_create(
+        idempotency_key=msg.idempotency_key,
+        destination=destination,
+        defaults={
+            "payload": json.dumps(payload),
+            "status": PENDING,
+            "attempts": 0,
+            "created_at": time.time(),
+        },
+    )
+    return msg
+
+
+def pending_messages() -> list[OutboxMessage]:
+    rows = sorted(OutboxModel.filter(status=PENDING), key=lambda m: m.created_at)
+    return [
+        OutboxMessage(m.idempotency_key, m.destination, json_codec.loads(m.payload))
+        for m in rows
+    ]
+
+
+def mark(msg: OutboxMessage, status: str):
+    OutboxModel.update_or_create(
+        idempotency_key=msg.idempotency_key,
+        destination=msg.destination,
+        defaults={"status": status, "attempts": msg.attempts},
+    )
+
+
+def get_status(msg: OutboxMessage) -> Optional[str]:
+    m = OutboxModel.get_or_none(
+        idempotency_key=msg.idempotency_key, destination=msg.destination
+    )
+    return m.status if m is not None else None
+
+
+def is_sent(msg: OutboxMessage) -> bool:
+    return get_status(msg) == SENT
+
+
+def prune(older_than_s: float):
+    cutoff = time.time() - older_than_s
+    with db.get_backend().transaction():
+        for status in (SENT, FAILED, DROPPED):
+            for m in OutboxModel.filter(status=status):
+                if m.created_at < cutoff:
+                    OutboxModel.delete(
+                        idempotency_key=m.idempotency_key, destination=m.destination
+                    )
+
+
+def observe_lag(msg: OutboxMessage):
+    if msg.event_at is not None:
+        DELIVERY_LAG_SECONDS.observe(
+            time.time() - msg.event_at, destination=msg.destination
+        )
+
+
+def trace_ids(msgs: list[OutboxMessage]) -> list[str]:
+    return [m.trace_id for m in msgs if m.trace_id is not None]
+
+
+def deliverer(
+    send: Callable[[dict[str, Any]], None]
+) -> Callable[[OutboxMessage], None]:
+    def deliver(msg: OutboxMessage):
+        if is_sent(msg):
+            logger.debug(
+                f"Skipping already sent {msg.destination} {msg.idempotency_key}"
+            )
+            return
+        msg.attempts += 1
+        with tracer.span(trace_ids([msg]), f"send.{msg.destination}"):
+            send(msg.payload)
+        mark(msg, SENT)
+        observe_lag(msg)
+
+    return deliver
+
+
+def is_rejected(e: requests.HTTPError) -> bool:
+    # A 4xx other than a rate limit means the request itself was bad, so
+    # sending it again won't help.
+    if e.response is None:
+        return False
+    return 400 <= e.response.status_code < 500 and e.response.status_code != 429
+
+
+def reject(msg: OutboxMessage, e: requests.HTTPError):
+    logger.error(f"{msg.destination} rejected message {msg.idempotency_key}: {e}")
+    mark(msg, FAILED)
+
+
+def batch_deliverer(
+    send: Callable[[list[dict[str, Any]]], None]
+) -> Callable[[list[OutboxMessage]], None]:
+    def send_batch(msgs: list[OutboxMessage]):
+        with tracer.span(trace_ids(msgs), f"send.{msgs[0].destination}"):
+            send([m.payload for m in msgs])
+        with db.get_backend().transaction():
+            for msg in msgs:
+                mark(msg, SENT)
+        for msg in msgs:
+            observe_lag(msg)
+
+    def deliver(msgs: list[OutboxMessage]):
+        # Messages rejected while retrying a batch one by one aren't resent
+        unsent = [m for m in msgs if get_status(m) not in (SENT, FAILED)]
+        if not unsent:
+            return
+        for msg in unsent:
+            msg.attempts += 1
+        try:
+            send_batch(unsent)
+            return
+        except requests.HTTPError as e:
+            if not is_rejected(e):
+                raise
+            if len(unsent) == 1:
+                reject(unsent[0], e)
+                return
+            logger.warning(
+                f"{unsent[0].destination} rejected a batch of {len(unsent)}, "
+                "sending its messages one by one."
+            )
+        # One bad message shouldn't hold back the rest of its batch
+        for msg in unsent:
+            try:
+                send_batch([msg])
+            except requests.HTTPError as e:
+                if not is_rejected(e):
+                    raise
+                reject(msg, e)
+
+    return deliver
+
+
+def give_up(msg: OutboxMessage):
+    # Part of a batch may have been settled one by one before the rest failed
+    if get_status(msg) in (SENT, FAILED):
+        return
+    # The row stays pending, so an outage longer than the retries only delays
+    # the message until the next start instead of losing it.
+    logger.error(
+        f"Giving up on {msg.destination} message {msg.idempotency_key} "
+        f"after {msg.attempts} attempts, retrying it on the next start."
+    )
+    mark(msg, PENDING)
+
+
+def drop(msg: OutboxMessage):
+    # A message dropped by a full queue must not be resent after a restart
+    mark(msg, DROPPED)
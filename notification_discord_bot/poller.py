@@ -0,0 +1,50 @@
+import asyncio
+from dataclasses import dataclass
+
+from notification_discord_bot.constants import SUBGRAPH_COMBINED_QUERY
+from notification_discord_bot.renft import ReNFTContract, ReNFTDatum, TransactionType
+from notification_discord_bot.watermarks import watermarks
+
+
+@dataclass
+class ContractUpdates:
+    contract: ReNFTContract
+    lendings: list[ReNFTDatum]
+    rentings: list[ReNFTDatum]
+
+
+def get_new_lendings(contract: ReNFTContract) -> list[ReNFTDatum]:
+    cursor = watermarks.get(contract.name, TransactionType.LEND)
+    if cursor is None:
+        # Reversed because the order is originally descending,
+        # but we want observe in ascending order
+        return list(reversed(contract.get_lendings()))
+    return contract.get_lendings_since(cursor)
+
+
+def get_new_rentings(contract: ReNFTContract) -> list[ReNFTDatum]:
+    cursor = watermarks.get(contract.name, TransactionType.RENT)
+    if cursor is None:
+        return list(reversed(contract.get_rentings()))
+    return contract.get_rentings_since(cursor)
+
+
+async def fetch_updates(contract: ReNFTContract) -> ContractUpdates:
+    # The subgraph client is blocking, so each request runs in a worker thread
+    # and is bounded by the contract's own query_timeout.
+    lending_cursor = watermarks.get(contract.name, TransactionType.LEND)
+    renting_cursor = watermarks.get(contract.name, TransactionType.RENT)
+    if (
+        SUBGRAPH_COMBINED_QUERY
+        and lending_cursor is not None
+        and renting_cursor is not None
+    ):
+        lendings, rentings = await asyncio.to_thread(
+            contract.get_updates_since, lending_cursor, renting_cursor
+        )
+    else:
+        lendings, rentings = await asyncio.gather(
+            asyncio.to_thread(get_new_lendings, contract),
+            asyncio.to_thread(get_new_rentings, contract),
+        )
+    return ContractUpdates(contract, lendings, rentings)
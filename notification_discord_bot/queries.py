@@ -1,8 +1,12 @@
-AZRAEL_GET_LENDINGS_QUERY = """
-{
-    lendings(orderBy: cursor, orderDirection: desc, first: $first, skip: $skip) {
+# Query documents are built once at import time and sent with their values in
+# the request's "variables", so the text of each query never changes between
+# calls. Each selection lists only the fields the contract's transform_* reads.
+# The subgraphs' cursor field is an Int, sent as a number, while timestamps
+# are BigInts, sent as strings.
+
+AZRAEL_LENDING_FIELDS = """
         id
-        cursor,
+        cursor
         lenderAddress
         maxRentDuration
         dailyRentPrice
@@ -12,110 +16,162 @@ AZRAEL_GET_LENDINGS_QUERY = """
         nftAddress
         tokenId
         lentAt
-    }
-}
 """
 
-AZRAEL_GET_RENTINGS_QUERY = """
-{
-    rentings(orderBy: cursor, orderDirection: desc, first: $first, skip: $skip) {
-        id,
-        cursor,
-        renterAddress,
-        rentDuration,
-        rentedAt,
+AZRAEL_RENTING_FIELDS = """
+        id
+        cursor
+        renterAddress
+        rentDuration
+        rentedAt
         lending {
-            id,
-            lenderAddress,
-            paymentToken,
-            nftPrice,
-            dailyRentPrice,
-            lenderAddress,
-            nftAddress,
+            id
+            lenderAddress
+            paymentToken
+            nftPrice
+            dailyRentPrice
+            nftAddress
             tokenId
         }
-    }
-}
 """
 
-
-SYLVESTER_GET_LENDINGS_QUERY = """
-{
-    lendings(orderBy: cursor, orderDirection: desc, first: $first, skip: $skip) {
-        id,
-        cursor,
-        lenderAddress,
-        maxRentDuration,
-        dailyRentPrice,
-        lendAmount,
-        paymentToken,
-        nftAddress,
-        tokenID,
+SYLVESTER_LENDING_FIELDS = """
+        id
+        cursor
+        lenderAddress
+        maxRentDuration
+        dailyRentPrice
+        lendAmount
+        paymentToken
+        nftAddress
+        tokenID
         lentAt
-    }
-}
 """
 
-
-SYLVESTER_GET_RENTINGS_QUERY = """
-{
-    rentings(orderBy: cursor, orderDirection: desc, where: {expired: false}, first: $first, skip: $skip) {
-        id,
-        cursor,
-        renterAddress,
-        rentDuration,
-        rentedAt,
+SYLVESTER_RENTING_FIELDS = """
+        id
+        cursor
+        renterAddress
+        rentDuration
+        rentedAt
         lending {
-            id,
-            lenderAddress,
-            paymentToken,
-            dailyRentPrice,
-            lenderAddress,
-            nftAddress,
+            id
+            lenderAddress
+            paymentToken
+            dailyRentPrice
+            nftAddress
             tokenID
         }
-    }
-}
 """
 
-WHOOPI_GET_LENDINGS_QUERY = """
-{
-    lendings(orderBy: cursor, orderDirection: desc, first: $first, skip: $skip) {
-        id,
-        cursor,
-        lenderAddress,
-        maxRentDuration,
-        paymentToken,
-        nftAddress,
-        tokenId,
-        lentAt,
-        upfrontRentFee,
-        revShareBeneficiaries,
+WHOOPI_LENDING_FIELDS = """
+        id
+        cursor
+        lenderAddress
+        maxRentDuration
+        paymentToken
+        nftAddress
+        tokenId
+        lentAt
+        upfrontRentFee
+        revShareBeneficiaries
         revSharePortions
-    }
-}
 """
 
-
-WHOOPI_GET_RENTINGS_QUERY = """
-{
-    rentings(orderBy: cursor, orderDirection: desc, where: {expired: false}, first: $first, skip: $skip) {
-        id,
-        cursor,
-        renterAddress,
-        rentDuration,
-        rentedAt,
+WHOOPI_RENTING_FIELDS = """
+        id
+        cursor
+        renterAddress
+        rentDuration
+        rentedAt
         lending {
-            id,
-            lenderAddress,
-            paymentToken,
-            lenderAddress,
-            nftAddress,
-            tokenId,
-            upfrontRentFee,
-            revShareBeneficiaries,
+            id
+            lenderAddress
+            paymentToken
+            nftAddress
+            tokenId
+            upfrontRentFee
+            revShareBeneficiaries
             revSharePortions
         }
-    }
-}
 """
+
+
+def get_query(entity: str, fields: str, where: str = "") -> str:
+    where = f"where: {{{where}}}, " if where else ""
+    return f"""
+query Get($first: Int!, $skip: Int!) {{
+    {entity}(orderBy: cursor, orderDirection: desc, {where}first: $first, skip: $skip) {{{fields}    }}
+}}
+"""
+
+
+def sync_query(entity: str, fields: str, where: str = "") -> str:
+    where = f"{where}, " if where else ""
+    return f"""
+query Sync($cursor: Int!, $first: Int!) {{
+    {entity}(orderBy: cursor, orderDirection: asc, where: {{{where}cursor_gt: $cursor}}, first: $first) {{{fields}    }}
+}}
+"""
+
+
+def combined_sync_query(
+    lending_fields: str, renting_fields: str, rentings_where: str = ""
+) -> str:
+    # Both entities in one round trip, each paged from its own cursor
+    rentings_where = f"{rentings_where}, " if rentings_where else ""
+    return f"""
+query SyncAll($lendingsCursor: Int!, $rentingsCursor: Int!, $first: Int!) {{
+    lendings: lendings(orderBy: cursor, orderDirection: asc, where: {{cursor_gt: $lendingsCursor}}, first: $first) {{{lending_fields}    }}
+    rentings: rentings(orderBy: cursor, orderDirection: asc, where: {{{rentings_where}cursor_gt: $rentingsCursor}}, first: $first) {{{renting_fields}    }}
+}}
+"""
+
+
+def cursor_query(entity: str, where: str) -> str:
+    return f"""
+query Cursor($timestamp: BigInt!) {{
+    {entity}(orderBy: cursor, orderDirection: desc, where: {{{where}}}, first: 1) {{
+        cursor
+    }}
+}}
+"""
+
+
+AZRAEL_GET_LENDINGS_QUERY = get_query("lendings", AZRAEL_LENDING_FIELDS)
+AZRAEL_GET_RENTINGS_QUERY = get_query("rentings", AZRAEL_RENTING_FIELDS)
+SYLVESTER_GET_LENDINGS_QUERY = get_query("lendings", SYLVESTER_LENDING_FIELDS)
+SYLVESTER_GET_RENTINGS_QUERY = get_query(
+    "rentings", SYLVESTER_RENTING_FIELDS, "expired: false"
+)
+WHOOPI_GET_LENDINGS_QUERY = get_query("lendings", WHOOPI_LENDING_FIELDS)
+WHOOPI_GET_RENTINGS_QUERY = get_query(
+    "rentings", WHOOPI_RENTING_FIELDS, "expired: false"
+)
+
+AZRAEL_SYNC_LENDINGS_QUERY = sync_query("lendings", AZRAEL_LENDING_FIELDS)
+AZRAEL_SYNC_RENTINGS_QUERY = sync_query("rentings", AZRAEL_RENTING_FIELDS)
+SYLVESTER_SYNC_LENDINGS_QUERY = sync_query("lendings", SYLVESTER_LENDING_FIELDS)
+SYLVESTER_SYNC_RENTINGS_QUERY = sync_query(
+    "rentings", SYLVESTER_RENTING_FIELDS, "expired: false"
+)
+WHOOPI_SYNC_LENDINGS_QUERY = sync_query("lendings", WHOOPI_LENDING_FIELDS)
+WHOOPI_SYNC_RENTINGS_QUERY = sync_query(
+    "rentings", WHOOPI_RENTING_FIELDS, "expired: false"
+)
+
+# Rentings of every status, for replaying history. Azrael has no expiry filter.
+AZRAEL_HISTORY_RENTINGS_QUERY = AZRAEL_SYNC_RENTINGS_QUERY
+SYLVESTER_HISTORY_RENTINGS_QUERY = sync_query("rentings", SYLVESTER_RENTING_FIELDS)
+WHOOPI_HISTORY_RENTINGS_QUERY = sync_query("rentings", WHOOPI_RENTING_FIELDS)
+
+AZRAEL_SYNC_QUERY = combined_sync_query(AZRAEL_LENDING_FIELDS, AZRAEL_RENTING_FIELDS)
+SYLVESTER_SYNC_QUERY = combined_sync_query(
+    SYLVESTER_LENDING_FIELDS, SYLVESTER_RENTING_FIELDS, "expired: false"
+)
+WHOOPI_SYNC_QUERY = combined_sync_query(
+    WHOOPI_LENDING_FIELDS, WHOOPI_RENTING_FIELDS, "expired: false"
+)
+
+LENDING_CURSOR_AT_QUERY = cursor_query("lendings", "lentAt_lte: $timestamp")
+RENTING_CURSOR_AT_QUERY = cursor_query("rentings", "rentedAt_lte: $timestamp")
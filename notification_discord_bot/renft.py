@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from enum import Enum, IntEnum, unique
-from typing import Callable, Optional
+from typing import Any, Iterator, NamedTuple, Optional
 
 import discord
 
@@ -10,6 +10,8 @@ from notification_discord_bot.constants import (
     RENFT_BASE_URL,
     TwitterMessage,
 )
+from notification_discord_bot.currency import Amount
+from notification_discord_bot.tracing import new_trace_id
 
 
 @unique
@@ -43,7 +45,7 @@ EXPLORER_CHAIN_MAPPING = {
 }
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class NonFungibleToken:
     name: str
     nft_address: str
@@ -52,42 +54,48 @@ class NonFungibleToken:
     description: str
 
 
-@dataclass
+class NFTKey(NamedTuple):
+    address: str
+    token_id: str
+    chain: Chain
+
+
+@dataclass(frozen=True, slots=True)
 class Lending:
     cursor: int
-    nft: Callable[[], NonFungibleToken]
+    nft_key: NFTKey
     lending_id: int
     lender_address: str
     max_rent_duration: int
-    daily_rent_price: Optional[float]
+    daily_rent_price: Optional[Amount]
     lent_amount: int
     payment_token: PaymentToken
-    collateral: Optional[float]
+    collateral: Optional[Amount]
     lent_at: int
-    upfront_rent_fee: Optional[float]
+    upfront_rent_fee: Optional[Amount]
     revshare_beneficiaries: Optional[list[str]]
     revshare_portions: Optional[list[int]]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Renting:
     cursor: int
-    nft: Callable[[], NonFungibleToken]
+    nft_key: NFTKey
     lending_id: int
     renting_id: int
     renter_address: str
     rent_duration: int
     rented_at: int
     payment_token: PaymentToken
-    collateral: Optional[float]
-    daily_rent_price: Optional[float]
+    collateral: Optional[Amount]
+    daily_rent_price: Optional[Amount]
     lender_address: str
-    upfront_rent_fee: Optional[float]
+    upfront_rent_fee: Optional[Amount]
     revshare_beneficiaries: Optional[list[str]]
     revshare_portions: Optional[list[int]]
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class RewardShare:
     lender: int
     renter: int
@@ -103,6 +111,30 @@ class ReNFTContract(ABC):
     def get_rentings(self) -> list["ReNFTDatum"]:
         pass
 
+    @abstractmethod
+    def get_lendings_since(self, cursor) -> list["ReNFTDatum"]:
+        pass
+
+    @abstractmethod
+    def get_rentings_since(self, cursor) -> list["ReNFTDatum"]:
+        pass
+
+    @abstractmethod
+    def iter_lendings_since(self, cursor) -> Iterator["ReNFTDatum"]:
+        pass
+
+    @abstractmethod
+    def iter_rentings_since(
+        self, cursor, include_expired=False
+    ) -> Iterator["ReNFTDatum"]:
+        pass
+
+    @abstractmethod
+    def get_updates_since(
+        self, lending_cursor, renting_cursor
+    ) -> tuple[list["ReNFTDatum"], list["ReNFTDatum"]]:
+        pass
+
     @abstractmethod
     def is_collateral_free(self) -> bool:
         pass
@@ -121,11 +153,36 @@ class ReNFTContract(ABC):
     def query_url(self) -> str:
         pass
 
+    @property
+    @abstractmethod
+    def query_timeout(self) -> float:
+        pass
+
 
 class ReNFTDatum(ABC):
+    # Slotted, since a backfill keeps thousands of these alive at once
+    __slots__ = ("contract", "transaction_type", "trace_id")
+
     def __init__(self, contract: ReNFTContract, transaction_type: TransactionType):
         self.contract = contract
         self.transaction_type = transaction_type
+        # Ties together the log lines and spans of this event's notifications
+        self.trace_id = new_trace_id()
+
+    @property
+    @abstractmethod
+    def cursor(self):
+        pass
+
+    @property
+    @abstractmethod
+    def nft_key(self) -> NFTKey:
+        pass
+
+    @property
+    @abstractmethod
+    def timestamp(self) -> int:
+        pass
 
     @abstractmethod
     def build_discord_message(self) -> discord.Embed:
@@ -143,6 +200,10 @@ class ReNFTDatum(ABC):
     def observe(self):
         pass
 
+    @abstractmethod
+    def to_dict(self) -> dict[str, Any]:
+        pass
+
 
 def get_lending_url(contract: ReNFTContract, lending_id: str | int):
     if contract.name == AVALANCHE_WHOOPI_CONTRACT_NAME:
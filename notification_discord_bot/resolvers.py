@@ -9,7 +9,7 @@ from notification_discord_bot.constants import (
 from notification_discord_bot.renft import PaymentToken
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PaymentTokenDetails:
     address: str
     scale: int
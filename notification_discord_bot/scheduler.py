@@ -0,0 +1,39 @@
+import time
+from dataclasses import dataclass, field
+
+MAX_BACKOFF_EXPONENT = 16
+
+
+@dataclass
+class PollSchedule:
+    min_interval_s: float
+    max_interval_s: float
+    interval_s: float
+    # Applied to the interval after a poll that found events or found nothing
+    speedup: float = 0.5
+    slowdown: float = 1.5
+    max_error_interval_s: float = 600
+    errors: int = 0
+    next_run_at: float = field(default_factory=time.monotonic)
+
+    def delay(self, now: float) -> float:
+        return max(self.next_run_at - now, 0)
+
+    def record_success(self, started_at: float, events: int):
+        self.errors = 0
+        factor = self.speedup if events else self.slowdown
+        self.interval_s = min(
+            max(self.interval_s * factor, self.min_interval_s), self.max_interval_s
+        )
+        # Measured from when the poll started so the time spent polling
+        # doesn't stretch the period.
+        self.next_run_at = started_at + self.interval_s
+
+    def record_error(self, started_at: float):
+        self.errors += 1
+        # The exponent is capped so a long outage can't overflow the float
+        backoff = min(
+            self.interval_s * 2 ** min(self.errors, MAX_BACKOFF_EXPONENT),
+            max(self.max_error_interval_s, self.interval_s),
+        )
+        self.next_run_at = started_at + backoff
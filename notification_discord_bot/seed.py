@@ -1,31 +1,108 @@
-from notification_discord_bot import db
-from notification_discord_bot.contracts import all_contracts, contract_is_enabled
+from typing import Any, Optional
+
+from notification_discord_bot import constants, db
+from notification_discord_bot.contracts import (
+    all_contracts,
+    contract_is_enabled,
+    get_cursor_at,
+)
 from notification_discord_bot.logger import logger
 from notification_discord_bot.models import ReNFTModel
+from notification_discord_bot.renft import ReNFTContract, ReNFTDatum, TransactionType
+from notification_discord_bot.watermarks import watermarks
+
+# cursor_gt this starts from the first event
+FIRST_CURSOR = -1
 
 
 def contract_is_seeded(contract_name: str) -> bool:
     return len(ReNFTModel.filter(contract_name=contract_name)) != 0
 
 
-def seed_renft():
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None or cursor == "":
+        return None
+    return int(cursor)
+
+
+def latest_cursor(data: list[ReNFTDatum]) -> Optional[Any]:
+    return max((d.cursor for d in data), default=None)
+
+
+def get_seed_cursors(
+    contract: ReNFTContract,
+    lending_cursor: Optional[Any] = None,
+    renting_cursor: Optional[Any] = None,
+    timestamp: Optional[int] = None,
+) -> dict[TransactionType, Optional[Any]]:
+    if timestamp is not None:
+        # Nothing at or before the timestamp means everything after it, which
+        # starts before the first event.
+        if lending_cursor is None:
+            lending_cursor = get_cursor_at(contract, TransactionType.LEND, timestamp)
+            lending_cursor = FIRST_CURSOR if lending_cursor is None else lending_cursor
+        if renting_cursor is None:
+            renting_cursor = get_cursor_at(contract, TransactionType.RENT, timestamp)
+            renting_cursor = FIRST_CURSOR if renting_cursor is None else renting_cursor
+    if lending_cursor is None:
+        lending_cursor = latest_cursor(contract.get_lendings())
+    if renting_cursor is None:
+        renting_cursor = latest_cursor(contract.get_rentings())
+    return {TransactionType.LEND: lending_cursor, TransactionType.RENT: renting_cursor}
+
+
+def seed_contract(
+    contract: ReNFTContract,
+    lending_cursor: Optional[Any] = None,
+    renting_cursor: Optional[Any] = None,
+    timestamp: Optional[int] = None,
+):
+    logger.info(f"Seeding {contract.name}")
+    cursors = get_seed_cursors(contract, lending_cursor, renting_cursor, timestamp)
+    for transaction_type, cursor in cursors.items():
+        if cursor is None:
+            # Nothing to skip yet. Seeding before the first event marks the
+            # contract as seeded, so its first event is synced and announced
+            # instead of being absorbed by another seed.
+            logger.info(
+                f"No {transaction_type.value} events yet for {contract.name}, "
+                "announcing from the first one"
+            )
+            cursor = FIRST_CURSOR
+        watermarks.advance(contract.name, transaction_type, cursor)
+
+
+def seed_renft(
+    lending_cursor: Optional[Any] = None,
+    renting_cursor: Optional[Any] = None,
+    timestamp: Optional[int] = None,
+):
+    # Only the newest cursor per (contract, transaction type) matters, so the
+    # watermarks are advanced in memory and persisted by a single flush.
     for contract in all_contracts:
         if contract_is_seeded(contract.name) or not contract_is_enabled(contract):
             continue
+        try:
+            seed_contract(contract, lending_cursor, renting_cursor, timestamp)
+        except Exception:
+            # The contract is seeded again before its first poll instead
+            logger.exception(f"Cannot seed {contract.name}")
 
-        logger.info(f"Seeding lendings for {contract.name}")
-        lendings = contract.get_lendings()
-        for lending in lendings:
-            lending.observe()
 
-        logger.info(f"Seeding rentings for {contract.name}")
-        rentings = contract.get_rentings()
-        for renting in rentings:
-            renting.observe()
+def seed_options() -> dict[str, Any]:
+    return {
+        "lending_cursor": parse_cursor(constants.SEED_LENDING_CURSOR),
+        "renting_cursor": parse_cursor(constants.SEED_RENTING_CURSOR),
+        "timestamp": int(constants.SEED_TIMESTAMP)
+        if constants.SEED_TIMESTAMP
+        else None,
+    }
 
 
 def seed():
     if not db.is_initialized():
         db.initialize()
 
-    seed_renft()
+    watermarks.load()
+    seed_renft(**seed_options())
+    watermarks.flush()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, Optional
+
+from notification_discord_bot.constants import TRACE_EXPORT_PATH
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+@dataclass(frozen=True, slots=True)
+class Span:
+    trace_id: str
+    name: str
+    start_ns: int
+    end_ns: int
+    attributes: dict[str, Any] = field(default_factory=dict)
+    span_id: str = field(default_factory=new_span_id)
+
+    @property
+    def duration_s(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e9
+
+
+def otlp_value(value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def from_otlp_value(value: dict[str, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()))
+
+
+class FileExporter:
+    # Each line is an OTLP/JSON ExportTraceServiceRequest, the format the
+    # OpenTelemetry collector's file receiver and exporter use.
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]):
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": otlp_value("notification-discord-bot"),
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "notification_discord_bot"},
+                            "spans": [
+                                {
+                                    "traceId": s.trace_id,
+                                    "spanId": s.span_id,
+                                    "name": s.name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(s.start_ns),
+                                    "endTimeUnixNano": str(s.end_ns),
+                                    "attributes": [
+                                        {"key": k, "value": otlp_value(v)}
+                                        for k, v in s.attributes.items()
+                                    ],
+                                }
+                                for s in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def read_spans(path: str) -> Iterator[Span]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            for resource_spans in json.loads(line)["resourceSpans"]:
+                for scope_spans in resource_spans["scopeSpans"]:
+                    for s in scope_spans["spans"]:
+                        yield Span(
+                            trace_id=s["traceId"],
+                            name=s["name"],
+                            start_ns=int(s["startTimeUnixNano"]),
+                            end_ns=int(s["endTimeUnixNano"]),
+                            attributes={
+                                a["key"]: from_otlp_value(a["value"])
+                                for a in s.get("attributes", [])
+                            },
+                            span_id=s["spanId"],
+                        )
+
+
+class Tracer:
+    def __init__(self, exporter: Optional[FileExporter]):
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def record(
+        self, trace_ids: Iterable[str], name: str, start_ns: int, end_ns: int, **attrs
+    ):
+        # A stage that ran once for several events, like a subgraph page or a
+        # batched webhook post, is recorded as a span in each event's trace.
+        if self.exporter is None:
+            return
+        spans = [Span(t, name, start_ns, end_ns, attrs) for t in trace_ids]
+        if spans:
+            self.exporter.export(spans)
+
+    @contextmanager
+    def span(self, trace_ids: Iterable[str], name: str, **attrs) -> Iterator[None]:
+        start_ns = time.time_ns()
+        try:
+            yield
+        except BaseException:
+            self.record(trace_ids, name, start_ns, time.time_ns(), error=True, **attrs)
+            raise
+        self.record(trace_ids, name, start_ns, time.time_ns(), **attrs)
+
+
+tracer = Tracer(FileExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    return sorted_values[max(math.ceil(p * len(sorted_values)) - 1, 0)]
+
+
+def summarize(spans: Iterable[Span], since_ns: int) -> dict[str, list[float]]:
+    durations: dict[str, list[float]] = defaultdict(list)
+    event_at: dict[str, float] = {}
+    last_send_ns: dict[str, int] = {}
+    for s in spans:
+        if s.end_ns < since_ns:
+            continue
+        durations[s.name].append(s.duration_s)
+        if "event_at" in s.attributes:
+            event_at[s.trace_id] = s.attributes["event_at"]
+        if s.name.startswith("send.") and not s.attributes.get("error"):
+            last_send_ns[s.trace_id] = max(last_send_ns.get(s.trace_id, 0), s.end_ns)
+    # From the lending or renting on chain to its last notification being sent
+    for trace_id, end_ns in last_send_ns.items():
+        if trace_id in event_at:
+            durations["event_to_send"].append(end_ns / 1e9 - event_at[trace_id])
+    return {name: sorted(values) for name, values in durations.items()}
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Print per-stage notification latency percentiles."
+    )
+    parser.add_argument("--path", default=TRACE_EXPORT_PATH, required=False)
+    parser.add_argument(
+        "--window", type=float, default=3600, help="seconds to look back"
+    )
+    args = parser.parse_args(argv)
+    if not args.path:
+        parser.error("--path is required when TRACE_EXPORT_PATH is not set")
+
+    since_ns = time.time_ns() - int(args.window * 1e9)
+    stages = summarize(read_spans(args.path), since_ns)
+    print(f"{'stage':<24}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, values in sorted(stages.items()):
+        print(
+            f"{name:<24}{len(values):>8}"
+            + "".join(f"{percentile(values, p):>10.3f}" for p in (0.5, 0.95, 0.99))
+        )
+
+
+if __name__ == "__main__":
+    main()
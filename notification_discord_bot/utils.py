@@ -1,9 +1,9 @@
-import json
+from typing import Any, Iterator
 
-import requests
-
-from notification_discord_bot import constants
+from notification_discord_bot import constants, json_codec
+from notification_discord_bot.http_client import session
 from notification_discord_bot.logger import logger
+from notification_discord_bot.metrics import SUBGRAPH_QUERY_SECONDS
 
 
 def twitter_enabled() -> bool:
@@ -22,25 +22,88 @@ def discord_enabled() -> bool:
     return constants.DISCORD_WEBHOOK is not None
 
 
-def construct_the_graph_query(query: str, first: int, skip: int) -> str:
-    query = query.replace("$first", str(first))
-    query = query.replace("$skip", str(skip))
-    return query
-
-
 def query_the_graph(
-    query_url: str, query: str, first=constants.DEFAULT_PAGE_SIZE, skip=0
+    query_url: str,
+    query: str,
+    timeout: float = constants.SUBGRAPH_TIMEOUT_S,
+    contract_name: str = "",
+    **variables,
 ):
-    the_graph_query = construct_the_graph_query(query, first, skip)
-    res = requests.post(query_url, json={"query": the_graph_query}, timeout=20)
+    with SUBGRAPH_QUERY_SECONDS.time(contract=contract_name):
+        res = session.post(
+            query_url, json={"query": query, "variables": variables}, timeout=timeout
+        )
     res.raise_for_status()
-    data = json.loads(res.content)
+    data = json_codec.loads(res.content)
     if errors := data.get("errors"):
-        logger.error(f"Error in {query_url} with query:\n{the_graph_query}")
+        logger.error(
+            f"Error in {query_url} with variables {variables} and query:\n{query}"
+        )
         raise RuntimeError(str(errors))
     return data
 
 
+def paginate_the_graph(  # pylint: disable=too-many-arguments
+    query_url: str,
+    query: str,
+    entity: str,
+    cursor: Any,
+    first=constants.DEFAULT_PAGE_SIZE,
+    timeout: float = constants.SUBGRAPH_TIMEOUT_S,
+    contract_name: str = "",
+) -> Iterator[dict[str, Any]]:
+    # Keyset pagination: each page starts after the last cursor of the previous
+    # one, so rows inserted while paging are neither skipped nor repeated.
+    while True:
+        data = query_the_graph(
+            query_url,
+            query,
+            timeout=timeout,
+            contract_name=contract_name,
+            cursor=cursor,
+            first=first,
+        )
+        rows = data.get("data", {}).get(entity, [])
+        yield from rows
+        if len(rows) < first:
+            return
+        cursor = rows[-1]["cursor"]
+
+
+def paginate_the_graph_entities(  # pylint: disable=too-many-arguments
+    query_url: str,
+    query: str,
+    cursors: dict[str, Any],
+    first=constants.DEFAULT_PAGE_SIZE,
+    timeout: float = constants.SUBGRAPH_TIMEOUT_S,
+    contract_name: str = "",
+) -> dict[str, list[dict[str, Any]]]:
+    # Like paginate_the_graph for a query that selects several entities, each
+    # paged from its own $<entity>Cursor variable. Pages are requested until
+    # every entity has caught up.
+    cursors = dict(cursors)
+    out: dict[str, list[dict[str, Any]]] = {entity: [] for entity in cursors}
+    while True:
+        data = query_the_graph(
+            query_url,
+            query,
+            timeout=timeout,
+            contract_name=contract_name,
+            first=first,
+            **{f"{entity}Cursor": cursor for entity, cursor in cursors.items()},
+        )
+        caught_up = True
+        for entity in cursors:
+            rows = data.get("data", {}).get(entity, [])
+            out[entity].extend(rows)
+            if rows:
+                cursors[entity] = rows[-1]["cursor"]
+            if len(rows) >= first:
+                caught_up = False
+        if caught_up:
+            return out
+
+
 def normalize_ipfs_url(url: str) -> str:
     if not url.startswith("ipfs://"):
         return url
@@ -0,0 +1,69 @@
+import threading
+from typing import Any, Optional
+
+from notification_discord_bot import db
+from notification_discord_bot.logger import logger
+from notification_discord_bot.models import ReNFTModel
+from notification_discord_bot.renft import TransactionType
+
+WatermarkKey = tuple[str, TransactionType]
+
+
+class WatermarkCache:
+    def __init__(self):
+        self._cursors: dict[WatermarkKey, Any] = {}
+        self._dirty: set[WatermarkKey] = set()
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            self._cursors = {
+                (m.contract_name, TransactionType(m.transaction_type)): m.renft_id
+                for m in ReNFTModel.filter()
+            }
+            self._dirty.clear()
+            self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.load()
+
+    def get(
+        self, contract_name: str, transaction_type: TransactionType
+    ) -> Optional[Any]:
+        self._ensure_loaded()
+        return self._cursors.get((contract_name, transaction_type))
+
+    def has_contract(self, contract_name: str) -> bool:
+        self._ensure_loaded()
+        return any(name == contract_name for name, _ in self._cursors)
+
+    def advance(self, contract_name: str, transaction_type: TransactionType, cursor):
+        self._ensure_loaded()
+        key = (contract_name, transaction_type)
+        with self._lock:
+            current = self._cursors.get(key)
+            if current is None or cursor > current:
+                self._cursors[key] = cursor
+                self._dirty.add(key)
+
+    def flush(self):
+        # The backend lock is taken before ours, in the same order as callers
+        # that observe inside a transaction, so concurrent pollers can't deadlock.
+        with db.get_backend().transaction(), self._lock:
+            if not self._dirty:
+                return
+            for contract_name, transaction_type in self._dirty:
+                ReNFTModel.update_or_create(
+                    contract_name=contract_name,
+                    transaction_type=transaction_type,
+                    defaults={
+                        "renft_id": self._cursors[(contract_name, transaction_type)]
+                    },
+                )
+            logger.debug(f"Flushed {len(self._dirty)} watermarks.")
+            self._dirty.clear()
+
+
+watermarks = WatermarkCache()
@@ -0,0 +1,10 @@
+import pytest
+
+from notification_discord_bot import db
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "missing.json"))
+    monkeypatch.setattr(db, "backend", db.SQLiteBackend(str(tmp_path / "db.sqlite3")))
+    db.initialize()
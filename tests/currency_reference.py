@@ -0,0 +1,103 @@
+# The string-based implementations currency.py used before its integer fast
+# paths, kept to check the two agree.
+
+import re
+
+from notification_discord_bot.constants import PRICE_BITSIZE, ZEROS
+from notification_discord_bot.currency import decimal_to_padded_hex_string
+
+
+def get_multiplier(decimals: int) -> str:
+    if 0 <= decimals <= 256 and not decimals % 1:
+        return "1" + ZEROS[0:decimals]
+    raise ValueError(f"Invalid decimal size: {decimals}")
+
+
+def reference_unpack_price(price: str) -> float:
+    num_hex = decimal_to_padded_hex_string(int(price, 16), PRICE_BITSIZE)[2:]
+    whole = min(int(num_hex[0:4], 16), 9999)
+    decimal = min(int(num_hex[4:], 16), 9999)
+
+    decimal_str = str(decimal)
+    MAX_LEN = 4
+    for _ in range(0, MAX_LEN - len(decimal_str)):
+        decimal_str = "0" + decimal_str
+
+    return float(f"{whole}.{decimal_str}")
+
+
+def reference_format_fixed(value: int, decimals: int = 0) -> str:
+    multiplier = get_multiplier(decimals)
+
+    negative = value < 0
+    if negative:
+        value = value * -1
+
+    fraction = str(value % int(multiplier))
+    while len(fraction) < len(multiplier) - 1:
+        fraction = "0" + fraction
+
+    # Strip trailing 0
+    pattern = re.compile(r"^([0-9]*[1-9]|0)(0*)")
+    m = pattern.match(fraction)
+    if not m:
+        raise ValueError("Cannot strip trailing zeros: {fraction}")
+    fraction = m.groups()[0]
+
+    whole = str(value // int(multiplier))
+
+    if len(multiplier) == 1:
+        new_value = whole
+    else:
+        new_value = whole + "." + fraction
+
+    if negative:
+        new_value = "-" + new_value
+
+    return new_value
+
+
+def reference_parse_fixed(value: str, decimals: int = 0) -> int:
+    multiplier = get_multiplier(decimals)
+
+    # Is it negative?
+    negative = value[0] == "-"
+    if negative:
+        value = value[1:]
+
+    if value == ".":
+        raise ValueError(f"Missing value: {value}")
+
+    # Split it into a whole and fractional part
+    comps = value.split(".")
+    if len(comps) > 2:
+        raise ValueError(f"Too many decimal points: {value}")
+
+    whole = comps[0] if len(comps) >= 1 else "0"
+    fraction = comps[1] if len(comps) == 2 else "0"
+
+    # Trim trailing zeros
+    while len(fraction) > 0 and fraction[-1] == "0":
+        fraction = fraction[0 : len(fraction) - 1]
+
+    # Check the fraction doesn't exceed our decimals size
+    if len(fraction) > len(multiplier) - 1:
+        raise ValueError("Fractional component exceeds decimals: underflow")
+
+    # If decimals is 0, we have an empty string for fraction
+    if fraction == "":
+        fraction = "0"
+
+    # Fully pad the string with zeros to get to wei
+    while len(fraction) < len(multiplier) - 1:
+        fraction += "0"
+
+    whole_value = int(whole)
+    fraction_value = int(fraction)
+
+    wei = (whole_value * int(multiplier)) + fraction_value
+
+    if negative:
+        wei = wei * -1
+
+    return wei
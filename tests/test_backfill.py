@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+
+from notification_discord_bot import backfill
+from notification_discord_bot.renft import TransactionType
+
+
+class FakeDatum:
+    def __init__(self, cursor: int):
+        self.cursor = cursor
+
+    def to_dict(self):
+        return {"cursor": self.cursor}
+
+
+class FakeContract:
+    name = "contract"
+
+    def __init__(self, events: int):
+        self.events = events
+        self.produced = 0
+
+    def iter_lendings_since(self, cursor):
+        for c in range(cursor + 1, self.events):
+            self.produced += 1
+            yield FakeDatum(c)
+
+    def iter_rentings_since(self, cursor, include_expired=False):
+        assert include_expired
+        yield from self.iter_lendings_since(cursor)
+
+
+def test_streams_range_and_stops_paging_after_it():
+    contract = FakeContract(events=10_000)
+    export = io.StringIO()
+    throughput = backfill.Throughput()
+
+    backfill.backfill(
+        contract,
+        TransactionType.LEND,
+        from_cursor=9,
+        to_cursor=250,
+        export=export,
+        throughput=throughput,
+    )
+
+    cursors = [json.loads(line)["cursor"] for line in export.getvalue().splitlines()]
+    assert cursors == list(range(10, 251))
+    assert throughput.events == 241
+    # Only one event past the end of the range is ever pulled from the subgraph
+    assert contract.produced == 242
+
+
+def test_replays_from_the_first_event():
+    contract = FakeContract(events=5)
+    events = backfill.iter_events(contract, TransactionType.RENT, None, None)
+    assert [e.cursor for e in events] == [0, 1, 2, 3, 4]
+
+
+def test_resolve_cursor_from_timestamp(monkeypatch):
+    monkeypatch.setattr(backfill, "get_cursor_at", lambda *_: None)
+    assert backfill.resolve_cursor(None, TransactionType.LEND, None, 100) == -1
+    assert backfill.resolve_cursor(None, TransactionType.LEND, 7, 100) == 7
+    assert backfill.resolve_cursor(None, TransactionType.LEND, None, None) is None
+
+
+def test_notify_skips_events_the_live_bot_observed():
+    class ObservedDatum(FakeDatum):
+        def has_been_observed(self):
+            return True
+
+        def build_discord_message(self):
+            pytest.fail("observed events are not announced again")
+
+    backfill.notify(None, ObservedDatum(1))
@@ -0,0 +1,94 @@
+import re
+
+from notification_discord_bot import utils
+from notification_discord_bot.contracts import (
+    AvalancheWhoopiContract,
+    EthereumAzraelContract,
+    all_contracts,
+    get_cursor_at,
+)
+from notification_discord_bot.currency import Amount
+from notification_discord_bot.renft import TransactionType
+from notification_discord_bot.seed import FIRST_CURSOR
+
+
+def test_whoopi_upfront_fee_keeps_every_decimal():
+    lending = AvalancheWhoopiContract().transform_lending(
+        {
+            "id": "1",
+            "cursor": 1,
+            "lenderAddress": "0xlender",
+            "maxRentDuration": "3",
+            "paymentToken": "1",
+            "nftAddress": "0xnft",
+            "tokenId": "7",
+            "lentAt": "1660000000",
+            "upfrontRentFee": "1234567890123456789",
+            "revShareBeneficiaries": [],
+            "revSharePortions": [],
+        }
+    )
+
+    assert lending.lending.upfront_rent_fee == Amount(1234567890123456789, 18)
+    assert lending.to_dict()["upfront_rent_fee"] == "1.234567890123456789"
+
+
+def test_azrael_prices_are_unpacked_to_amounts():
+    lending = EthereumAzraelContract().transform_lending(
+        {
+            "id": "1",
+            "cursor": 1,
+            "lenderAddress": "0xlender",
+            "maxRentDuration": "3",
+            "dailyRentPrice": "0x000103E8",
+            "lentAmount": "1",
+            "nftPrice": "0x00150000",
+            "paymentToken": "2",
+            "nftAddress": "0xnft",
+            "tokenId": "7",
+            "lentAt": "1660000000",
+        }
+    )
+
+    assert str(lending.lending.daily_rent_price) == "1.1"
+    assert str(lending.lending.collateral) == "21.0"
+
+
+# How each GraphQL scalar in the query declarations is sent in the variables
+SCALAR_TYPES = {"Int": int, "BigInt": str}
+
+
+def test_declared_variable_types_match_sent_values(monkeypatch):
+    sent = []
+
+    class FakeResponse:
+        content = b'{"data": {"lendings": [], "rentings": []}}'
+
+        def raise_for_status(self):
+            pass
+
+    def post(_, json, **__):
+        sent.append(json)
+        return FakeResponse()
+
+    monkeypatch.setattr(utils.session, "post", post)
+    for contract in all_contracts:
+        monkeypatch.setattr(type(contract), "query_url", "https://subgraph.test")
+        contract.get_lendings()
+        contract.get_rentings()
+        contract.get_lendings_since(FIRST_CURSOR)
+        list(contract.iter_rentings_since(FIRST_CURSOR, include_expired=True))
+        contract.get_rentings_since(7)
+        contract.get_updates_since(FIRST_CURSOR, 7)
+        for transaction_type in TransactionType:
+            get_cursor_at(contract, transaction_type, 1660000000)
+
+    assert sent
+    for request in sent:
+        declared = dict(
+            re.findall(r"\$(\w+): (\w+)!", request["query"].split("{", 1)[0])
+        )
+        assert declared.keys() == request["variables"].keys()
+        for name, value in request["variables"].items():
+            assert isinstance(value, SCALAR_TYPES[declared[name]]), (name, value)
+            assert not isinstance(value, bool), (name, value)
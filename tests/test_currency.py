@@ -1,12 +1,24 @@
+import random
+
 import pytest
 
 from notification_discord_bot.currency import (
+    Amount,
     bytes_to_nibbles,
     format_fixed,
+    format_fixeds,
     pack_price,
     parse_fixed,
+    parse_fixeds,
     to_padded_hex,
     unpack_price,
+    unpack_price_amount,
+    unpack_prices,
+)
+from tests.currency_reference import (
+    reference_format_fixed,
+    reference_parse_fixed,
+    reference_unpack_price,
 )
 
 
@@ -126,3 +138,77 @@ class TestParseFixed:
         decimals = 6
         parsed = parse_fixed(value, decimals)
         assert parsed == 100000
+
+
+def random_prices(rng: random.Random, count: int) -> list[str]:
+    # Mostly packed 32 bit prices, plus zero, the maximum and wider values
+    prices = [f"0x{rng.getrandbits(32):08X}" for _ in range(count)]
+    prices += ["0x00000000", "0xFFFFFFFF", "0x270F270F", "0x1", "-0x1"]
+    prices += [hex(rng.getrandbits(rng.randint(33, 64))) for _ in range(count // 10)]
+    return prices
+
+
+def random_fixed(rng: random.Random, count: int) -> list[tuple[int, int]]:
+    values = [
+        (rng.randrange(-(10**30), 10**30), rng.choice((0, 1, 2, 6, 8, 18)))
+        for _ in range(count)
+    ]
+    return values + [(0, 18), (10**18, 18), (-5, 0), (7, 1)]
+
+
+class TestEquivalence:
+    def test_unpack_price(self):
+        prices = random_prices(random.Random(0), 2000)
+        expected = [reference_unpack_price(p) for p in prices]
+        assert [unpack_price(p) for p in prices] == expected
+        assert unpack_prices(prices) == expected
+
+    def test_format_fixed(self):
+        for value, decimals in random_fixed(random.Random(1), 2000):
+            assert format_fixed(value, decimals) == reference_format_fixed(
+                value, decimals
+            )
+
+    def test_parse_fixed(self):
+        for value, decimals in random_fixed(random.Random(2), 2000):
+            formatted = reference_format_fixed(value, decimals)
+            assert parse_fixed(formatted, decimals) == reference_parse_fixed(
+                formatted, decimals
+            )
+        for value in ("1", "1.", "0.10", "-2.5", "007.0100", "3_0.5"):
+            assert parse_fixed(value, 6) == reference_parse_fixed(value, 6)
+
+    def test_batches(self):
+        assert format_fixeds([1, 10, -25], 1) == ["0.1", "1.0", "-2.5"]
+        assert parse_fixeds(["0.1", "1", "-2.5"], 1) == [1, 10, -25]
+
+    @pytest.mark.parametrize(
+        "value, decimals", [("1.2.3", 6), (".", 6), ("0.1234567", 6), ("1.5", 0)]
+    )
+    def test_parse_fixed_errors(self, value, decimals):
+        with pytest.raises(ValueError):
+            reference_parse_fixed(value, decimals)
+        with pytest.raises(ValueError):
+            parse_fixed(value, decimals)
+
+    def test_invalid_decimals(self):
+        for fn in (format_fixed, reference_format_fixed):
+            with pytest.raises(ValueError):
+                fn(1, 257)
+
+
+class TestAmount:
+    def test_formats_exactly_and_caches(self):
+        amount = Amount(123456789012345678901, 18)
+        assert str(amount) == "123.456789012345678901"
+        assert str(amount) is str(amount)
+        assert f"{amount} WETH" == "123.456789012345678901 WETH"
+
+    def test_equality_ignores_cached_text(self):
+        amount = Amount(11000, 4)
+        str(amount)
+        assert amount == Amount(11000, 4)
+
+    def test_unpack_price_amount_matches_unpack_price(self):
+        for price in random_prices(random.Random(3), 500):
+            assert str(unpack_price_amount(price)) == str(unpack_price(price))
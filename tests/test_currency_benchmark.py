@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from notification_discord_bot.currency import (
+    format_fixed,
+    format_fixeds,
+    parse_fixed,
+    unpack_price,
+    unpack_prices,
+)
+from tests.currency_reference import (
+    reference_format_fixed,
+    reference_parse_fixed,
+    reference_unpack_price,
+)
+
+pytest.importorskip("pytest_benchmark")
+
+# A page of subgraph rows: packed prices and 18 decimal token amounts
+rng = random.Random(0)
+PRICES = [f"0x{rng.getrandbits(32):08X}" for _ in range(1000)]
+AMOUNTS = [rng.randrange(10**24) for _ in range(1000)]
+FORMATTED = [reference_format_fixed(a, 18) for a in AMOUNTS]
+
+
+@pytest.mark.benchmark(group="unpack_price")
+@pytest.mark.parametrize(
+    "unpack", [unpack_price, reference_unpack_price], ids=["int", "reference"]
+)
+def test_unpack_price(benchmark, unpack):
+    benchmark(lambda: [unpack(p) for p in PRICES])
+
+
+@pytest.mark.benchmark(group="unpack_price")
+def test_unpack_prices(benchmark):
+    benchmark(unpack_prices, PRICES)
+
+
+@pytest.mark.benchmark(group="format_fixed")
+@pytest.mark.parametrize(
+    "fmt", [format_fixed, reference_format_fixed], ids=["int", "reference"]
+)
+def test_format_fixed(benchmark, fmt):
+    benchmark(lambda: [fmt(a, 18) for a in AMOUNTS])
+
+
+@pytest.mark.benchmark(group="format_fixed")
+def test_format_fixeds(benchmark):
+    benchmark(format_fixeds, AMOUNTS, 18)
+
+
+@pytest.mark.benchmark(group="parse_fixed")
+@pytest.mark.parametrize(
+    "parse", [parse_fixed, reference_parse_fixed], ids=["int", "reference"]
+)
+def test_parse_fixed(benchmark, parse):
+    benchmark(lambda: [parse(f, 18) for f in FORMATTED])
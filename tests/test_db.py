@@ -4,7 +4,6 @@ from dataclasses import dataclass
 import pytest
 
 from notification_discord_bot import db
-from notification_discord_bot.constants import DB_PATH
 
 
 @dataclass
@@ -22,24 +21,16 @@ class DummyModel(db.Model):
         return {"a", "b"}
 
 
-def setup_function():
-    if not db.is_initialized():
-        db.initialize()
-    with open(DB_PATH, "r") as f:
-        d = json.load(f)
-        d[DummyModel.collection_name()] = []
-
-    with open(DB_PATH, "w") as f:
-        json.dump(d, f, ensure_ascii=False, indent=4)
-
-
-def teardown_function():
-    with open(DB_PATH, "r") as f:
-        d = json.load(f)
-        del d[DummyModel.collection_name()]
-
-    with open(DB_PATH, "w") as f:
-        json.dump(d, f, ensure_ascii=False, indent=4)
+@pytest.fixture(autouse=True, params=["json", "sqlite"])
+def backend(request, tmp_path, monkeypatch):
+    if request.param == "json":
+        b: db.StorageBackend = db.JSONBackend(str(tmp_path / "db.json"))
+    else:
+        monkeypatch.setattr(db, "DB_PATH", str(tmp_path / "missing.json"))
+        b = db.SQLiteBackend(str(tmp_path / "db.sqlite3"))
+    monkeypatch.setattr(db, "backend", b)
+    db.initialize()
+    return b
 
 
 def test_uniqueness():
@@ -81,3 +72,51 @@ def test_filter():
 
     out = DummyModel.filter(a="a")
     assert out == [first, second]
+
+
+def test_delete():
+    DummyModel.update_or_create(a="a", b="b", defaults={"c": "c"})
+    DummyModel.update_or_create(a="a", b="e", defaults={"c": "f"})
+    DummyModel.delete(a="a", b="b")
+    assert DummyModel.filter(a="a") == [DummyModel(a="a", b="e", c="f")]
+
+
+def test_transaction_rolls_back():
+    with pytest.raises(RuntimeError):
+        with db.get_backend().transaction():
+            DummyModel.update_or_create(a="a", b="b", defaults={"c": "c"})
+            raise RuntimeError()
+    assert DummyModel.get_or_none(a="a", b="b") is None
+
+
+def test_migrate_from_json(tmp_path):
+    json_path = tmp_path / "legacy.json"
+    with open(json_path, "w") as f:
+        json.dump({"test-collection": [{"a": "a", "b": "b", "c": "c"}]}, f)
+
+    target = db.SQLiteBackend(str(tmp_path / "migrated.sqlite3"))
+    db.migrate_from_json(str(json_path), target)
+
+    assert target.find(DummyModel, a="a") == [{"a": "a", "b": "b", "c": "c"}]
+
+
+def test_interrupted_migration_is_retried(tmp_path, monkeypatch):
+    json_path = tmp_path / "legacy.json"
+    with open(json_path, "w") as f:
+        json.dump({"test-collection": [{"a": "a", "b": "b", "c": "c"}]}, f)
+    monkeypatch.setattr(db, "DB_PATH", str(json_path))
+    path = str(tmp_path / "interrupted.sqlite3")
+
+    def crash(*_):
+        raise RuntimeError()
+
+    with monkeypatch.context() as m:
+        m.setattr(db, "migrate_from_json", crash)
+        with pytest.raises(RuntimeError):
+            db.SQLiteBackend(path).initialize()
+
+    target = db.SQLiteBackend(path)
+    assert not target.is_initialized()
+    target.initialize()
+    assert target.is_initialized()
+    assert target.find(DummyModel, a="a") == [{"a": "a", "b": "b", "c": "c"}]
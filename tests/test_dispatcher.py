@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+from notification_discord_bot.dispatcher import (
+    Batching,
+    Destination,
+    Dispatcher,
+    DropPolicy,
+)
+
+
+def test_slow_destination_does_not_block_others():
+    sent = []
+    release = threading.Event()
+
+    def slow_send(msg):
+        release.wait(1)
+        sent.append(("slow", msg))
+
+    async def scenario():
+        dispatcher = Dispatcher()
+        dispatcher.add_destination("slow", slow_send, 10, DropPolicy.BLOCK)
+        dispatcher.add_destination(
+            "fast", lambda msg: sent.append(("fast", msg)), 10, DropPolicy.BLOCK
+        )
+        dispatcher.start()
+        await dispatcher.enqueue("slow", 1)
+        await dispatcher.enqueue("fast", 1)
+        await dispatcher.enqueue("fast", 2)
+        await dispatcher.destinations["fast"].queue.join()
+        assert sent == [("fast", 1), ("fast", 2)]
+        release.set()
+        await dispatcher.stop(1)
+
+    asyncio.run(scenario())
+    assert ("slow", 1) in sent
+
+
+def test_drop_policies():
+    async def scenario(policy):
+        dropped = []
+        destination = Destination(
+            "d", lambda _: None, 2, policy, on_drop=dropped.append
+        )
+        for msg in range(3):
+            await destination.put(msg)
+        return [destination.queue.get_nowait() for _ in range(2)], dropped
+
+    assert asyncio.run(scenario(DropPolicy.DROP_NEWEST)) == ([0, 1], [2])
+    assert asyncio.run(scenario(DropPolicy.DROP_OLDEST)) == ([1, 2], [0])
+
+
+def test_batching_respects_size_and_weight():
+    batches = []
+
+    async def scenario():
+        destination = Destination(
+            "d",
+            batches.append,
+            10,
+            DropPolicy.BLOCK,
+            batching=Batching(max_size=3, window_s=0, weight=len, max_weight=4),
+        )
+        for msg in ["a", "b", "c", "d", "eee", "f"]:
+            await destination.put(msg)
+        destination.task = asyncio.create_task(destination.work())
+        await destination.queue.join()
+        destination.task.cancel()
+
+    asyncio.run(scenario())
+    assert batches == [["a", "b", "c"], ["d", "eee"], ["f"]]
+
+
+def test_stop_does_not_wait_for_a_stuck_send():
+    release = threading.Event()
+    finished = threading.Event()
+
+    def stuck_send(_):
+        release.wait(5)
+        finished.set()
+
+    async def scenario():
+        dispatcher = Dispatcher()
+        dispatcher.add_destination("stuck", stuck_send, 10, DropPolicy.BLOCK)
+        dispatcher.start()
+        await dispatcher.enqueue("stuck", 1)
+        await dispatcher.stop(0)
+
+    asyncio.run(scenario())
+    assert not finished.is_set()
+    release.set()
+
+
+def test_retry_delay_is_capped():
+    destination = Destination(
+        "d", lambda _: None, 1, DropPolicy.BLOCK, retry_delay_s=2, max_retry_delay_s=300
+    )
+    assert [destination.retry_delay(a) for a in range(3)] == [2, 4, 8]
+    assert destination.retry_delay(8) == 300
+    assert destination.retry_delay(10_000) == 300
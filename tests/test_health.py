@@ -0,0 +1,31 @@
+from notification_discord_bot.health import CircuitBreaker, CircuitState
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("contract", failure_threshold=3, reset_timeout_s=10)
+    breaker.record_failure(0, "boom")
+    breaker.record_failure(1, "boom")
+    breaker.record_success(2)
+    breaker.record_failure(3, "boom")
+    breaker.record_failure(4, "boom")
+    assert breaker.state == CircuitState.CLOSED
+    breaker.record_failure(5, "boom")
+    assert breaker.state == CircuitState.OPEN
+    assert not breaker.allow(6)
+    assert breaker.delay(6) == 9
+
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("contract", failure_threshold=1, reset_timeout_s=10)
+    breaker.record_failure(0, "boom")
+    assert breaker.allow(10)
+    assert breaker.state == CircuitState.HALF_OPEN
+    breaker.record_failure(11, "still down")
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.delay(11) == 10
+
+    assert breaker.allow(21)
+    breaker.record_success(22)
+    assert breaker.state == CircuitState.CLOSED
+    assert breaker.last_error is None
+    assert breaker.last_success_at == 22
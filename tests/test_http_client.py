@@ -0,0 +1,26 @@
+from notification_discord_bot.http_client import (
+    RETRY_STATUSES,
+    JitteredRetry,
+    create_session,
+)
+
+
+def test_backoff_is_jittered_below_exponential_backoff():
+    retry = JitteredRetry(total=5, backoff_factor=1)
+    for _ in range(3):
+        retry = retry.increment(method="GET", url="/")
+    assert isinstance(retry, JitteredRetry)
+    for _ in range(20):
+        assert 0 <= retry.get_backoff_time() <= 4
+
+
+def test_sessions_share_pools_and_retry_policy():
+    s = create_session(retries=2, allowed_methods=("GET",), pool_maxsize=4)
+    adapter = s.get_adapter("https://example.com")
+    assert adapter is s.get_adapter("http://example.com")
+    assert adapter._pool_maxsize == 4  # pylint: disable=protected-access
+    retry = adapter.max_retries
+    assert retry.total == 2
+    assert tuple(retry.status_forcelist) == RETRY_STATUSES
+    assert retry.is_retry("GET", 503)
+    assert not retry.is_retry("POST", 503)
@@ -0,0 +1,79 @@
+import os
+
+import pytest
+
+from notification_discord_bot.image_cache import (
+    ImageCache,
+    ImageTooLargeError,
+    MediaIdCache,
+    download_image,
+)
+
+
+class FakeResponse:
+    def __init__(self, chunks, headers=None):
+        self.chunks = chunks
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):  # pylint: disable=unused-argument
+        yield from self.chunks
+
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.calls = 0
+
+    def get(self, *_, **__):
+        self.calls += 1
+        return self.response
+
+
+def test_fetch_is_cached_by_content(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=1024)
+    session = FakeSession(FakeResponse([b"abc", b"def"]))
+
+    first = cache.fetch(session, "https://a/1.png", 100)
+    second = cache.fetch(session, "https://a/1.png", 100)
+    third = cache.put("https://b/1.png", b"abcdef")
+
+    assert first.content == b"abcdef"
+    assert second == first == third
+    assert session.calls == 1
+    assert ImageCache(str(tmp_path), max_bytes=1024).get("https://a/1.png") == first
+
+
+def test_eviction_keeps_total_size_bounded(tmp_path):
+    cache = ImageCache(str(tmp_path), max_bytes=8)
+    cache.put("https://a/1.png", b"12345")
+    os.utime(os.path.join(tmp_path, cache.get("https://a/1.png").digest), (0, 0))
+    cache.put("https://a/2.png", b"67890")
+
+    assert cache.get("https://a/1.png") is None
+    assert cache.get("https://a/2.png") is not None
+
+
+def test_download_size_cap():
+    with pytest.raises(ImageTooLargeError):
+        download_image(FakeSession(FakeResponse([b"1234", b"5678"])), "url", 6)
+    with pytest.raises(ImageTooLargeError):
+        download_image(
+            FakeSession(FakeResponse([], {"Content-Length": "10"})), "url", 6
+        )
+
+
+def test_media_id_expiry():
+    cache = MediaIdCache(safety_margin_s=0)
+    cache.set("fresh", 1, 60)
+    cache.set("stale", 2, -1)
+    assert cache.get("fresh") == 1
+    assert cache.get("stale") is None
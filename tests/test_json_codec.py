@@ -0,0 +1,30 @@
+import pytest
+
+from notification_discord_bot import json_codec
+
+
+@pytest.mark.parametrize("name", ["json", "orjson", "msgspec"])
+def test_backends_decode_the_same(name):
+    try:
+        loads = json_codec.import_backend(name)
+    except ImportError:
+        pytest.skip(f"{name} is not installed")
+    payload = b'{"data": {"lendings": [{"cursor": 1, "id": "1", "price": 1.5}]}}'
+    assert loads(payload) == {
+        "data": {"lendings": [{"cursor": 1, "id": "1", "price": 1.5}]}
+    }
+
+
+def test_auto_falls_back_to_stdlib(monkeypatch):
+    def import_backend(name):
+        if name != "json":
+            raise ImportError(name)
+        return json_codec.json.loads
+
+    monkeypatch.setattr(json_codec, "import_backend", import_backend)
+    assert json_codec.load_backend("auto")[0] == "json"
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        json_codec.load_backend("yaml")
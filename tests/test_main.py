@@ -0,0 +1,109 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import discord
+import pytest
+import requests
+
+from notification_discord_bot import constants, main
+from notification_discord_bot.models import OutboxModel, ReNFTModel
+from notification_discord_bot.renft import TransactionType
+from notification_discord_bot.watermarks import WatermarkCache
+
+
+def response(status: int, body: dict, **headers) -> requests.Response:
+    res = requests.Response()
+    res.status_code = status
+    res._content = json.dumps(body).encode()  # pylint: disable=protected-access
+    res.headers.update(headers)
+    return res
+
+
+def test_rate_limit_retries_are_bounded(monkeypatch):
+    posts = []
+
+    def post(*_, **kwargs):
+        posts.append(kwargs["json"])
+        return response(429, {"retry_after": 100_000})
+
+    monkeypatch.setattr(constants, "DISCORD_WEBHOOK", "https://discord.test/hook")
+    monkeypatch.setattr(constants, "DISCORD_RATE_LIMIT_RETRIES", 2)
+    monkeypatch.setattr(main.discord_session, "post", post)
+    monkeypatch.setattr(main.time, "sleep", lambda _: None)
+
+    with pytest.raises(requests.HTTPError):
+        main.MessageSender().send_discord_payloads([{"title": "one"}])
+    assert len(posts) == 3
+
+
+@pytest.mark.parametrize(
+    "res, expected",
+    [
+        (response(429, {"retry_after": 0.5}, **{"Retry-After": "2"}), 2),
+        (response(429, {}, **{"X-RateLimit-Reset-After": "1.5"}), 1.5),
+        (response(429, {"retry_after": 0.25}), 0.25),
+        (response(429, {"retry_after": 30_000}), constants.DISCORD_MAX_RETRY_AFTER_S),
+        (response(429, {"retry_after": "soon"}), 1),
+        (response(429, {"retry_after": -1}), 0),
+    ],
+)
+def test_retry_after(res, expected):
+    assert main.get_retry_after(res) == expected
+
+
+def make_message(cache: WatermarkCache, cursor: int, broken: bool = False):
+    def observe():
+        if broken:
+            raise RuntimeError("crash")
+        cache.advance("contract", TransactionType.LEND, cursor)
+
+    datum = SimpleNamespace(
+        contract=SimpleNamespace(name="contract"),
+        transaction_type=TransactionType.LEND,
+        cursor=cursor,
+        timestamp=0,
+        trace_id=None,
+        observe=observe,
+    )
+    return datum, discord.Embed(title=str(cursor)), constants.TwitterMessage("", "")
+
+
+@pytest.mark.usefixtures("sqlite_db")
+@pytest.mark.parametrize("crash_after_flush", [False, True])
+def test_commit_messages_keeps_neither_on_a_crash(monkeypatch, crash_after_flush):
+    cache = WatermarkCache()
+    monkeypatch.setattr(main, "watermarks", cache)
+    if crash_after_flush:
+        flush = cache.flush
+
+        def crashing_flush():
+            flush()
+            raise RuntimeError("crash")
+
+        monkeypatch.setattr(cache, "flush", crashing_flush)
+        messages = [make_message(cache, 1), make_message(cache, 2)]
+    else:
+        messages = [make_message(cache, 1), make_message(cache, 2, broken=True)]
+
+    with pytest.raises(RuntimeError):
+        main.commit_messages(messages)
+
+    assert OutboxModel.filter() == []
+    assert ReNFTModel.filter() == []
+    assert cache.get("contract", TransactionType.LEND) is None
+
+
+def test_outbox_is_pruned_periodically(monkeypatch):
+    pruned = []
+
+    async def scenario():
+        task = asyncio.create_task(main.prune_outbox())
+        while len(pruned) < 2:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    monkeypatch.setattr(constants, "OUTBOX_PRUNE_INTERVAL_S", 0)
+    monkeypatch.setattr(main.outbox, "prune", pruned.append)
+    asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert pruned[:2] == [constants.OUTBOX_RETENTION_S] * 2
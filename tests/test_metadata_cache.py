@@ -0,0 +1,107 @@
+import pytest
+
+from notification_discord_bot import metadata_cache
+from notification_discord_bot.metadata_cache import (
+    CachedLookupError,
+    CacheStats,
+    MetadataCache,
+)
+from notification_discord_bot.renft import Chain, NonFungibleToken
+
+
+def make_nft(token_id: str) -> NonFungibleToken:
+    return NonFungibleToken(
+        name=f"NFT {token_id}",
+        nft_address="0xabc",
+        token_id=token_id,
+        image_url="https://example.com/image.png",
+        description="",
+    )
+
+
+def test_lru_eviction():
+    cache = MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60)
+    cache.set(("p", "0xabc", "1", Chain.ETH), make_nft("1"))
+    cache.set(("p", "0xabc", "2", Chain.ETH), make_nft("2"))
+    assert cache.get(("p", "0xabc", "1", Chain.ETH)) is not None
+    cache.set(("p", "0xabc", "3", Chain.ETH), make_nft("3"))
+
+    assert cache.get(("p", "0xabc", "2", Chain.ETH)) is None
+    assert cache.get(("p", "0xabc", "1", Chain.ETH)) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_ttl_expiry():
+    cache = MetadataCache(max_size=2, ttl_s=-1, negative_ttl_s=60)
+    cache.set(("p", "0xabc", "1", Chain.ETH), make_nft("1"))
+    assert cache.get(("p", "0xabc", "1", Chain.ETH)) is None
+    assert cache.stats.expirations == 1
+
+
+def test_negative_caching():
+    cache = MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60)
+    calls = []
+
+    @cache.cached("p")
+    def lookup(address, token_id, chain):
+        calls.append((address, token_id, chain))
+        raise ValueError("provider down")
+
+    with pytest.raises(ValueError):
+        lookup("0xabc", "1", Chain.ETH)
+    with pytest.raises(CachedLookupError):
+        lookup("0xabc", "1", Chain.ETH)
+    assert len(calls) == 1
+    assert cache.stats.negative_hits == 1
+
+
+def test_persists_across_instances(tmp_path):
+    path = str(tmp_path / "nft_cache.sqlite3")
+    MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60, path=path).set(
+        ("p", "0xabc", "1", Chain.ETH), make_nft("1")
+    )
+
+    cache = MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60, path=path)
+    entry = cache.get(("p", "0xabc", "1", Chain.ETH))
+    assert entry is not None and entry.nft == make_nft("1")
+    assert cache.stats.disk_hits == 1
+
+
+def test_contains_does_not_count(tmp_path):
+    path = str(tmp_path / "nft_cache.sqlite3")
+    MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60, path=path).set(
+        ("p", "0xabc", "1", Chain.ETH), make_nft("1")
+    )
+    cache = MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60, path=path)
+    cache.set_failure(("p", "0xabc", "2", Chain.ETH))
+
+    assert cache.contains(("p", "0xabc", "1", Chain.ETH))
+    assert cache.contains(("p", "0xabc", "2", Chain.ETH))
+    assert not cache.contains(("p", "0xabc", "3", Chain.ETH))
+    assert cache.stats == CacheStats()
+
+
+def test_address_case_is_ignored(tmp_path):
+    path = str(tmp_path / "nft_cache.sqlite3")
+    cache = MetadataCache(max_size=2, ttl_s=60, negative_ttl_s=60, path=path)
+    cache.set(("p", "0xABC", "1", Chain.ETH), make_nft("1"))
+    cache.set_failure(("p", "0xABC", "2", Chain.ETH))
+
+    entry = cache.get(("p", "0xabc", "1", Chain.ETH))
+    assert entry is not None and entry.nft == make_nft("1")
+    entry = cache.get(("p", "0xabc", "2", Chain.ETH))
+    assert entry is not None and entry.nft is None
+    assert cache.stats.disk_hits == 0
+
+
+def test_disk_is_trimmed_while_open(tmp_path, monkeypatch):
+    monkeypatch.setattr(metadata_cache, "DISK_TRIM_INTERVAL", 5)
+    cache = MetadataCache(
+        max_size=2, ttl_s=60, negative_ttl_s=60, path=str(tmp_path / "c.sqlite3")
+    )
+    for i in range(10):
+        cache.set(("p", "0xabc", str(i), Chain.ETH), make_nft(str(i)))
+
+    assert cache.conn is not None
+    (rows,) = cache.conn.execute("SELECT COUNT(*) FROM nft_metadata").fetchone()
+    assert rows == 2
@@ -0,0 +1,50 @@
+import urllib.request
+
+import pytest
+
+from notification_discord_bot.metrics import Registry, start_server
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("latency_seconds", "Latency.", ("host",), (0.1, 1))
+    latency.observe(0.05, host="a")
+    latency.observe(0.5, host="a")
+    latency.observe(5, host="a")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{host="a",le="0.1"} 1',
+        'latency_seconds_bucket{host="a",le="1"} 2',
+        'latency_seconds_bucket{host="a",le="+Inf"} 3',
+        'latency_seconds_sum{host="a"} 5.55',
+        'latency_seconds_count{host="a"} 3',
+    ]
+
+
+def test_counters_and_gauges():
+    registry = Registry()
+    writes = registry.counter("writes_total", "Writes.", ("collection",))
+    ratio = registry.gauge("ratio", "Ratio.")
+    writes.inc(collection="renft")
+    writes.inc(2, collection="renft")
+    ratio.set_function(lambda: 0.5)
+
+    rendered = registry.render()
+    assert 'writes_total{collection="renft"} 3' in rendered
+    assert "ratio 0.5" in rendered
+    with pytest.raises(ValueError):
+        writes.inc(table="renft")
+
+
+def test_metrics_endpoint():
+    server = start_server("127.0.0.1", 0)
+    assert server is not None
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as res:
+            body = res.read().decode()
+    finally:
+        server.shutdown()
+    assert "# TYPE subgraph_query_seconds histogram" in body
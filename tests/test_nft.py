@@ -0,0 +1,144 @@
+import time
+
+import pytest
+
+from notification_discord_bot import nft
+from notification_discord_bot.metadata_cache import CacheStats, MetadataCache
+from notification_discord_bot.metrics import NFT_LOOKUP_SECONDS
+from notification_discord_bot.nft_providers import ProviderRegistry
+from notification_discord_bot.renft import Chain, NonFungibleToken
+
+
+def make_nft(address: str, token_id: str) -> NonFungibleToken:
+    return NonFungibleToken(
+        name=f"NFT {token_id}",
+        nft_address=address,
+        token_id=token_id,
+        image_url="https://example.com/image.png",
+        description="",
+    )
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    monkeypatch.setattr(
+        nft, "nft_cache", MetadataCache(max_size=100, ttl_s=60, negative_ttl_s=60)
+    )
+
+
+def test_prefetch_batches_alchemy_lookups(monkeypatch):
+    calls = []
+
+    def fake_batch(tokens, chain):
+        calls.append((tokens, chain))
+        return [make_nft(*t) for t in tokens]
+
+    monkeypatch.setattr(nft, "get_nfts_with_alchemy_batch", fake_batch)
+    monkeypatch.setattr(nft, "ALCHEMY_BATCH_SIZE", 2)
+    keys = [("0xabc", str(i), Chain.ETH) for i in range(3)]
+
+    nft.prefetch_nfts([*keys, keys[0]])
+
+    assert sorted(len(tokens) for tokens, _ in calls) == [1, 2]
+    for key in keys:
+        entry = nft.nft_cache.get(("alchemy", *key))
+        assert entry is not None and entry.nft == make_nft(key[0], key[1])
+
+
+def test_prefetch_skips_cached(monkeypatch):
+    nft.nft_cache.set(("alchemy", "0xabc", "1", Chain.ETH), make_nft("0xabc", "1"))
+    monkeypatch.setattr(
+        nft, "get_nfts_with_alchemy_batch", lambda *_: pytest.fail("not cached")
+    )
+    nft.prefetch_nfts([("0xabc", "1", Chain.ETH)])
+    # Probing isn't a lookup, so it leaves the hit ratio alone
+    assert nft.nft_cache.stats == CacheStats()
+
+
+def make_registry(hedge_delay_s, latency_budget_s=1.0) -> ProviderRegistry:
+    registry = ProviderRegistry(
+        hedge_delay_s=hedge_delay_s, latency_budget_s=latency_budget_s, max_workers=4
+    )
+
+    @registry.register("slow", {Chain.ETH}, priority=0)
+    def slow(address, *_):
+        time.sleep(0.5)
+        return make_nft(address, "slow")
+
+    @registry.register("fast", {Chain.ETH}, priority=1)
+    def fast(address, *_):
+        return make_nft(address, "fast")
+
+    return registry
+
+
+def test_hedged_request_wins():
+    registry = make_registry(hedge_delay_s=0.05)
+    out = registry.resolve("0xabc", "1", Chain.ETH)
+    assert out is not None and out.token_id == "fast"
+    assert registry.stats["fast"].wins == 1
+
+
+def test_no_hedging_waits_for_primary():
+    registry = make_registry(hedge_delay_s=None)
+    out = registry.resolve("0xabc", "1", Chain.ETH)
+    assert out is not None and out.token_id == "slow"
+
+
+def test_latency_budget_gives_up():
+    registry = make_registry(hedge_delay_s=None, latency_budget_s=0.05)
+    assert registry.resolve("0xabc", "1", Chain.ETH) is None
+
+
+def test_only_provider_requests_are_timed(monkeypatch):
+    metadata_cache = MetadataCache(max_size=100, ttl_s=60, negative_ttl_s=60)
+
+    @metadata_cache.cached("p")
+    @nft.timed("p")
+    def lookup(address, token_id, _):
+        return make_nft(address, token_id)
+
+    class FakeResponse:
+        content = b"[]"
+
+        def raise_for_status(self):
+            pass
+
+    monkeypatch.setattr(nft.session, "post", lambda *_, **__: FakeResponse())
+    batches = NFT_LOOKUP_SECONDS.count(provider="alchemy_batch")
+
+    for _ in range(3):
+        lookup("0xabc", "1", Chain.ETH)
+    nft.get_nfts_with_alchemy_batch([("0xabc", "1")], Chain.ETH)
+
+    assert NFT_LOOKUP_SECONDS.count(provider="p") == 1
+    assert NFT_LOOKUP_SECONDS.count(provider="alchemy_batch") == batches + 1
+
+
+def test_resolve_answers_from_cache_without_provider_stats():
+    calls = []
+    registry = ProviderRegistry(
+        hedge_delay_s=None,
+        latency_budget_s=1,
+        max_workers=2,
+        cache=MetadataCache(max_size=100, ttl_s=60, negative_ttl_s=60),
+    )
+
+    @registry.register("broken", {Chain.ETH}, priority=0)
+    def broken(*_):
+        calls.append("broken")
+        raise RuntimeError()
+
+    @registry.register("working", {Chain.ETH}, priority=1)
+    def working(address, token_id, _):
+        calls.append("working")
+        return make_nft(address, token_id)
+
+    for _ in range(3):
+        out = registry.resolve("0xabc", "1", Chain.ETH)
+        assert out == make_nft("0xabc", "1")
+
+    assert calls == ["broken", "working"]
+    assert registry.stats["broken"].requests == 1
+    assert registry.stats["working"].requests == 1
+    assert registry.stats["working"].wins == 1
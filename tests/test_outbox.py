@@ -0,0 +1,134 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+from notification_discord_bot import outbox
+from notification_discord_bot.metrics import DELIVERY_LAG_SECONDS
+from notification_discord_bot.models import OutboxModel
+from notification_discord_bot.renft import TransactionType
+
+pytestmark = pytest.mark.usefixtures("sqlite_db")
+
+
+def make_datum(cursor: int):
+    return SimpleNamespace(
+        contract=SimpleNamespace(name="contract"),
+        transaction_type=TransactionType.LEND,
+        cursor=cursor,
+        timestamp=time.time() - 60,
+        trace_id=f"trace-{cursor}",
+    )
+
+
+def test_record_and_resume_pending():
+    outbox.record(make_datum(1), "discord", {"title": "one"})
+    outbox.record(make_datum(2), "discord", {"title": "two"})
+
+    pending = outbox.pending_messages()
+    assert [m.idempotency_key for m in pending] == [
+        "contract:LEND:1",
+        "contract:LEND:2",
+    ]
+    assert pending[0].payload == {"title": "one"}
+
+
+def test_deliver_marks_sent_and_is_idempotent():
+    sent = []
+    deliver = outbox.deliverer(sent.append)
+    msg = outbox.record(make_datum(1), "discord", {"title": "one"})
+    lags = DELIVERY_LAG_SECONDS.count(destination="discord")
+
+    deliver(msg)
+    deliver(msg)
+
+    assert sent == [{"title": "one"}]
+    assert outbox.pending_messages() == []
+    assert DELIVERY_LAG_SECONDS.count(destination="discord") == lags + 1
+
+
+def test_failed_delivery_stays_pending():
+    def fail(_):
+        raise RuntimeError()
+
+    msg = outbox.record(make_datum(1), "discord", {"title": "one"})
+    with pytest.raises(RuntimeError):
+        outbox.deliverer(fail)(msg)
+    assert len(outbox.pending_messages()) == 1
+
+
+def test_prune_keeps_pending():
+    outbox.mark(outbox.record(make_datum(1), "discord", {}), outbox.SENT)
+    outbox.record(make_datum(2), "discord", {})
+
+    outbox.prune(older_than_s=-1)
+
+    assert [m.status for m in OutboxModel.filter()] == [outbox.PENDING]
+
+
+def test_dropped_message_is_not_resumed():
+    outbox.drop(outbox.record(make_datum(1), "twitter", {}))
+    outbox.record(make_datum(2), "twitter", {})
+
+    assert [m.idempotency_key for m in outbox.pending_messages()] == ["contract:LEND:2"]
+
+
+def http_error(status: int) -> requests.HTTPError:
+    res = requests.Response()
+    res.status_code = status
+    return requests.HTTPError(response=res)
+
+
+def test_rejected_batch_is_sent_one_by_one():
+    sent = []
+
+    def send(payloads):
+        if any(p["title"] == "bad" for p in payloads):
+            raise http_error(400)
+        sent.extend(payloads)
+
+    msgs = [
+        outbox.record(make_datum(i), "discord", {"title": title})
+        for i, title in enumerate(["one", "bad", "two"])
+    ]
+    outbox.batch_deliverer(send)(msgs)
+
+    assert sent == [{"title": "one"}, {"title": "two"}]
+    assert outbox.pending_messages() == []
+    statuses = {m.idempotency_key: m.status for m in OutboxModel.filter()}
+    assert statuses["contract:LEND:1"] == outbox.FAILED
+    outbox.give_up(msgs[0])
+    assert outbox.is_sent(msgs[0])
+
+
+def test_batch_is_retried_when_not_rejected():
+    def send(_):
+        raise http_error(429)
+
+    msgs = [outbox.record(make_datum(i), "discord", {}) for i in range(2)]
+    with pytest.raises(requests.HTTPError):
+        outbox.batch_deliverer(send)(msgs)
+    assert len(outbox.pending_messages()) == 2
+
+
+def test_given_up_message_is_resumed():
+    msg = outbox.record(make_datum(1), "discord", {})
+    msg.attempts = 20
+
+    outbox.give_up(msg)
+
+    assert [m.idempotency_key for m in outbox.pending_messages()] == [
+        msg.idempotency_key
+    ]
+
+
+def test_recording_a_sent_message_keeps_it_sent():
+    sent = []
+    outbox.deliverer(sent.append)(outbox.record(make_datum(1), "discord", {}))
+
+    msg = outbox.record(make_datum(1), "discord", {})
+    outbox.deliverer(sent.append)(msg)
+
+    assert sent == [{}]
+    assert outbox.is_sent(msg)
@@ -0,0 +1,52 @@
+import asyncio
+import threading
+from typing import Optional
+
+from notification_discord_bot import poller
+from notification_discord_bot.watermarks import watermarks
+
+
+class FakeContract:
+    def __init__(self, name: str, barrier: Optional[threading.Barrier] = None):
+        self.name = name
+        self.barrier = barrier
+
+    def wait(self):
+        # Only passes once both queries are in flight at the same time
+        if self.barrier is not None:
+            self.barrier.wait()
+
+    def get_lendings_since(self, cursor):
+        self.wait()
+        return [f"{self.name}-lending-{cursor + 1}"]
+
+    def get_rentings_since(self, cursor):
+        self.wait()
+        return [f"{self.name}-renting-{cursor + 1}"]
+
+    def get_updates_since(self, lending_cursor, renting_cursor):
+        return (
+            [f"{self.name}-combined-lending-{lending_cursor + 1}"],
+            [f"{self.name}-combined-renting-{renting_cursor + 1}"],
+        )
+
+
+def test_fetch_updates_queries_lendings_and_rentings_concurrently(monkeypatch):
+    monkeypatch.setattr(watermarks, "get", lambda *_: 0)
+    monkeypatch.setattr(poller, "SUBGRAPH_COMBINED_QUERY", False)
+
+    contract = FakeContract("c", threading.Barrier(2, timeout=5))
+    out = asyncio.run(poller.fetch_updates(contract))
+
+    assert out.lendings == ["c-lending-1"]
+    assert out.rentings == ["c-renting-1"]
+
+
+def test_fetch_updates_uses_one_combined_query(monkeypatch):
+    monkeypatch.setattr(watermarks, "get", lambda *_: 0)
+    monkeypatch.setattr(poller, "SUBGRAPH_COMBINED_QUERY", True)
+
+    out = asyncio.run(poller.fetch_updates(FakeContract("c")))
+
+    assert out.lendings == ["c-combined-lending-1"]
+    assert out.rentings == ["c-combined-renting-1"]
@@ -0,0 +1,51 @@
+from notification_discord_bot.scheduler import PollSchedule
+
+
+def make_schedule() -> PollSchedule:
+    return PollSchedule(
+        min_interval_s=5, max_interval_s=60, interval_s=20, max_error_interval_s=100
+    )
+
+
+def test_interval_adapts_to_activity_within_bounds():
+    schedule = make_schedule()
+    schedule.record_success(started_at=0, events=3)
+    assert schedule.interval_s == 10
+    for _ in range(5):
+        schedule.record_success(started_at=0, events=1)
+    assert schedule.interval_s == 5
+    for _ in range(10):
+        schedule.record_success(started_at=0, events=0)
+    assert schedule.interval_s == 60
+
+
+def test_period_does_not_drift_with_poll_duration():
+    schedule = make_schedule()
+    schedule.record_success(started_at=100, events=0)
+    assert schedule.next_run_at == 130
+    assert schedule.delay(now=112) == 18
+    assert schedule.delay(now=140) == 0
+
+
+def test_errors_back_off_exponentially_until_success():
+    schedule = make_schedule()
+    delays = []
+    for _ in range(4):
+        schedule.record_error(started_at=0)
+        delays.append(schedule.next_run_at)
+    assert delays == [40, 80, 100, 100]
+    schedule.record_success(started_at=0, events=0)
+    assert schedule.errors == 0
+    assert schedule.next_run_at == 30
+
+
+def test_backoff_survives_long_outages():
+    schedule = PollSchedule(
+        min_interval_s=5.0,
+        max_interval_s=60.0,
+        interval_s=20.0,
+        max_error_interval_s=100.0,
+    )
+    for _ in range(5000):
+        schedule.record_error(started_at=0)
+    assert schedule.next_run_at == 100
@@ -0,0 +1,109 @@
+from types import SimpleNamespace
+
+import pytest
+
+from notification_discord_bot import db, seed
+from notification_discord_bot.models import ReNFTModel
+from notification_discord_bot.renft import TransactionType
+from notification_discord_bot.watermarks import WatermarkCache
+
+
+class FakeContract:
+    name = "contract"
+    query_url = "url"
+    query_timeout = 1.0
+
+    def get_lendings(self):
+        return [SimpleNamespace(cursor=c) for c in (7, 3, 5)]
+
+    def get_rentings(self):
+        return []
+
+
+@pytest.fixture(autouse=True)
+def setup(sqlite_db, monkeypatch):  # pylint: disable=unused-argument
+    monkeypatch.setattr(seed, "all_contracts", [FakeContract()])
+    monkeypatch.setattr(seed, "watermarks", WatermarkCache())
+
+
+def test_seeds_max_cursor_in_one_write(monkeypatch):
+    writes = []
+    original = db.get_backend().upsert
+    monkeypatch.setattr(
+        db.get_backend(), "upsert", lambda *a: writes.append(a) or original(*a)
+    )
+
+    seed.seed_renft()
+    seed.watermarks.flush()
+
+    assert len(writes) == 2
+    assert sorted(ReNFTModel.filter(), key=lambda m: m.transaction_type) == [
+        ReNFTModel(
+            contract_name="contract",
+            transaction_type=TransactionType.LEND,
+            renft_id=7,
+        ),
+        ReNFTModel(
+            contract_name="contract",
+            transaction_type=TransactionType.RENT,
+            renft_id=seed.FIRST_CURSOR,
+        ),
+    ]
+
+
+def test_seeds_explicit_cursor():
+    seed.seed_renft(lending_cursor=2, renting_cursor=4)
+    assert seed.watermarks.get("contract", TransactionType.LEND) == 2
+    assert seed.watermarks.get("contract", TransactionType.RENT) == 4
+
+
+def test_seeds_from_timestamp(monkeypatch):
+    monkeypatch.setattr(
+        seed,
+        "get_cursor_at",
+        lambda contract, transaction_type, timestamp: timestamp + 1,
+    )
+    seed.seed_renft(timestamp=100)
+    assert seed.watermarks.get("contract", TransactionType.LEND) == 101
+    assert seed.watermarks.get("contract", TransactionType.RENT) == 101
+
+
+def test_parse_cursor():
+    assert seed.parse_cursor("12") == 12
+    assert seed.parse_cursor("-1") == seed.FIRST_CURSOR
+    with pytest.raises(ValueError):
+        seed.parse_cursor("abc")
+    assert seed.parse_cursor("") is None
+
+
+def test_failing_contract_does_not_stop_seeding(monkeypatch):
+    class BrokenContract(FakeContract):
+        name = "broken"
+
+        def get_lendings(self):
+            raise RuntimeError("subgraph is down")
+
+    monkeypatch.setattr(seed, "all_contracts", [BrokenContract(), FakeContract()])
+    seed.seed_renft()
+    assert not seed.watermarks.has_contract("broken")
+    assert seed.watermarks.get("contract", TransactionType.LEND) == 7
+
+
+def test_empty_contract_is_seeded_before_its_first_event():
+    class EmptyContract(FakeContract):
+        def get_lendings(self):
+            return []
+
+    seed.seed_contract(EmptyContract())
+    assert seed.watermarks.has_contract("contract")
+    assert seed.watermarks.get("contract", TransactionType.LEND) == seed.FIRST_CURSOR
+    assert seed.watermarks.get("contract", TransactionType.RENT) == seed.FIRST_CURSOR
+
+
+def test_timestamp_before_first_event_seeds_before_it(monkeypatch):
+    monkeypatch.setattr(
+        seed, "get_cursor_at", lambda contract, transaction_type, timestamp: None
+    )
+    seed.seed_renft(timestamp=100)
+    assert seed.watermarks.get("contract", TransactionType.LEND) == seed.FIRST_CURSOR
+    assert seed.watermarks.get("contract", TransactionType.RENT) == seed.FIRST_CURSOR
@@ -0,0 +1,70 @@
+import pytest
+
+from notification_discord_bot.tracing import (
+    FileExporter,
+    Span,
+    Tracer,
+    main,
+    percentile,
+    read_spans,
+    summarize,
+)
+
+
+def test_exported_spans_round_trip(tmp_path):
+    tracer = Tracer(FileExporter(str(tmp_path / "traces.jsonl")))
+    tracer.record(["a", "b"], "poll.fetch", 1_000, 3_000, event_at=5, contract="c")
+    with pytest.raises(RuntimeError):
+        with tracer.span(["a"], "send.discord"):
+            raise RuntimeError()
+
+    spans = list(read_spans(str(tmp_path / "traces.jsonl")))
+    assert [(s.trace_id, s.name) for s in spans] == [
+        ("a", "poll.fetch"),
+        ("b", "poll.fetch"),
+        ("a", "send.discord"),
+    ]
+    assert spans[0].attributes == {"event_at": 5, "contract": "c"}
+    assert spans[0].duration_s == 2e-6
+    assert spans[2].attributes == {"error": True}
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer(None)
+    with tracer.span(["a"], "transform"):
+        pass
+    assert not tracer.enabled
+
+
+def test_summarize_stages_and_event_to_send():
+    spans = [
+        Span("a", "poll.fetch", 0, 2 * 10**9, {"event_at": -10}),
+        Span("a", "send.discord", 3 * 10**9, 4 * 10**9),
+        Span("a", "send.twitter", 3 * 10**9, 5 * 10**9),
+        Span("b", "poll.fetch", 0, 10**9, {"event_at": 0}),
+        Span("b", "send.discord", 2 * 10**9, 3 * 10**9, {"error": True}),
+        Span("c", "transform", -(10**9), 0),
+    ]
+
+    stages = summarize(spans, since_ns=1)
+
+    assert stages["poll.fetch"] == [1, 2]
+    assert stages["send.discord"] == [1, 1]
+    assert stages["event_to_send"] == [15]
+    assert "transform" not in stages
+
+
+def test_percentile():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 0.5) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile([3.0], 0.95) == 3
+
+
+def test_summary_command(tmp_path, capsys):
+    path = str(tmp_path / "traces.jsonl")
+    Tracer(FileExporter(path)).record(["a"], "transform", 1, 2)
+    main(["--path", path, "--window", str(10**10)])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["stage", "count", "p50", "p95", "p99"]
+    assert lines[1].split()[:2] == ["transform", "1"]
@@ -1,4 +1,10 @@
-from notification_discord_bot.utils import normalize_ipfs_url
+from notification_discord_bot import utils
+from notification_discord_bot.queries import AZRAEL_SYNC_LENDINGS_QUERY
+from notification_discord_bot.utils import (
+    normalize_ipfs_url,
+    paginate_the_graph,
+    paginate_the_graph_entities,
+)
 
 
 class TestNormalizeIPFSUrl:
@@ -17,3 +23,65 @@ class TestNormalizeIPFSUrl:
             "QmctjdS9LFAK8KrMNXAKhQMrgtdPCGvhUWiEA4RbjqBWnV/Astrocat.mp4"
         )
         assert normalize_ipfs_url(url) == expected_url
+
+
+class TestPaginateTheGraph:
+    def test_pages_until_caught_up(self, monkeypatch):
+        rows = [{"cursor": i} for i in range(1, 6)]
+        cursors = []
+
+        def fake_query_the_graph(*_, first, cursor, **__):
+            cursors.append(cursor)
+            page = [r for r in rows if r["cursor"] > cursor][:first]
+            return {"data": {"lendings": page}}
+
+        monkeypatch.setattr(utils, "query_the_graph", fake_query_the_graph)
+        out = list(paginate_the_graph("url", "query", "lendings", 0, first=2))
+        assert out == rows
+        assert cursors == [0, 2, 4]
+
+    def test_pages_combined_entities_independently(self, monkeypatch):
+        lendings = [{"cursor": i} for i in range(1, 6)]
+        rentings = [{"cursor": i} for i in range(10, 12)]
+        calls = []
+
+        def fake_query_the_graph(*_, first, lendingsCursor, rentingsCursor, **__):
+            calls.append((lendingsCursor, rentingsCursor))
+            return {
+                "data": {
+                    "lendings": [l for l in lendings if l["cursor"] > lendingsCursor][
+                        :first
+                    ],
+                    "rentings": [r for r in rentings if r["cursor"] > rentingsCursor][
+                        :first
+                    ],
+                }
+            }
+
+        monkeypatch.setattr(utils, "query_the_graph", fake_query_the_graph)
+        out = paginate_the_graph_entities(
+            "url", "query", {"lendings": 0, "rentings": 9}, first=2
+        )
+        assert out == {"lendings": lendings, "rentings": rentings}
+        assert calls == [(0, 9), (2, 11), (4, 11)]
+
+
+class TestQueryTheGraph:
+    def test_sends_variables_separately(self, monkeypatch):
+        posts = []
+
+        class FakeResponse:
+            content = b'{"data": {"lendings": []}}'
+
+            def raise_for_status(self):
+                pass
+
+        monkeypatch.setattr(
+            utils.session, "post", lambda url, **kw: posts.append(kw) or FakeResponse()
+        )
+        utils.query_the_graph("url", AZRAEL_SYNC_LENDINGS_QUERY, cursor=7, first=2)
+        utils.query_the_graph("url", AZRAEL_SYNC_LENDINGS_QUERY, cursor=9, first=2)
+
+        assert posts[0]["json"]["query"] == posts[1]["json"]["query"]
+        assert posts[0]["json"]["variables"] == {"cursor": 7, "first": 2}
+        assert posts[1]["json"]["variables"] == {"cursor": 9, "first": 2}
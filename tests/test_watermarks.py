@@ -0,0 +1,42 @@
+import pytest
+
+from notification_discord_bot.models import ReNFTModel
+from notification_discord_bot.renft import TransactionType
+from notification_discord_bot.watermarks import WatermarkCache
+
+pytestmark = pytest.mark.usefixtures("sqlite_db")
+
+
+def test_advance_is_in_memory_until_flush():
+    cache = WatermarkCache()
+    cache.advance("contract", TransactionType.LEND, 5)
+    assert cache.get("contract", TransactionType.LEND) == 5
+    assert ReNFTModel.filter() == []
+
+    cache.flush()
+    assert ReNFTModel.filter() == [
+        ReNFTModel(
+            contract_name="contract",
+            transaction_type=TransactionType.LEND,
+            renft_id=5,
+        )
+    ]
+
+
+def test_advance_never_moves_backwards():
+    cache = WatermarkCache()
+    cache.advance("contract", TransactionType.RENT, 5)
+    cache.advance("contract", TransactionType.RENT, 3)
+    assert cache.get("contract", TransactionType.RENT) == 5
+
+
+def test_load_reads_persisted_watermarks():
+    ReNFTModel.update_or_create(
+        contract_name="contract",
+        transaction_type=TransactionType.RENT,
+        defaults={"renft_id": 7},
+    )
+    cache = WatermarkCache()
+    cache.load()
+    assert cache.get("contract", TransactionType.RENT) == 7
+    assert cache.get("contract", TransactionType.LEND) is None